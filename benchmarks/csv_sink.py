@@ -0,0 +1,60 @@
+"""
+Compare the rows per second written by the file sinks.
+
+Usage::
+
+    $ python benchmarks/csv_sink.py [ROWS] [COMPRESSION]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from stack_exchange_graph_data.helpers import coroutines
+
+
+@coroutines.coroutine
+def line_prep(target):
+    """Format a row at a time, as the edges used to be."""
+    target.send("Source;Target;Weight;Type\n")
+    while True:
+        edge = yield
+        target.send(";".join(map(str, edge)) + "\n")
+
+
+def measure(sink, rows):
+    """Get the seconds taken to send the rows through the sink."""
+    delegator = coroutines.CoroutineDelegator()
+    delegator.send_to(rows, sink)
+    start = time.perf_counter()
+    delegator.run()
+    return time.perf_counter() - start
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    compression = sys.argv[2] if len(sys.argv) > 2 else None
+    random.seed(0)
+    rows = [
+        (random.randrange(10 ** 8), random.randrange(10 ** 8), 3, "Directed")
+        for _ in range(amount)
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "edges.csv")
+        sinks = {
+            "file_sink": lambda: line_prep(coroutines.file_sink(path, "w")),
+            "csv_sink": lambda: coroutines.csv_sink(
+                path,
+                ("Source", "Target", "Weight", "Type"),
+                compression=compression,
+            ),
+        }
+        for name, sink in sinks.items():
+            elapsed = measure(sink(), rows)
+            print(f"{name}: {amount / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
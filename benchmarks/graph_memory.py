@@ -0,0 +1,46 @@
+"""
+Compare the memory used per edge by the graph implementations.
+
+Usage::
+
+    $ python benchmarks/graph_memory.py [EDGES]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from stack_exchange_graph_data.segd import graph
+
+
+def measure(graph_type, edges):
+    """Get the bytes allocated whilst building the graph."""
+    tracemalloc.start()
+    graph_ = graph_type()
+    for edge in edges:
+        graph_.add(*edge)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(0)
+    link_types = list(graph.LinkType)
+    nodes = amount // 2
+    edges = [
+        (
+            random.randrange(10 ** 8, 10 ** 8 + nodes),
+            random.randrange(10 ** 8, 10 ** 8 + nodes),
+            random.choice(link_types),
+        )
+        for _ in range(amount)
+    ]
+    for graph_type in (graph.Graph, graph.CSRGraph):
+        size = measure(graph_type, edges)
+        print(f"{graph_type.__name__:>8}: {size / amount:8.1f} bytes/edge")
+
+
+if __name__ == "__main__":
+    main()
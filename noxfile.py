@@ -7,7 +7,7 @@ import nox
 @nox.session(python=["3.6"])
 def tests(session):
     session.install("-e", ".")
-    session.install("pytest")
+    session.install("pytest", "py7zr")
     session.run("pytest")
 
 
@@ -15,7 +15,7 @@ def tests(session):
 def coverage(session):
     session.install("coverage>=5.0.0")
     session.install("-e", ".")
-    session.install("pytest", "pytest-cov")
+    session.install("pytest", "pytest-cov", "py7zr")
     session.run(
         "pytest",
         "--cov=src",
@@ -46,6 +46,7 @@ def coverage_erase(session):
 FILES = [
     "src",
     "tests",
+    "benchmarks",
     "noxfile.py",
     "noxfile-lint.py",
     "setup.py",
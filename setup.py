@@ -40,6 +40,7 @@ setup(
         "requests",
         "pylzma",
     ],
+    extras_require={"numpy": ["numpy"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Environment :: Console",
@@ -28,6 +28,10 @@ what it does:
         3. Questions have the highest weighting at 3. This is because
            an answer directly relates to the question.
 
+   :Duplicate:
+        3. Duplicates from :code:`PostLinks.xml` have the same weight as
+           Q&As, as the questions are asking the same thing.
+
    :Post Link:
         2. Post links have the second highest weight as they provide
            evidence from other meta posts. It doesn't have the same weight
@@ -35,6 +39,8 @@ what it does:
            whilst the links are still valid, they should be taken with a
            grain of salt.
 
+           Linked posts from :code:`PostLinks.xml` have the same weight.
+
    :Comment Links:
         1. Comment links have the lowest weight as whilst they are
            normally used to provide links to similar post, sometimes
@@ -80,15 +86,25 @@ packages within it. The different colours show which package they're in.
             h_cache [label="helpers.cache"];
             coroutines;
             curl;
+            files;
+            manifest;
             progress;
             si;
             xref;
+            xml_stream;
+            sevenzip;
+            parallel;
+            profiling;
+            async_pipeline;
+            markdown_links;
+            html_links;
 
         node [color="#0074C1"];
             s_cache [label="segd.cache"];
             file_system;
             "graph";
             models;
+            site_index;
             site_info;
 
 
@@ -100,18 +116,35 @@ packages within it. The different colours show which package they're in.
           file_system,
           site_info,
           coroutines,
-          progress
+          progress,
+          xml_stream,
+          parallel,
+          profiling,
+          async_pipeline
         };
 
-        data_sources -> {models, "graph", xref, coroutines};
+        data_sources -> {
+          models,
+          "graph",
+          xref,
+          markdown_links,
+          html_links,
+          xml_stream,
+          coroutines
+        };
         links -> {"graph", coroutines};
-        nodes -> coroutines;
+        nodes -> {"graph", coroutines};
+        coroutines -> profiling;
+        async_pipeline -> coroutines;
 
-        s_cache -> {site_info, h_cache};
+        s_cache -> {site_index, site_info, h_cache};
         file_system -> {s_cache, site_info};
+        site_index -> {files, site_info};
 
-        h_cache -> {curl, si};
-        curl -> progress;
+        h_cache -> {curl, manifest, progress, sevenzip, si};
+        manifest -> files;
+        sevenzip -> {files, progress, si};
+        curl -> {files, progress, si};
         progress -> si;
     }
 
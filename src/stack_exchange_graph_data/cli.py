@@ -7,14 +7,63 @@ The exposed arguments are:
 --no-expand-meta        don't include links that use the old domain name
                         structure
 --download              redownload data, even if it exists in the cache
+--revalidate            redownload data that has changed on the archive
+--verify {fast,full}    how to check cached data isn't corrupt, full hashes
+                        the files again which is slower
 --min MIN               minimum sized networks to include in output
 --max MAX               maximum sized networks to include in output
 --output OUTPUT         output file name
 --cache-dir CACHE_DIR   cache directory
+--cache-budget SIZE     size to keep the cache within, such as 500M or 20G,
+                        removing the least recently used data of other sites
+                        after a run
+--stream                parse the data dumps incrementally, keeping memory
+                        usage flat
+--no-extract            read the data dumps straight out of the 7z archive,
+                        rather than extracting them to the cache, posts are
+                        then parsed in a single process
+--jobs JOBS             amount of processes to extract and parse the data
+                        dumps with
+--comment-engine {fast,docutils}
+                        how to find links in comments, docutils renders
+                        the comments which is slower
+--bare-urls             include URLs in comments that aren't marked up as
+                        links, only used by the fast comment engine
+--link-source {scrape,postlinks,all}
+                        where to get links between posts from, postlinks
+                        reads PostLinks.xml rather than scraping posts and
+                        comments
+--concurrent            read the posts, comments and post links in separate
+                        threads
+--asyncio               run the pipeline on asyncio, overlapping getting,
+                        extracting and parsing the files
+--compress {gzip,bz2,lzma}
+                        compress the output files
+--profile               print the items and time spent in each stage of the
+                        pipeline
+--profile-report PATH   write the pipeline profile to a JSON file
 
 """
 import argparse
 
+#: Multipliers of the suffixes sizes can be given with.
+_SIZE_SUFFIXES = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def _size(value: str) -> int:
+    """
+    Parse a size in bytes, with an optional binary suffix.
+
+    :param value: Size such as :code:`1024`, :code:`500M` or :code:`20G`.
+    :return: The amount of bytes.
+    """
+    number = value.rstrip("BbKkMmGgTt")
+    suffix = value[len(number) :].upper().rstrip("B")
+    try:
+        return int(float(number) * _SIZE_SUFFIXES[suffix])
+    except (KeyError, ValueError):
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}") from None
+
 
 def make_parser() -> argparse.ArgumentParser:
     """Make parser for CLI arguments."""
@@ -33,6 +82,20 @@ def make_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="redownload data, even if it exists in the cache",
     )
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help="redownload data that has changed on the archive",
+    )
+    parser.add_argument(
+        "--verify",
+        choices=["fast", "full"],
+        default="fast",
+        help=(
+            "how to check cached data isn't corrupt, "
+            "full hashes the files again which is slower"
+        ),
+    )
     parser.add_argument(
         "--min",
         type=int,
@@ -51,4 +114,88 @@ def make_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--cache-dir", default=".cache/", help="cache directory",
     )
+    parser.add_argument(
+        "--cache-budget",
+        type=_size,
+        metavar="SIZE",
+        help=(
+            "size to keep the cache within, such as 500M or 20G, removing "
+            "the least recently used data of other sites after a run"
+        ),
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="parse the data dumps incrementally, keeping memory usage flat",
+    )
+    parser.add_argument(
+        "--no-extract",
+        action="store_true",
+        help=(
+            "read the data dumps straight out of the 7z archive, rather than "
+            "extracting them to the cache, posts are then parsed in a single "
+            "process"
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="amount of processes to extract and parse the data dumps with",
+    )
+    parser.add_argument(
+        "--comment-engine",
+        choices=["fast", "docutils"],
+        default="fast",
+        help=(
+            "how to find links in comments, docutils renders the comments "
+            "which is slower"
+        ),
+    )
+    parser.add_argument(
+        "--bare-urls",
+        action="store_true",
+        help=(
+            "include URLs in comments that aren't marked up as links, only "
+            "used by the fast comment engine"
+        ),
+    )
+    parser.add_argument(
+        "--link-source",
+        choices=["scrape", "postlinks", "all"],
+        default="scrape",
+        help=(
+            "where to get links between posts from, postlinks reads "
+            "PostLinks.xml rather than scraping posts and comments"
+        ),
+    )
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="read the posts, comments and post links in separate threads",
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help=(
+            "run the pipeline on asyncio, overlapping getting, extracting and "
+            "parsing the files"
+        ),
+    )
+    parser.add_argument(
+        "--compress",
+        choices=["gzip", "bz2", "lzma"],
+        help="compress the output files",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the items and time spent in each stage of the pipeline",
+    )
+    parser.add_argument(
+        "--profile-report",
+        metavar="PATH",
+        help="write the pipeline profile to a JSON file",
+    )
     return parser
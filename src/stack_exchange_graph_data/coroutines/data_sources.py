@@ -1,49 +1,101 @@
 """Coroutines for converting from source data to internal data."""
 
-from typing import Dict, Generator, List, Optional
+import functools
+import pathlib
+from typing import Dict, Generator, List, Optional, Tuple, Type
+from xml.etree.ElementTree import Element
 
 import docutils.core
+import docutils.parsers
 from bs4 import BeautifulSoup
 
-from ..helpers import xref
-from ..helpers.coroutines import coroutine
+from ..helpers import html_links, markdown_links, xml_stream, xref
+from ..helpers.coroutines import Batch, coroutine
 from ..segd import graph, models
 
 
-@coroutine
-def load_posts(target: Generator) -> Generator:
-    """Read posts from external format into internal format."""
-    post_tags: Dict[str, List[str]] = {}
+#: Link types of the :code:`LinkTypeId` in :code:`PostLinks.xml`.
+POST_LINK_TYPES = {
+    "1": graph.LinkType.LINKED,
+    "3": graph.LinkType.DUPLICATE,
+}
+
+
+def parse_post(post: Element, scrape: bool = True) -> models.Post:
+    """
+    Convert a post from external format into internal format.
+
+    Answers don't have tags in the data dumps, and so their tags are
+    left as :code:`None` to be filled in by :func:`resolve_tags`.
+
+    :param post: Post row from the data dump.
+    :param scrape: Set to false to not extract links from the body.
+    """
+    parent_id: Optional[int]
+    try:
+        parent_id = int(post.get("ParentId"))
+    except (TypeError, ValueError):
+        parent_id = None
+
+    tags = None
+    if "Tags" in post.attrib:
+        tags = post.attrib["Tags"].strip("><").split("><")
+
+    return models.Post(
+        id=int(post.attrib["Id"]),
+        tags=tags,
+        links=html_links.find_links(post.attrib["Body"]) if scrape else [],
+        parent_id=parent_id,
+    )
+
+
+def parse_posts_range(
+    range_: Tuple[pathlib.Path, int, int], scrape: bool = True,
+) -> List[models.Post]:
+    """
+    Convert all posts in a byte range of a file into internal format.
+
+    This is ran in worker processes to parse a file in parallel.
+
+    :param range_: File location, and start and end offsets from
+                   :func:`stack_exchange_graph_data.helpers.xml_stream.split_rows`.
+    :param scrape: Set to false to not extract links from the bodies.
+    :return: Posts in the range, in the same order as the file.
+    """
+    return [parse_post(post, scrape) for post in xml_stream.iter_range_rows(*range_)]
+
+
+@coroutine(batch=True)
+def load_posts(target: Generator, scrape: bool = True) -> Generator:
+    """
+    Read posts from external format into internal format.
+
+    :param scrape: Set to false to not extract links from the bodies.
+    """
     while True:
-        post = yield
-        if post.attrib["PostTypeId"] not in {"1", "2"}:
-            pass
-
-        post_id = post.attrib["Id"]
-        parent_id: Optional[int]
-        try:
-            parent_id = int(post.get("ParentId"))
-        except (TypeError, ValueError):
-            parent_id = None
-
-        body = BeautifulSoup(post.attrib["Body"], features="html.parser")
-        if "Tags" in post.attrib:
-            post_tags[post_id] = tags = post.attrib["Tags"].strip("><").split("><")
-        else:
-            tags = post_tags.get(post.attrib.get("ParentId"))
+        target.send(Batch(parse_post(post, scrape) for post in (yield)))
 
-        target.send(
-            models.Post(
-                id=int(post_id),
-                body=body,
-                tags=tags,
-                links=[link.get("href") for link in body.find_all("a")],
-                parent_id=parent_id,
-            )
-        )
 
+@coroutine(batch=True)
+def resolve_tags(target: Generator) -> Generator:
+    """
+    Give answers the tags of their parent question.
+
+    A new batch is sent, the posts that are received aren't changed.
+    """
+    post_tags: Dict[int, List[str]] = {}
+    while True:
+        posts = Batch()
+        for post in (yield):
+            if post.tags is not None:
+                post_tags[post.id] = post.tags
+            elif post.parent_id is not None:
+                post = post._replace(tags=post_tags.get(post.parent_id))
+            posts.append(post)
+        target.send(posts)
 
-@coroutine
+
+@coroutine(batch=True)
 def get_post_links(link_target: Generator, node_target: Generator,) -> Generator:
     """
     Get all wanted data from posts.
@@ -54,45 +106,158 @@ def get_post_links(link_target: Generator, node_target: Generator,) -> Generator
     Includes all questions and answers in node output.
     """
     while True:
-        post = yield
-        node_target.send(post)
+        posts = yield
+        node_target.send(posts)
+
+        links = Batch()
+        for post in posts:
+            if post.parent_id is not None:
+                links.append((post.id, post.parent_id, graph.LinkType.QAA))
+                links.append((post.parent_id, post.id, graph.LinkType.QAA))
+
+            for link in post.links:
+                links.append((post.id, link, graph.LinkType.PL))
+        if links:
+            link_target.send(links)
 
-        if post.parent_id is not None:
-            link_target.send((post.id, post.parent_id, graph.LinkType.QAA))
-            link_target.send((post.parent_id, post.id, graph.LinkType.QAA))
 
-        for link in post.links:
-            link_target.send((post.id, link, graph.LinkType.PL))
+@functools.lru_cache()
+def _comment_parser(site_name: str) -> Type[docutils.parsers.Parser]:
+    """Get the Markdown parser for the site, building it only once."""
+    return xref.custom_parser(site_name)
 
 
-@coroutine
-def load_comments(site_name: str, target: Generator) -> Generator:
+def _render_links(site_name: str, text: str) -> List[str]:
+    """Get the links in a comment by rendering it with docutils."""
+    comment_as_html = BeautifulSoup(
+        docutils.core.publish_string(
+            source=text,
+            writer_name="html5",
+            parser=_comment_parser(site_name)(),
+            parser_name="md",
+        ).decode("UTF-8"),
+        features="html.parser",
+    )
+    body = comment_as_html.find("body")
+    return [link.get("href") for link in body.find_all("a")]
+
+
+def comment_links(
+    site_name: str, text: str, engine: str = "fast", bare_urls: bool = False,
+) -> List[str]:
+    """
+    Get the links in a comment.
+
+    :param site_name: Http base to prepend to partial hyperlinks.
+    :param text: Markdown text of the comment.
+    :param engine: :code:`fast` scans the Markdown for links, where
+                   :code:`docutils` renders the comment to HTML.
+    :param bare_urls: Include URLs that aren't marked up as links.
+                      Only supported by the :code:`fast` engine.
+    """
+    if engine == "docutils":
+        return _render_links(site_name, text)
+    return markdown_links.find_links(text, site_name, bare_urls)
+
+
+def parse_comment(
+    site_name: str,
+    post_id: str,
+    text: str,
+    engine: str = "fast",
+    bare_urls: bool = False,
+) -> models.Comment:
+    """
+    Convert a comment from external format into internal format.
+
+    :param site_name: Http base to prepend to partial hyperlinks.
+    :param post_id: Id of the post the comment is on.
+    :param text: Markdown text of the comment.
+    :param engine: Engine to get the links with, see :func:`comment_links`.
+    :param bare_urls: Include URLs that aren't marked up as links.
+    """
+    return models.Comment(
+        id=int(post_id),
+        links=comment_links(site_name, text, engine, bare_urls),
+    )
+
+
+def parse_comments(
+    site_name: str,
+    comments: List[Tuple[str, str]],
+    engine: str = "fast",
+    bare_urls: bool = False,
+) -> List[models.Comment]:
+    """
+    Convert a chunk of comments into internal format.
+
+    This is ran in worker processes to render comments in parallel.
+
+    :param site_name: Http base to prepend to partial hyperlinks.
+    :param comments: Post id and text of each comment.
+    :param engine: Engine to get the links with, see :func:`comment_links`.
+    :param bare_urls: Include URLs that aren't marked up as links.
+    :return: Comments in the same order as the input.
+    """
+    return [
+        parse_comment(site_name, post_id, text, engine, bare_urls)
+        for post_id, text in comments
+    ]
+
+
+@coroutine(batch=True)
+def load_comments(
+    site_name: str, target: Generator, engine: str = "fast", bare_urls: bool = False,
+) -> Generator:
     """Read comments from external format into internal format."""
     while True:
-        comment = yield
-        comment_as_html = BeautifulSoup(
-            docutils.core.publish_string(
-                source=comment.attrib["Text"],
-                writer_name="html5",
-                parser=xref.custom_parser(site_name)(),
-                parser_name="md",
-            ).decode("UTF-8"),
-            features="html.parser",
-        )
-        body = comment_as_html.find("body")
         target.send(
-            models.Comment(
-                id=int(comment.attrib["PostId"]),
-                body=body,
-                links=[link.get("href") for link in body.find_all("a")],
-            )
+            Batch(
+                parse_comment(
+                    site_name,
+                    comment.attrib["PostId"],
+                    comment.attrib["Text"],
+                    engine,
+                    bare_urls,
+                )
+                for comment in (yield)
+            ),
         )
 
 
-@coroutine
+@coroutine(batch=True)
 def get_comment_links(target: Generator) -> Generator:
     """Get all wanted links in comments."""
     while True:
-        comment = yield
-        for link in comment.links:
-            target.send((comment.id, link, graph.LinkType.CL))
+        links = Batch(
+            (comment.id, link, graph.LinkType.CL)
+            for comment in (yield)
+            for link in comment.links
+        )
+        if links:
+            target.send(links)
+
+
+@coroutine(batch=True)
+def load_post_links(target: Generator) -> Generator:
+    """
+    Read links from :code:`PostLinks.xml` into internal format.
+
+    Unlike scraping the post bodies, these links are already between
+    post ids and so don't need to be filtered.
+    """
+    while True:
+        links = Batch()
+        for post_link in (yield):
+            link_type = POST_LINK_TYPES.get(post_link.attrib["LinkTypeId"])
+            if link_type is None:
+                continue
+            links.append(
+                (
+                    int(post_link.attrib["PostId"]),
+                    int(post_link.attrib["RelatedPostId"]),
+                    link_type,
+                )
+            )
+        if links:
+            target.send(links)
@@ -1,103 +1,156 @@
 """Link coroutine control flow functions."""
 
 import argparse
-import collections
 import urllib.parse
-from typing import DefaultDict, Generator, List, Set
+from array import array
+from typing import Generator, List, Optional, Set
 
-from ..helpers.coroutines import coroutine
+from ..helpers.coroutines import BATCH_SIZE, Batch, batched, coroutine
 from ..segd import graph
 
 
-@coroutine
+@coroutine(batch=True)
 def handle_links(filter_: Generator, good: Generator) -> Generator:
     """Send http and id links to correct target."""
     while True:
-        orig_id, link, link_type = yield
-        target = filter_ if isinstance(link, str) else good
-        target.send((orig_id, link, link_type))
+        http_links = Batch()
+        id_links = Batch()
+        for link in (yield):
+            (http_links if isinstance(link[1], str) else id_links).append(link)
+        if http_links:
+            filter_.send(http_links)
+        if id_links:
+            good.send(id_links)
 
 
-@coroutine
-def filter_links(domains: Set[str], target: Generator) -> Generator:
-    """Filter links to links to posts on the provided site."""
-    while True:
-        orig_id, link, link_type = yield
-        url = urllib.parse.urlparse(link)
+def _link_target(domains: Set[str], link: str) -> Optional[int]:
+    """
+    Get the id of the post a link is to.
 
-        if url.netloc not in domains:
-            continue
+    :return: The post's id, or None if the link isn't to a post on the
+             provided site.
+    """
+    url = urllib.parse.urlparse(link)
 
-        segments: List[str] = url.path.split("/")
-        list_ = segments[1] if len(segments) >= 2 else None
-        post_id = segments[2] if len(segments) >= 3 else ""
-        if list_ not in {"questions", "a", "q"}:
-            continue
+    if url.netloc not in domains:
+        return None
 
-        if url.query:
-            try:
-                _, post_id = url.query.split("_", 1)
-                int(post_id)
-            except ValueError:
-                pass
+    segments: List[str] = url.path.split("/")
+    list_ = segments[1] if len(segments) >= 2 else None
+    post_id = segments[2] if len(segments) >= 3 else ""
+    if list_ not in {"questions", "a", "q"}:
+        return None
 
+    if url.query:
         try:
+            _, post_id = url.query.split("_", 1)
             int(post_id)
-        except (ValueError, TypeError):
-            continue
-        target.send((orig_id, post_id, link_type))
+        except ValueError:
+            pass
+
+    try:
+        return int(post_id)
+    except (ValueError, TypeError):
+        return None
+
+
+@coroutine(batch=True)
+def filter_links(domains: Set[str], target: Generator) -> Generator:
+    """Filter links to links to posts on the provided site."""
+    while True:
+        links = Batch()
+        for orig_id, link, link_type in (yield):
+            target_id = _link_target(domains, link)
+            if target_id is not None:
+                links.append((orig_id, target_id, link_type))
+        if links:
+            target.send(links)
 
 
-@coroutine
+@coroutine(batch=True)
 def filter_duplicates(target: Generator) -> Generator:
-    """Remove duplicate links from the output."""
-    link_lookup: DefaultDict[int, DefaultDict[int, Set[graph.LinkType]]]
-    link_lookup = collections.defaultdict(lambda: collections.defaultdict(set))
+    """
+    Remove duplicate links from the output.
+
+    Only the link type with the highest weight is kept for each pair of
+    posts. Links are output sorted by source and then target.
+    """
+    edges = graph.PackedEdges()
     try:
         while True:
-            from_node, to_node, link_type = yield
-            link_lookup[from_node][to_node].add(link_type)
+            for edge in (yield):
+                edges.add(*edge)
     finally:
-        for from_node, links_to in link_lookup.items():
-            for to_node, types in links_to.items():
-                target.send(
-                    (from_node, to_node, max(types, key=lambda i: i.value.weight),)
-                )
+        for batch in batched(edges):
+            target.send(batch)
 
 
-@coroutine
-def filter_network_size(arguments: argparse.Namespace, target: Generator,) -> Generator:
+@coroutine(batch=True)
+def filter_network_size(
+    arguments: argparse.Namespace,
+    target: Generator,
+    node_target: Optional[Generator] = None,
+) -> Generator:
     """
     Filter networks that aren't the wanted size.
 
+    Networks are found with a disjoint-set over the node ids, and the
+    edges are only stored in compact arrays until they're output. Edges
+    are output grouped by network, in the order they were received.
+
+    The networks that are output are numbered in the order they're
+    output, and a :class:`stack_exchange_graph_data.segd.graph.NetworkIndex`
+    of them is sent to the node target.
+
     :param arguments: CLI parser arguments that dictate the min and max size.
+    :param node_target: Target for the index of the output networks.
     """
-    graph_ = graph.Graph()
+    components = graph.DisjointSet()
+    link_types = list(graph.LinkType)
+    type_indexes = {link_type: i for i, link_type in enumerate(link_types)}
+    sources = array("q")
+    targets = array("q")
+    types = array("B")
     try:
         while True:
-            item = yield
-            graph_.add(*item)
+            for source, destination, link_type in (yield):
+                source = components.add(source)
+                destination = components.add(destination)
+                components.union(source, destination)
+                sources.append(source)
+                targets.append(destination)
+                types.append(type_indexes[link_type])
     finally:
-        for network in graph_.get_networks():
-            if not arguments.min <= len(network) <= arguments.max:
+        networks, sizes = components.networks()
+        values = components.values
+        keep = array("q", [-1]) * len(sizes)
+        kept_sizes = array("q")
+        for network, size in enumerate(sizes):
+            if arguments.min <= size <= arguments.max:
+                keep[network] = len(kept_sizes)
+                kept_sizes.append(size)
+        output = Batch()
+        for edge in graph.counting_sort(
+            (networks[source] for source in sources), len(sizes),
+        ):
+            source = sources[edge]
+            if keep[networks[source]] == -1:
                 continue
-            for node in network:
-                for link in node.links:
-                    edge_type = link.type.value
-                    target.send(
-                        (
-                            node.value,
-                            link.target.value,
-                            edge_type.weight,
-                            edge_type.type,
-                        )
-                    )
-
-
-@coroutine
-def sheet_prep(target: Generator) -> Generator:
-    """Convert into the format required to be sent to disk."""
-    target.send("Source;Target;Weight;Type\n")
-    while True:
-        edge = yield
-        target.send(";".join(map(str, edge)) + "\n")
+            edge_type = link_types[types[edge]].value
+            output.append(
+                (
+                    values[source],
+                    values[targets[edge]],
+                    edge_type.weight,
+                    edge_type.type,
+                )
+            )
+            if len(output) >= BATCH_SIZE:
+                target.send(output)
+                output = Batch()
+        if output:
+            target.send(output)
+        if node_target is not None:
+            node_target.send(
+                graph.NetworkIndex.from_networks(values, networks, keep, kept_sizes),
+            )
@@ -1,27 +1,136 @@
 """Node control flow coroutines."""
 
-import collections
-from typing import Generator
+import argparse
+from array import array
+from typing import Dict, Generator, List, Tuple
 
-from ..helpers.coroutines import coroutine
+from ..helpers.coroutines import BATCH_SIZE, Batch, coroutine
+from ..segd import graph
 
+TOP_TAGS = 36
 
-@coroutine
-def handle_nodes(target: Generator) -> Generator:
-    """Send all posts to the output, with information about the top 36 tags."""
-    nodes = []
+
+class _TagStore:
+    """
+    Compact store of the tags of each post.
+
+    Tags are interned to ids, in the order they're first seen, and the
+    ids of each post's tags are stored back to back in a single array.
+    This keeps a few bytes per post rather than the entire post.
+    """
+
+    names: List[str]
+    ids: Dict[str, int]
+
+    def __init__(self) -> None:
+        """Initialize _TagStore."""
+        self.names = []
+        self.ids = {}
+        self.counts = array("Q")
+        self.posts = array("q")
+        self.offsets = array("Q", [0])
+        self.tags = array("L")
+
+    def add(self, post_id: int, tags: List[str]) -> None:
+        """Add a post and count its tags."""
+        for tag in tags:
+            tag_id = self.ids.get(tag)
+            if tag_id is None:
+                tag_id = self.ids[tag] = len(self.names)
+                self.names.append(tag)
+                self.counts.append(0)
+            self.counts[tag_id] += 1
+            self.tags.append(tag_id)
+        self.posts.append(post_id)
+        self.offsets.append(len(self.tags))
+
+    def most_common(self, amount: int) -> List[int]:
+        """
+        Get the ids of the most common tags.
+
+        Ties are ordered by when the tag was first seen, the same as
+        :meth:`collections.Counter.most_common`.
+        """
+        order = sorted(
+            range(len(self.counts)), key=self.counts.__getitem__, reverse=True,
+        )
+        return order[:amount]
+
+    def masks(self, tag_ids: List[int]) -> array:
+        """
+        Build a bitmask per post of which of the tags it has.
+
+        :param tag_ids: Tags to include, bit n is set if a post has the
+                        nth tag.
+        :return: The bitmask of each post.
+        """
+        bits = array("Q", [0]) * len(self.names)
+        for index, tag_id in enumerate(tag_ids):
+            bits[tag_id] = 1 << index
+        masks = array("Q", [0]) * len(self.posts)
+        offsets = self.offsets
+        tags = self.tags
+        for post in range(len(self.posts)):
+            mask = 0
+            for i in range(offsets[post], offsets[post + 1]):
+                mask |= bits[tags[i]]
+            masks[post] = mask
+        return masks
+
+
+def _mask_columns(mask: int, amount: int) -> Tuple[str, ...]:
+    """Get the columns of a tag bitmask."""
+    return tuple(str(bool(mask >> i & 1)) for i in range(amount))
+
+
+@coroutine(batch=True)
+def handle_nodes(arguments: argparse.Namespace, target: Generator) -> Generator:
+    """
+    Send posts in the wanted networks to the output.
+
+    Posts are output as rows with their network, the network's size and
+    information about the top 36 tags. The first row is the header.
+
+    The networks are received as a
+    :class:`stack_exchange_graph_data.segd.graph.NetworkIndex` from
+    :func:`stack_exchange_graph_data.coroutines.links.filter_network_size`.
+    Posts that aren't in the index have no links, and so are their own
+    network of size 1.
+
+    :param arguments: CLI parser arguments that dictate the min and max size.
+    """
+    store = _TagStore()
+    index = graph.NetworkIndex(array("q"), array("q"), array("q"))
     try:
         while True:
-            nodes.append((yield))
+            for node in (yield):
+                if isinstance(node, graph.NetworkIndex):
+                    index = node
+                    continue
+                store.add(node.id, node.tags or [])
     finally:
-        tags = collections.Counter(tag for node in nodes for tag in node.tags or [])
-        top_tags = [t for t, _ in tags.most_common(36)]
-        target.send(";".join(["Id"] + top_tags) + "\n")
-        for node in nodes:
-            target.send(
-                ";".join(
-                    [str(node.id)]
-                    + [str(tag in (node.tags or [])) for tag in top_tags],
-                )
-                + "\n",
-            )
+        top_tags = store.most_common(TOP_TAGS)
+        target.send(
+            ("Id", "Network", "Network Size") + tuple(store.names[t] for t in top_tags),
+        )
+        isolated = arguments.min <= 1 <= arguments.max
+        next_network = len(index.sizes)
+        columns: Dict[int, Tuple[str, ...]] = {}
+        output = Batch()
+        for post_id, mask, network in zip(
+            store.posts, store.masks(top_tags), index.join(store.posts),
+        ):
+            if network is None:
+                if not isolated:
+                    continue
+                network = next_network, 1
+                next_network += 1
+            tags = columns.get(mask)
+            if tags is None:
+                tags = columns[mask] = _mask_columns(mask, len(top_tags))
+            output.append((post_id,) + network + tags)
+            if len(output) >= BATCH_SIZE:
+                target.send(output)
+                output = Batch()
+        if output:
+            target.send(output)
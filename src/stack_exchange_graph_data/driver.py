@@ -12,8 +12,8 @@ The entire control flow of the coroutines is:
 .. graphviz::
 
     digraph G {
-        file_sink_l [label="file_sink"];
-        file_sink_n [label="file_sink"];
+        csv_sink_l [label="csv_sink"];
+        csv_sink_n [label="csv_sink"];
 
         subgraph cluster_0 {
             label="links_driver";
@@ -24,9 +24,8 @@ The entire control flow of the coroutines is:
                 filter_links;
                 filter_duplicates;
                 filter_network_size;
-                sheet_prep;
 
-            sheet_prep -> file_sink_l;
+            filter_network_size -> csv_sink_l;
         }
 
         subgraph cluster_1 {
@@ -36,7 +35,7 @@ The entire control flow of the coroutines is:
             node [color="#FFE050"];
                 handle_nodes;
 
-            handle_nodes -> file_sink_n;
+            handle_nodes -> csv_sink_n;
         }
 
         subgraph cluster_2 {
@@ -45,53 +44,208 @@ The entire control flow of the coroutines is:
 
             node [color="#05930C"];
                 load_posts;
+                resolve_tags;
                 get_post_links;
                 load_comments;
                 get_comment_links;
+                load_post_links;
         }
 
         handle_links -> filter_links -> filter_duplicates
-            -> filter_network_size -> sheet_prep;
+            -> filter_network_size;
         handle_links -> filter_duplicates;
+        filter_network_size -> handle_nodes;
 
-        load_posts -> get_post_links -> {handle_links, handle_nodes};
+        load_posts -> resolve_tags -> get_post_links
+            -> {handle_links, handle_nodes};
         load_comments -> get_comment_links -> handle_links;
+        load_post_links -> handle_links;
     }
 
 """
 
 import argparse
+import functools
+import os
 import pathlib
-from typing import Generator, Optional
+from typing import (
+    IO,
+    Any,
+    Callable,
+    ContextManager,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+from xml.etree.ElementTree import Element
 
 from defusedxml import ElementTree
 
 from .coroutines import data_sources as ds
 from .coroutines import links, nodes
-from .helpers import coroutines, progress
-from .segd import cache, file_system, site_info
+from .helpers import (
+    async_pipeline,
+    coroutines,
+    parallel,
+    profiling,
+    progress,
+    xml_stream,
+)
+from .segd import cache, file_system, models, site_info
+
+#: Approximate size of the ranges of rows parsed in worker processes.
+SHARD_SIZE = 16 * 1024 * 1024
+#: Amount of comments sent to a worker process at a time.
+COMMENT_CHUNK_SIZE = 256
+
+# nosa(1): pylint[:Class name "T" doesn't conform to PascalCase naming style]
+T = TypeVar("T")
+Delegator = Union[coroutines.CoroutineDelegator, async_pipeline.Delegator]
+#: A file's location, or an opener of the file such as a file in an archive.
+Source = Union[pathlib.Path, ContextManager[IO[bytes]]]
+
+
+def _stream_xml(
+    file_path: Source, progress_message: Optional[str] = None,
+) -> Iterator[Element]:
+    """Stream rows from an xml file with a progress bar of the bytes read."""
+    opener = file_path.open("rb") if isinstance(file_path, pathlib.Path) else file_path
+    with opener as file_obj:
+        size = getattr(file_obj, "size", None)
+        if size is None:
+            size = os.fstat(file_obj.fileno()).st_size
+        yield from progress.ByteProgressStream(
+            xml_stream.iter_rows(file_obj),
+            file_obj.tell,
+            size,
+            prefix="  ",
+            message=progress_message,
+        )
 
 
 def load_xml_stream(
-    file_path: pathlib.Path, progress_message: Optional[str] = None
-) -> progress.ItemProgressStream:
-    """Load an iterable xml file with a progress bar."""
+    file_path: Source,
+    progress_message: Optional[str] = None,
+    stream: bool = False,
+) -> Iterator[Element]:
+    """
+    Load an iterable xml file with a progress bar.
+
+    :param file_path: Location of the xml file, or the opened xml file
+                      which is always parsed incrementally.
+    :param progress_message: Message to display above the progress bar.
+    :param stream: Parse the file incrementally rather than loading the
+                   entire tree into memory. As the amount of rows isn't
+                   known upfront progress is measured by the bytes read.
+    """
+    if stream or not isinstance(file_path, pathlib.Path):
+        return _stream_xml(file_path, progress_message)
     all_posts = ElementTree.parse(file_path).getroot()
     return progress.ItemProgressStream(
         all_posts, len(all_posts), prefix="  ", message=progress_message,
     )
 
 
+def load_posts_parallel(
+    file_path: pathlib.Path,
+    jobs: int,
+    progress_message: Optional[str] = None,
+    scrape: bool = True,
+) -> Iterator[models.Post]:
+    """
+    Load posts by parsing the xml file in worker processes.
+
+    The file is split into ranges of rows which are parsed, and have
+    their links extracted, in parallel. The posts are yielded in the
+    same order as the file, so the output is the same as parsing the
+    file in a single process.
+
+    :param file_path: Location of the posts xml file.
+    :param jobs: Amount of worker processes.
+    :param progress_message: Message to display above the progress bar.
+    :param scrape: Set to false to not extract links from the bodies.
+    """
+    size = file_path.stat().st_size
+    ranges = [
+        (file_path, start, end)
+        for start, end in xml_stream.split_rows(
+            file_path, max(4 * jobs, size // SHARD_SIZE),
+        )
+    ]
+    position = 0
+
+    def parsed() -> Iterator[models.Post]:
+        nonlocal position
+        posts_ranges = parallel.imap(
+            functools.partial(ds.parse_posts_range, scrape=scrape), ranges, jobs,
+        )
+        for (_, _, end), posts in zip(ranges, posts_ranges):
+            position = end
+            yield from posts
+
+    return progress.ByteProgressStream(
+        parsed(), lambda: position, size, prefix="  ", message=progress_message,
+    )
+
+
+def load_comments_parallel(
+    comments: Iterable[Element],
+    site_name: str,
+    jobs: int,
+    engine: str = "fast",
+    bare_urls: bool = False,
+) -> Iterator[models.Comment]:
+    """
+    Load comments by rendering them in worker processes.
+
+    Comments are sent to the workers in chunks, and only a bounded
+    amount of chunks are in flight at any one time. The comments are
+    yielded in the same order as the input.
+
+    :param comments: Comment rows from the xml file.
+    :param site_name: Http base to prepend to partial hyperlinks.
+    :param jobs: Amount of worker processes.
+    :param engine: Engine to get the links with, see
+                   :func:`.data_sources.comment_links`.
+    :param bare_urls: Include URLs that aren't marked up as links.
+    """
+    chunks = parallel.chunked(
+        ((comment.attrib["PostId"], comment.attrib["Text"]) for comment in comments),
+        COMMENT_CHUNK_SIZE,
+    )
+    for chunk in parallel.imap(
+        functools.partial(
+            ds.parse_comments, site_name, engine=engine, bare_urls=bare_urls,
+        ),
+        chunks,
+        jobs,
+    ):
+        yield from chunk
+
+
 def links_driver(
-    arguments: argparse.Namespace, _site_info: site_info.SiteInfo,
+    arguments: argparse.Namespace,
+    _site_info: site_info.SiteInfo,
+    node_target: Optional[Generator] = None,
 ) -> Generator:
-    """Build the control flow for links."""
+    """
+    Build the control flow for links.
+
+    :param node_target: Target for the networks that are output.
+    """
     links_mid = links.filter_duplicates(
         links.filter_network_size(
             arguments,
-            links.sheet_prep(
-                coroutines.file_sink(arguments.output + ".edges.csv", "w"),
+            coroutines.csv_sink(
+                arguments.output + ".edges.csv",
+                ("Source", "Target", "Weight", "Type"),
+                compression=arguments.compress,
             ),
+            node_target,
         ),
     )
     return links.handle_links(
@@ -106,36 +260,202 @@ def links_driver(
 def nodes_driver(arguments: argparse.Namespace) -> Generator:
     """Build the control flow for nodes."""
     return nodes.handle_nodes(
-        coroutines.file_sink(arguments.output + ".nodes.csv", "w"),
+        arguments,
+        coroutines.csv_sink(
+            arguments.output + ".nodes.csv", compression=arguments.compress,
+        ),
     )
 
 
+def _deferred(
+    function: Callable[..., Iterable[T]], path: Callable[[], Source], *args: Any,
+) -> Iterator[T]:
+    """
+    Lazily read a file from the cache.
+
+    Neither getting the file, which may download and extract it, nor
+    calling the function happens until the first item is wanted. So when
+    sources are ran concurrently this happens in the source's thread.
+
+    :param function: Function to read the file with, called with the
+                     file's location and args.
+    :param path: Function to get the file's location, or to open it.
+    """
+    yield from function(path(), *args)
+
+
+def _parallel_posts(arguments: argparse.Namespace) -> bool:
+    """
+    Check if the posts are parsed in worker processes.
+
+    The workers read ranges of the extracted file, so with
+    :code:`--no-extract` the posts are parsed in a single process.
+    """
+    return arguments.jobs > 1 and not arguments.no_extract
+
+
+def send_posts(
+    coroutine_delegator: Delegator,
+    posts_path: Callable[[], Source],
+    arguments: argparse.Namespace,
+    target: Generator,
+) -> None:
+    """
+    Send the posts, in internal format, to the target.
+
+    Parsing the posts in parallel needs the extracted file, so posts_path
+    should give its location when :func:`_parallel_posts` is true.
+    """
+    scrape = arguments.link_source != "postlinks"
+    if _parallel_posts(arguments):
+        coroutine_delegator.send_to(
+            _deferred(
+                load_posts_parallel,
+                posts_path,
+                arguments.jobs,
+                "Extracting data from posts.",
+                scrape,
+            ),
+            target,
+        )
+    else:
+        coroutine_delegator.send_to(
+            _deferred(
+                load_xml_stream,
+                posts_path,
+                "Extracting data from posts.",
+                arguments.stream,
+            ),
+            ds.load_posts(target, scrape),
+        )
+
+
+def send_comments(
+    coroutine_delegator: Delegator,
+    comments_path: Callable[[], Source],
+    arguments: argparse.Namespace,
+    _site_info: site_info.SiteInfo,
+    target: Generator,
+) -> None:
+    """Send the comments, in internal format, to the target."""
+    all_comments = _deferred(
+        load_xml_stream,
+        comments_path,
+        "Extracting data from comments.",
+        arguments.stream,
+    )
+    if arguments.jobs > 1:
+        coroutine_delegator.send_to(
+            load_comments_parallel(
+                all_comments,
+                _site_info.url,
+                arguments.jobs,
+                arguments.comment_engine,
+                arguments.bare_urls,
+            ),
+            target,
+        )
+    else:
+        coroutine_delegator.send_to(
+            all_comments,
+            ds.load_comments(
+                _site_info.url,
+                target,
+                arguments.comment_engine,
+                arguments.bare_urls,
+            ),
+        )
+
+
 def navigate(
     _file_system: file_system.FileSystem, arguments: argparse.Namespace,
-) -> None:
-    """Build and navigate the coroutine control flow."""
+) -> site_info.SiteInfo:
+    """
+    Build and navigate the coroutine control flow.
+
+    Links between posts are scraped from the posts' and comments' bodies,
+    read from :code:`PostLinks.xml`, or both depending on the
+    :code:`--link-source` argument.
+
+    With :code:`--concurrent` each file is read in its own thread. The
+    links and nodes control flows are shared by the threads, and so are
+    entered through a
+    :class:`stack_exchange_graph_data.helpers.coroutines.Merge`.
+
+    With :code:`--asyncio` each file is also read in its own thread, but
+    the control flow is ran by
+    :class:`stack_exchange_graph_data.helpers.async_pipeline.Delegator`.
+
+    Files are only downloaded and extracted once they're read from. With
+    :code:`--no-extract` files that haven't been extracted are parsed
+    straight out of the archive instead. The posts are then parsed in a
+    single process, as parsing them in parallel needs the extracted
+    file, but :code:`--jobs` still renders the comments in parallel.
+
+    :return: Information of the site that was navigated.
+    """
     _site_info = _file_system.get_site_info(
         arguments.site_name, not arguments.download,
     )
-    _links = links_driver(arguments, _site_info)
-    coroutine_delegator = coroutines.CoroutineDelegator()
-    coroutine_delegator.send_to(
-        load_xml_stream(
-            _file_system.get_site_file(
-                _site_info, "Posts.xml", not arguments.download,
-            ),
-            "Extracting data from posts.",
-        ),
-        ds.load_posts(ds.get_post_links(_links, nodes_driver(arguments))),
+    _nodes = nodes_driver(arguments)
+    if arguments.concurrent:
+        _nodes = coroutines.Merge(_nodes)
+    _links = links_driver(arguments, _site_info, _nodes)
+    if arguments.concurrent:
+        _links = coroutines.Merge(_links)
+    coroutine_delegator: Delegator
+    if arguments.asyncio:
+        coroutine_delegator = async_pipeline.Delegator()
+    else:
+        coroutine_delegator = coroutines.CoroutineDelegator(
+            concurrent=arguments.concurrent,
+        )
+    site_file = (
+        _file_system.open_site_file
+        if arguments.no_extract
+        else _file_system.get_site_file
     )
-    coroutine_delegator.send_to(
-        load_xml_stream(
-            _file_system.get_site_file(_site_info, "Comments.xml",),
-            "Extracting data from comments.",
+    send_posts(
+        coroutine_delegator,
+        functools.partial(
+            _file_system.get_site_file if _parallel_posts(arguments) else site_file,
+            _site_info,
+            "Posts.xml",
+            not arguments.download,
         ),
-        ds.load_comments(_site_info.url, ds.get_comment_links(_links)),
+        arguments,
+        ds.resolve_tags(ds.get_post_links(_links, _nodes)),
     )
+    if arguments.link_source != "postlinks":
+        send_comments(
+            coroutine_delegator,
+            functools.partial(site_file, _site_info, "Comments.xml"),
+            arguments,
+            _site_info,
+            ds.get_comment_links(_links),
+        )
+    if arguments.link_source != "scrape":
+        coroutine_delegator.send_to(
+            _deferred(
+                load_xml_stream,
+                functools.partial(site_file, _site_info, "PostLinks.xml"),
+                "Extracting data from post links.",
+                arguments.stream,
+            ),
+            ds.load_post_links(_links),
+        )
     coroutine_delegator.run()
+    return _site_info
+
+
+def site_files(arguments: argparse.Namespace) -> List[str]:
+    """Get the files in the data dump read by :func:`navigate`."""
+    files = ["Posts.xml"]
+    if arguments.link_source != "postlinks":
+        files.append("Comments.xml")
+    if arguments.link_source != "scrape":
+        files.append("PostLinks.xml")
+    return files
 
 
 def main(arguments):
@@ -143,6 +463,24 @@ def main(arguments):
         cache.Cache(
             pathlib.Path(arguments.cache_dir),
             "https://archive.org/download/stackexchange/",
+            site_files(arguments),
+            arguments.jobs,
+            arguments.revalidate,
+            arguments.verify,
+            arguments.cache_budget,
         )
     )
-    navigate(file_system_, arguments)
+    profiler = None
+    if arguments.profile or arguments.profile_report:
+        profiler = profiling.enable()
+    try:
+        _site_info = navigate(file_system_, arguments)
+        file_system_.cache.evict([_site_info])
+    finally:
+        file_system_.cache.close()
+    if profiler is not None:
+        profiling.disable()
+        if arguments.profile:
+            print(profiler.report())
+        if arguments.profile_report:
+            profiler.dump(arguments.profile_report)
@@ -0,0 +1,192 @@
+"""
+Run coroutine pipelines on asyncio.
+
+The coroutines in :mod:`stack_exchange_graph_data.helpers.coroutines`
+are push based, and :class:`coroutines.CoroutineDelegator` pulls from
+one source at a time. So getting the data for a source, which may
+download and extract an archive, doesn't overlap with processing the
+data of another.
+
+Here each source is pulled from in its own worker thread, and the
+batches of items are put into a bounded :class:`asyncio.Queue`. The
+items are then pushed into the existing magic coroutines from the event
+loop. This means:
+
+- Downloading, decompressing and parsing run in the worker threads,
+  and overlap with each other and the stages.
+- A source can only get :data:`QUEUE_SIZE` batches ahead of the stages,
+  so memory stays bounded when the stages are slower than the sources.
+- Only the event loop sends to the magic coroutines, so stages shared
+  by multiple sources don't need a :class:`coroutines.Merge`.
+
+Stages written with :code:`async def` can also be used, these take the
+queue to read from as their first argument. :func:`broadcast` and
+:func:`file_sink` are the equivalents of the coroutine versions.
+"""
+
+import asyncio
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Generator, Iterable, List, Tuple, Union
+
+from . import coroutines
+
+__all__ = [
+    "QUEUE_SIZE",
+    "END",
+    "Delegator",
+    "broadcast",
+    "file_sink",
+]
+
+#: Maximum amount of batches waiting in a queue.
+QUEUE_SIZE = 8
+#: Put into a queue after the last item.
+END = object()
+
+Consumer = Callable[[asyncio.Queue], Awaitable[Any]]
+Target = Union[Generator, Consumer]
+
+
+async def _produce(
+    source: Iterable,
+    queue: asyncio.Queue,
+    batch_size: int,
+    executor: concurrent.futures.Executor,
+) -> None:
+    """Put batches of the source's items into the queue."""
+    loop = asyncio.get_running_loop()
+    batches = coroutines.batched(source, batch_size)
+    while True:
+        batch = await loop.run_in_executor(executor, next, batches, None)
+        if batch is None:
+            break
+        await queue.put(batch)
+    await queue.put(END)
+
+
+async def _consume(queue: asyncio.Queue, target: Generator) -> None:
+    """Send the items in the queue to a coroutine."""
+    magic = coroutines._is_magic_coroutine(target)
+    try:
+        while True:
+            batch = await queue.get()
+            if batch is END:
+                break
+            if magic:
+                target.send(batch)
+            else:
+                for item in batch:
+                    target.send(item)
+    except StopIteration:
+        return
+    if magic:
+        target.send(coroutines.EXIT)
+
+
+async def broadcast(queue: asyncio.Queue, *queues: asyncio.Queue) -> None:
+    """
+    Broadcast batches to queues.
+
+    Each batch waits until there's space in every queue, so the slowest
+    consumer sets the pace.
+    """
+    while True:
+        batch = await queue.get()
+        for queue_ in queues:
+            await queue_.put(batch)
+        if batch is END:
+            return
+
+
+async def file_sink(queue: asyncio.Queue, *args: Any, **kwargs: Any) -> None:
+    """
+    Write batches of strings to a file.
+
+    Writing happens in a worker thread so it doesn't block the event
+    loop.
+
+    :param args&kwargs: Passed to :func:`open`.
+    """
+    loop = asyncio.get_running_loop()
+    with open(*args, **kwargs) as file_obj:
+        while True:
+            batch = await queue.get()
+            if batch is END:
+                return
+            await loop.run_in_executor(None, file_obj.write, "".join(batch))
+
+
+class Delegator:
+    """
+    Delegate sources to coroutines on asyncio.
+
+    Exposes the same interface as :class:`coroutines.CoroutineDelegator`.
+    """
+
+    _queue: List[Tuple[Iterable, Target]]
+
+    def __init__(
+        self, batch_size: int = coroutines.BATCH_SIZE, queue_size: int = QUEUE_SIZE,
+    ) -> None:
+        """
+        Initialize Delegator.
+
+        :param batch_size: Amount of items taken from a source at a time.
+        :param queue_size: Maximum amount of batches a source can be
+                           ahead of its target.
+        """
+        self._queue = []
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+    def send_to(self, source: Iterable, target: Target) -> None:
+        """
+        Add a source and target to send data to.
+
+        This does not send any data into the target, to do that use the
+        :meth:`Delegator.run` function.
+
+        :param source: Input data, can be any iterable. It's iterated in
+                       a worker thread, so lazy iterables can do blocking
+                       work such as downloading.
+        :param target: A coroutine, or an async function that takes the
+                       queue of batches to read from.
+        """
+        self._queue.append((source, target))
+
+    async def run_async(self) -> None:
+        """Send all data into the targets, on the running event loop."""
+        for _, target in self._queue:
+            if coroutines._is_magic_coroutine(target):
+                target.send(coroutines.NEW_SOURCE)
+
+        tasks: List[asyncio.Future] = []
+        with concurrent.futures.ThreadPoolExecutor(len(self._queue) or 1) as executor:
+            for source, target in self._queue:
+                queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+                producer = asyncio.ensure_future(
+                    _produce(source, queue, self.batch_size, executor),
+                )
+                if hasattr(target, "send"):
+                    consumer = asyncio.ensure_future(_consume(queue, target))
+                else:
+                    consumer = asyncio.ensure_future(target(queue))
+                # If the consumer stops early the producer could be stuck
+                # waiting for space in the queue.
+                consumer.add_done_callback(lambda _, task=producer: task.cancel())
+                tasks += [producer, consumer]
+            self._queue = []
+            try:
+                done, _ = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_EXCEPTION,
+                )
+                for task in done:
+                    if not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def run(self) -> None:
+        """Send all data into the targets, in a new event loop."""
+        asyncio.run(self.run_async())
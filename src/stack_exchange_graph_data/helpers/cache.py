@@ -5,31 +5,134 @@ Exposes two forms of cache:
 
 1. A file that is downloaded from a website.
 2. A 7z archive cache - files that are extracted from a 7z archive.
+   These can also be read straight out of the archive, without being
+   extracted.
+
+All downloads made through a :class:`Cache` share a single pooled HTTP
+session, so connections to the same host are reused. Multiple files can
+be downloaded at once with :meth:`Cache.prefetch`.
+
+Files are recorded in a :class:`manifest.Manifest` as they're written,
+with their size and a digest made whilst writing. Before a cached file
+is used its size is checked against the manifest, or with :code:`rehash`
+it's hashed again, so truncated or corrupt files are fetched again.
+Files cached before the manifest existed aren't recorded, and are used
+as is.
+
+A :class:`Cache` can be given a budget, and :meth:`Cache.evict` then
+removes the least recently used files until the recorded files fit in
+it. Files extracted from an archive are removed first, as they can be
+extracted again without downloading anything. Only recorded files are
+counted and removed, so eviction never has to walk the cache directory.
+
+The ETag, Last-Modified and size of downloaded files are saved next to
+them. When revalidating, these are sent in a conditional request to
+check if the file has changed, so only changed files are downloaded
+again. Files extracted from an archive are extracted again if the
+archive is newer than them.
 """
 
+import collections
+import concurrent.futures
+import contextlib
+import json
 import pathlib
+import threading
+from typing import (
+    IO,
+    Any,
+    Collection,
+    DefaultDict,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Union,
+)
 
-# nosa(1): pylint,mypy
-import py7zlib
+# nosa(1): pylint
+import requests
 
-from . import curl, si
+from . import curl, files, manifest, progress, sevenzip, si
+
+_LOCKS: DefaultDict[pathlib.Path, threading.RLock] = collections.defaultdict(
+    threading.RLock,
+)
+_LOCKS_LOCK = threading.Lock()
+
+
+def _lock(path: pathlib.Path) -> threading.RLock:
+    """
+    Get the lock for a path in the cache.
+
+    Allows multiple threads to ensure the same file, without all of
+    them downloading or extracting it.
+    """
+    with _LOCKS_LOCK:
+        return _LOCKS[path.absolute()]
+
+
+def _metadata_path(path: pathlib.Path) -> pathlib.Path:
+    """Location of the metadata of a downloaded file."""
+    return path.with_name(path.name + ".meta.json")
+
+
+def _extracted_from(path: pathlib.Path, archive: pathlib.Path) -> bool:
+    """Check a file has been extracted from the current archive."""
+    return path.exists() and path.stat().st_mtime >= archive.stat().st_mtime
 
 
 class CacheMethod:
     """Base cache object."""
 
-    def __init__(self, cache_path: pathlib.Path) -> None:
-        """Initialize CacheMethod."""
+    #: Check the cached file is up to date when ensuring it.
+    revalidate = False
+
+    def __init__(
+        self,
+        cache_path: pathlib.Path,
+        manifest_: Optional[manifest.Manifest] = None,
+        rehash: bool = False,
+    ) -> None:
+        """
+        Initialize CacheMethod.
+
+        :param cache_path: Location of the cached file.
+        :param manifest_: Manifest to record and check the file with.
+        :param rehash: Hash the cached file to check it, rather than only
+                       checking its size.
+        """
         self.cache_path = cache_path
+        self.manifest = manifest_
+        self.rehash = rehash
 
     def _is_cached(self, use_cache: bool) -> bool:
         """
         Check if the target exist in the cache.
 
+        If the file is in the manifest it also has to match its record.
+
         :param use_cache: Set to false to force redownload the data.
         :return: True if we should use the cache.
         """
-        return use_cache and self.cache_path.exists()
+        if not (use_cache and self.cache_path.exists()):
+            return False
+        if self.manifest is None:
+            return True
+        matches = self.manifest.check(self.cache_path, self.rehash)
+        if matches is False:
+            print(f"Cached file doesn't match the manifest: {self.cache_path}")
+            return False
+        if matches:
+            self.manifest.touch(self.cache_path)
+        return True
+
+    def _record(self, digest: str, source: Union[str, pathlib.Path]) -> None:
+        """Record the cached file in the manifest, if there is one."""
+        if self.manifest is not None:
+            self.manifest.record(self.cache_path, digest, source)
 
     def ensure(self, use_cache: bool = True) -> pathlib.Path:
         """
@@ -46,10 +149,112 @@ class CacheMethod:
 class FileCache(CacheMethod):
     """Exposes a cache that allows downloading files."""
 
-    def __init__(self, cache_path: pathlib.Path, url: str) -> None:
-        """Initialize FileCache."""
-        super().__init__(cache_path)
+    def __init__(
+        self,
+        cache_path: pathlib.Path,
+        url: str,
+        session: Optional[requests.Session] = None,
+        revalidate: bool = False,
+        manifest_: Optional[manifest.Manifest] = None,
+        rehash: bool = False,
+    ) -> None:
+        """
+        Initialize FileCache.
+
+        :param cache_path: Location of the downloaded file.
+        :param url: URL location of the file to download.
+        :param session: Session to download with, a new one each
+                        download if None.
+        :param revalidate: Check the cached file is the same as the file
+                           on the server when ensuring it.
+        :param manifest_: Manifest to record and check the file with.
+        :param rehash: Hash the cached file to check it.
+        """
+        super().__init__(cache_path, manifest_, rehash)
         self.url = url
+        self.session = session
+        self.revalidate = revalidate
+
+    @property
+    def metadata_path(self) -> pathlib.Path:
+        """Location of the metadata of the cached file."""
+        return _metadata_path(self.cache_path)
+
+    def metadata(self) -> Dict[str, Any]:
+        """
+        Get the metadata the server sent about the cached file.
+
+        :return: The file's :code:`etag`, :code:`last_modified` and
+                 :code:`size`. Empty if there's no saved metadata.
+        """
+        try:
+            with self.metadata_path.open() as file_obj:
+                return json.load(file_obj)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_metadata(self, headers: Mapping[str, str]) -> None:
+        """Save the metadata of the cached file from the server's headers."""
+        with files.atomic_open(self.metadata_path, "w") as file_obj:
+            json.dump(
+                {
+                    "etag": headers.get("etag"),
+                    "last_modified": headers.get("last-modified"),
+                    "size": self.cache_path.stat().st_size,
+                },
+                file_obj,
+            )
+
+    def is_stale(self) -> bool:
+        """
+        Check if the file on the server has changed since it was cached.
+
+        Files that no longer have the size they were downloaded with are
+        stale. Otherwise a conditional HEAD request is made with the saved
+        ETag and Last-Modified. Servers that ignore the conditions are checked by
+        comparing the headers themselves. Files cached without metadata
+        are only treated as up to date if their size matches, which
+        saves the metadata for next time.
+
+        :return: True if the file should be downloaded again.
+        """
+        metadata = self.metadata()
+        size = self.cache_path.stat().st_size
+        if metadata and metadata.get("size") != size:
+            return True
+        headers = {}
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+        response = (self.session or requests).head(
+            self.url, headers=headers, allow_redirects=True,
+        )
+        if response.status_code == requests.codes.not_modified:
+            return False
+        response.raise_for_status()
+        length = response.headers.get("content-length")
+        if length is not None and int(length) != size:
+            return True
+        if not metadata:
+            self._save_metadata(response.headers)
+            return False
+        return any(
+            metadata.get(key) != response.headers.get(header)
+            for key, header in [("etag", "etag"), ("last_modified", "last-modified")]
+            if metadata.get(key) or response.headers.get(header)
+        )
+
+    def _downloaded(self, download: curl.Download) -> None:
+        """Record a finished download of the file."""
+        self._save_metadata(download.headers)
+        self._record(download.hasher.hexdigest(self.cache_path), self.url)
+
+    def _needs_download(self, use_cache: bool) -> bool:
+        """Check if the file isn't cached, or is stale when revalidating."""
+        if not self._is_cached(use_cache):
+            return True
+        return self.revalidate and self.is_stale()
 
     def ensure(self, use_cache: bool = True) -> pathlib.Path:
         """
@@ -61,18 +266,40 @@ class FileCache(CacheMethod):
         :param use_cache: Set to false to force redownload the data.
         :return: Location of file.
         """
-        if not self._is_cached(use_cache):
-            curl.curl(self.cache_path, self.url)
+        with _lock(self.cache_path):
+            if self._needs_download(use_cache):
+                download = curl.curl(self.cache_path, self.url, session=self.session)
+                self._downloaded(download)
         return self.cache_path
 
 
 class Archive7zCache(CacheMethod):
     """Exposes a cache that allows unzipping 7z archives."""
 
-    def __init__(self, cache_path: pathlib.Path, archive_cache: CacheMethod,) -> None:
-        """Initialize Archive7zCache."""
-        super().__init__(cache_path)
+    def __init__(
+        self,
+        cache_path: pathlib.Path,
+        archive_cache: CacheMethod,
+        members: Optional[Collection[str]] = None,
+        jobs: int = 1,
+        manifest_: Optional[manifest.Manifest] = None,
+        rehash: bool = False,
+    ) -> None:
+        """
+        Initialize Archive7zCache.
+
+        :param cache_path: Location of the extracted file.
+        :param archive_cache: A cache endpoint to get the 7z archive from.
+        :param members: Other files in the archive to extract alongside
+                        this one, all the files in the archive if None.
+        :param jobs: Amount of processes to extract the files with.
+        :param manifest_: Manifest to record and check the files with.
+        :param rehash: Hash the cached file to check it.
+        """
+        super().__init__(cache_path, manifest_, rehash)
         self.archive_cache = archive_cache
+        self.members = members
+        self.jobs = jobs
 
     def ensure(self, use_cache: bool = True) -> pathlib.Path:
         """
@@ -84,28 +311,135 @@ class Archive7zCache(CacheMethod):
         :param use_cache: Set to false to force reunarchiving of the data.
         :return: Location of file.
         """
-        if not self._is_cached(use_cache):
-            with self.archive_cache.ensure(use_cache).open("rb") as input_file:
-                print(f"Unziping: {input_file.name}")
-                archive = py7zlib.Archive7z(input_file)
-                directory = self.cache_path.parent
-                directory.mkdir(parents=True, exist_ok=True)
-                for name in archive.getnames():
-                    output = directory / name
-                    member = archive.getmember(name)
-                    size = si.display(si.Magnitude.ibyte(member.size))
-                    print(f"  Unpacking[{size}] {name}")
-                    with output.open("wb") as output_file:
-                        output_file.write(archive.getmember(name).read())
+        # Multiple members are extracted at once, so lock the archive.
+        with _lock(self.archive_cache.cache_path):
+            archive = self._revalidated_archive(use_cache)
+            if not self._is_fresh(use_cache, archive):
+                self._extract(use_cache, archive)
         return self.cache_path
 
+    @property
+    def revalidate(self) -> bool:  # type: ignore
+        """Revalidate the archive the file is extracted from."""
+        return self.archive_cache.revalidate
+
+    def _revalidated_archive(self, use_cache: bool) -> Optional[pathlib.Path]:
+        """
+        Ensure the archive when revalidating.
+
+        Ensuring a revalidated archive makes a request, so it's ensured
+        once here and the location is passed to the other methods.
+
+        :return: Location of the archive, or None if not revalidating.
+        """
+        if not self.revalidate:
+            return None
+        return self.archive_cache.ensure(use_cache)
+
+    def _is_fresh(self, use_cache: bool, archive: Optional[pathlib.Path]) -> bool:
+        """
+        Check the file is cached.
+
+        When revalidating the file also has to have been extracted after
+        the archive was last downloaded.
+
+        :param archive: The archive from :meth:`_revalidated_archive`.
+        """
+        if not self._is_cached(use_cache):
+            return False
+        if archive is None:
+            return True
+        return _extracted_from(self.cache_path, archive)
+
+    def _extract(self, use_cache: bool, archive: Optional[pathlib.Path]) -> None:
+        """
+        Extract the file and its members that aren't cached.
+
+        :param archive: The archive, if it has already been ensured.
+        """
+        if archive is None:
+            archive = self.archive_cache.ensure(use_cache)
+        directory = self.cache_path.parent
+        names: Optional[List[str]] = None
+        if self.members is not None:
+            names = sorted(
+                name
+                for name in {self.cache_path.name, *self.members}
+                if not (use_cache and _extracted_from(directory / name, archive))
+            )
+        digests = sevenzip.extract(archive, directory, names, self.jobs)
+        if self.manifest is not None:
+            for path, digest in digests.items():
+                self.manifest.record(path, digest, archive)
+
+    @contextlib.contextmanager
+    def open(self, use_cache: bool = True) -> Iterator[IO[bytes]]:
+        """
+        Open the target file for reading.
+
+        If the file has already been extracted the extracted file is
+        opened. Otherwise the file is decompressed from the archive as
+        it's read, and isn't extracted.
+
+        :param use_cache: Set to false to force reading from the archive.
+        :return: The file in binary read mode.
+        """
+        archive = self._revalidated_archive(use_cache)
+        if self._is_fresh(use_cache, archive):
+            with self.cache_path.open("rb") as file_obj:
+                yield file_obj
+            return
+        if archive is None:
+            archive = self.archive_cache.ensure(use_cache)
+        with archive.open("rb") as input_file:
+            with sevenzip.open_member(input_file, self.cache_path.name) as member:
+                yield member
+
 
 class Cache:
     """Interface to make cache instances."""
 
-    def __init__(self, cache_dir: pathlib.Path) -> None:
-        """Initialize Cache."""
+    def __init__(
+        self,
+        cache_dir: pathlib.Path,
+        jobs: int = 4,
+        revalidate: bool = False,
+        verify: str = "fast",
+        budget: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize Cache.
+
+        :param cache_dir: Directory to store the cache in.
+        :param jobs: Maximum amount of files :meth:`Cache.prefetch`
+                     downloads at once.
+        :param revalidate: Check cached files are the same as the files
+                           on the server, downloading them if not.
+        :param verify: How to check cached files against the manifest
+                       before using them, "fast" checks their size and
+                       "full" hashes them again.
+        :param budget: Amount of bytes :meth:`Cache.evict` keeps the
+                       cache within, unlimited if None.
+        """
+        if verify not in ("fast", "full"):
+            raise ValueError(f"Unknown verify mode {verify!r}.")
         self.cache_dir = cache_dir
+        self.jobs = jobs
+        self.revalidate = revalidate
+        self.rehash = verify == "full"
+        self.budget = budget
+        self.manifest = manifest.Manifest(cache_dir / "manifest.sqlite3")
+        self.session = requests.Session()
+        # Enough connections for each file to use all of its own.
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=jobs * curl.CONNECTIONS,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """Close the connections in the session's pool."""
+        self.session.close()
 
     def file(self, cache_path: str, url: str) -> FileCache:
         """
@@ -115,16 +449,162 @@ class Cache:
         :param url: URL location of the file to download from if not cached.
         :return: A file cache endpoint.
         """
-        return FileCache(self.cache_dir / cache_path, url)
+        return FileCache(
+            self.cache_dir / cache_path,
+            url,
+            self.session,
+            self.revalidate,
+            self.manifest,
+            self.rehash,
+        )
 
     def archive_7z(
-        self, cache_path: pathlib.Path, archive_cache: CacheMethod,
+        self,
+        cache_path: pathlib.Path,
+        archive_cache: CacheMethod,
+        members: Optional[Collection[str]] = None,
+        jobs: int = 1,
     ) -> Archive7zCache:
         """
         Get an archive cache endpoint.
 
         :param cache_path: Location of file relative to the cache directory.
         :param archive_cache: A cache endpoint to get the 7z archive from.
+        :param members: Other files in the archive to extract alongside
+                        this one, all the files in the archive if None.
+        :param jobs: Amount of processes to extract the files with.
         :return: An archive cache endpoint.
         """
-        return Archive7zCache(self.cache_dir / cache_path, archive_cache)
+        return Archive7zCache(
+            self.cache_dir / cache_path,
+            archive_cache,
+            members,
+            jobs,
+            self.manifest,
+            self.rehash,
+        )
+
+    def audit(self, full: bool = False) -> List[manifest.Entry]:
+        """
+        Check all the files recorded in the manifest.
+
+        :param full: Hash each file, rather than only checking its size.
+        :return: Entries of the files that are missing or don't match.
+        """
+        return self.manifest.verify(full)
+
+    def evict(self, keep: Collection[pathlib.Path] = ()) -> List[manifest.Entry]:
+        """
+        Remove the least recently used files until the cache fits its budget.
+
+        Files extracted from an archive are removed before downloaded
+        files, and a downloaded file's metadata is removed with it.
+
+        :param keep: Locations of files, or directories of files, not to
+                     remove.
+        :return: Entries of the removed files.
+        """
+        if self.budget is None:
+            return []
+        size = self.manifest.size()
+        kept = [path.absolute() for path in keep]
+        evicted = []
+        for entry in self.manifest.least_recently_used(derived_first=True):
+            if size <= self.budget:
+                break
+            path = self.manifest.root / entry.path
+            absolute = path.absolute()
+            if any(absolute == kept_ or kept_ in absolute.parents for kept_ in kept):
+                continue
+            with _lock(path):
+                for file_path in (path, _metadata_path(path)):
+                    with contextlib.suppress(FileNotFoundError):
+                        file_path.unlink()
+                self.manifest.remove(path)
+            if path.parent != self.manifest.root:
+                # Only removed once it's empty.
+                with contextlib.suppress(OSError):
+                    path.parent.rmdir()
+            size -= entry.size
+            evicted.append(entry)
+        if evicted:
+            freed = sum(entry.size for entry in evicted)
+            print(f"Evicted {si.display(si.Magnitude.ibyte(freed))} from the cache")
+        return evicted
+
+    def prefetch(
+        self, endpoints: Iterable[CacheMethod], use_cache: bool = True,
+    ) -> None:
+        """
+        Download multiple files at once.
+
+        Up to :attr:`Cache.jobs` files are downloaded at the same time,
+        with a single progress bar for all of them. Archive endpoints
+        have their archive downloaded, but not extracted.
+
+        :param endpoints: Cache endpoints to download.
+        :param use_cache: Set to false to force redownload the data.
+        """
+        downloads: Dict[pathlib.Path, FileCache] = {}
+        for endpoint in endpoints:
+            while isinstance(endpoint, Archive7zCache):
+                endpoint = endpoint.archive_cache
+            if not isinstance(endpoint, FileCache):
+                raise TypeError(f"Can't download {type(endpoint).__name__}.")
+            # Stale files are found by the workers, as it needs a request.
+            if endpoint.revalidate or not endpoint._is_cached(use_cache):
+                downloads.setdefault(endpoint.cache_path, endpoint)
+        if not downloads:
+            return
+
+        print(f"Downloading {len(downloads)} files:")
+        for endpoint in downloads.values():
+            print(f"  {endpoint.url}")
+        sizes = [0] * len(downloads)
+        done = [0] * len(downloads)
+        stop = threading.Event()
+
+        def fetch(index: int, endpoint: FileCache) -> None:
+            with _lock(endpoint.cache_path):
+                if stop.is_set() or not endpoint._needs_download(use_cache):
+                    return
+                download = curl.start(endpoint.cache_path, endpoint.url, self.session)
+                sizes[index] = download.size or 0
+                done[index] = download.done
+                for amount in download.progress:
+                    done[index] += amount
+                    if stop.is_set():
+                        download.progress.close()
+                        return
+                endpoint._downloaded(download)
+
+        def wait(futures: List[concurrent.futures.Future]) -> Iterator[int]:
+            pending = set(futures)
+            total = 0
+            while pending:
+                finished, pending = concurrent.futures.wait(
+                    pending,
+                    timeout=progress.BaseProgressStream.refresh,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in finished:
+                    future.result()
+                # The size of each file is only known once it's started.
+                stream.size = sum(sizes)
+                current = sum(done)
+                yield current - total
+                total = current
+
+        with concurrent.futures.ThreadPoolExecutor(self.jobs) as executor:
+            futures = [
+                executor.submit(fetch, index, endpoint)
+                for index, endpoint in enumerate(downloads.values())
+            ]
+            stream = progress.BaseProgressStream(
+                wait(futures), None, si.Magnitude.ibyte, int, prefix="  ",
+            )
+            try:
+                for _ in stream:
+                    pass
+            finally:
+                stop.set()
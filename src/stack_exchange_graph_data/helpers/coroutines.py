@@ -7,35 +7,141 @@ or broadcasting. It also helps ease interactions when coroutines enter
 closed states prematurely.
 """
 
+import bz2
+import concurrent.futures
 import functools
+import gzip
 import itertools
+import lzma
+import threading
 import types
 from typing import (
+    IO,
     Any,
     Callable,
+    Dict,
     Generator,
     Iterable,
     Iterator,
     List,
     Optional,
+    Sequence,
     Tuple,
     Union,
 )
 
+from . import profiling
+
 NEW_SOURCE = object()
 EXIT = object()
 
+#: Openers and file suffixes of the supported output compressions.
+#: Gzip uses the same level as the gzip command, rather than the slow
+#: maximum compression.
+COMPRESSIONS: Dict[str, Tuple[Callable[..., IO], str]] = {
+    "gzip": (functools.partial(gzip.open, compresslevel=6), ".gz"),
+    "bz2": (bz2.open, ".bz2"),
+    "lzma": (lzma.open, ".xz"),
+}
+#: Amount of items sent at a time by :class:`CoroutineDelegator`.
+BATCH_SIZE = 1024
+#: Amount of rows formatted and written at a time by :func:`csv_sink`.
+CSV_BATCH_SIZE = 4096
+#: Size of the write buffer of uncompressed :func:`csv_sink` files.
+CSV_BUFFER_SIZE = 1024 * 1024
+
 IIter = Union[Iterator, Iterable]
 
 
+class Batch(list):
+    """
+    Items sent through a pipeline as a single item.
+
+    Sending a batch rather than each item costs one pass through each
+    magic coroutine's wrapper per batch, rather than per item. Magic
+    coroutines made with :code:`coroutine(batch=True)` receive batches
+    and can send batches to their targets. Any other magic coroutine is
+    sent the items of a batch one at a time.
+    """
+
+
+def batched(iterable: IIter, size: int = BATCH_SIZE) -> Iterator[Batch]:
+    """
+    Lazily split an iterable into batches.
+
+    :param iterable: Items to split.
+    :param size: Maximum amount of items in each batch.
+    :return: Batches of items, only the last can be smaller than size.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = Batch(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Merge:
+    """
+    Thread safe entry to a coroutine.
+
+    A generator can't be sent to from multiple threads at the same time.
+    When sources are ran concurrently any coroutine that's sent to by
+    more than one source must be wrapped in a merge, so only one thread
+    sends to it at a time.
+
+    Merges pass on the :data:`NEW_SOURCE` and :data:`EXIT` messages of
+    magic coroutines, so the coroutine still closes once all its
+    sources have exited.
+
+    As the control flow is acyclic, a thread holding a merge's lock only
+    ever waits on the locks of merges further down the flow, and so
+    merges can't deadlock.
+    """
+
+    def __init__(self, target: Generator) -> None:
+        """
+        Initialize Merge.
+
+        :param target: Coroutine to send to.
+        """
+        self.target = target
+        self._lock = threading.RLock()
+        # Look like the target, so merges of magic coroutines are
+        # treated as magic coroutines.
+        self.__name__ = getattr(target, "__name__", type(target).__name__)
+        self.__qualname__ = getattr(target, "__qualname__", self.__name__)
+
+    def send(self, item: Any) -> Any:
+        """Send an item to the target."""
+        with self._lock:
+            return self.target.send(item)
+
+    def close(self) -> None:
+        """Close the target."""
+        with self._lock:
+            self.target.close()
+
+
 class CoroutineDelegator:
     """Helper class for delegating to coroutines."""
 
     _queue: List[Tuple[IIter, Generator]]
 
-    def __init__(self) -> None:
-        """Initialize CoroutineDelegator."""
+    def __init__(self, batch_size: int = BATCH_SIZE, concurrent: bool = False) -> None:
+        """
+        Initialize CoroutineDelegator.
+
+        :param batch_size: Amount of items to send to magic coroutines
+                           at a time, set to 1 to send each item
+                           individually.
+        :param concurrent: Run each source in its own thread. Coroutines
+                           sent to by more than one source must be
+                           wrapped in a :class:`Merge`.
+        """
         self._queue = []
+        self.batch_size = batch_size
+        self.concurrent = concurrent
 
     def send_to(self, source: IIter, target: Generator,) -> None:
         """
@@ -58,14 +164,32 @@ class CoroutineDelegator:
                 target.send(NEW_SOURCE)
 
     def _run(self, source: IIter, target: Generator) -> Optional[Iterator]:
+        profiler = profiling.active()
+        if profiler is None:
+            return self._send(source, target)
+        # The time not spent in the target is spent getting the items.
+        name = getattr(target, "__name__", type(target).__name__)
+        profiler.enter(profiler.stage(f"{name} source"), 0)
+        try:
+            return self._send(source, target)
+        finally:
+            profiler.exit()
+
+    def _send(self, source: IIter, target: Generator) -> Optional[Iterator]:
         item = sentinel = object()
         source_ = iter(source)
+        if self.batch_size > 1 and _is_magic_coroutine(target):
+            source_ = batched(source_, self.batch_size)
         try:
             for item in source_:
                 target.send(item)
         except StopIteration:
             if item is sentinel:
                 return source_
+            if isinstance(item, Batch):
+                # Keep the rest of the source lazy, unpacking it here
+                # would read all of it into memory.
+                return itertools.chain(item, itertools.chain.from_iterable(source_))
             return itertools.chain([item], source_)
         else:
             if _is_magic_coroutine(target):
@@ -78,19 +202,62 @@ class CoroutineDelegator:
 
         :return: If a coroutine is closed prematurely the data that
                  hasn't been entered into the control flow will be
-                 returned. Otherwise an empty list is.
+                 returned. Otherwise an empty list is. When sending
+                 batches the entire batch that was being sent is
+                 returned, as some of it may not have been used.
         """
         self._increment_coroutine_refs()
 
-        output: List[Optional[Iterator]] = [None for _ in range(len(self._queue))]
-        for i, (source, target) in enumerate(self._queue):
-            output[i] = self._run(source, target)
+        output: List[Optional[Iterator]]
+        if self.concurrent and len(self._queue) > 1:
+            with concurrent.futures.ThreadPoolExecutor(len(self._queue)) as executor:
+                futures = [
+                    executor.submit(self._run, source, target)
+                    for source, target in self._queue
+                ]
+                output = [future.result() for future in futures]
+        else:
+            output = [self._run(source, target) for source, target in self._queue]
         self._queue = []
         if any(output):
             return [iter(o or []) for o in output]
         return []
 
 
+def _profile(
+    profiler: profiling.Profiler, stats: profiling.StageStats, wrapped: Generator,
+) -> Generator:
+    """
+    Time the items sent to a coroutine.
+
+    This is only placed between a magic coroutine and the coroutine it
+    wraps when profiling is enabled, so there's no overhead otherwise.
+    Closing the coroutine is timed too, as that's when most stages that
+    buffer their input do their work.
+    """
+    profiler.enter(stats, 0)
+    try:
+        next(wrapped)
+    finally:
+        profiler.exit()
+    try:
+        while True:
+            item = yield
+            profiler.enter(stats, len(item) if isinstance(item, Batch) else 1)
+            try:
+                wrapped.send(item)
+            except StopIteration:
+                return
+            finally:
+                profiler.exit()
+    finally:
+        profiler.enter(stats, 0)
+        try:
+            wrapped.close()
+        finally:
+            profiler.exit()
+
+
 def primed_coroutine(function: Callable[..., Generator]) -> Callable:
     """
     Primes a coroutine at creation.
@@ -123,7 +290,7 @@ def _is_magic_coroutine(target: Any) -> bool:
         return False
 
 
-def coroutine(function: Callable) -> Callable:
+def coroutine(function: Optional[Callable] = None, *, batch: bool = False) -> Callable:
     """
     Wrap a coroutine generating function to make magic coroutines.
 
@@ -143,6 +310,9 @@ def coroutine(function: Callable) -> Callable:
        closed. In such a situation the current coroutine will be closed
        and exit with a StopIteration error, as if the coroutine has been
        closed with the :code:`.close`.
+    5. Adapts between single items and batches of items. Batch
+       coroutines are always sent a :class:`Batch`, and other coroutines
+       are sent the items of a batch one at a time.
 
     It should be noted that these coroutine pipelines should be started via the
     :class:`stack_exchange_graph_data.helpers.coroutines.CoroutineDelegator`.
@@ -150,8 +320,12 @@ def coroutine(function: Callable) -> Callable:
     when the coroutine has been prematurely closed.
 
     :param function: Standard coroutine generator function.
+    :param batch: The coroutine receives a :class:`Batch` of items at a
+                  time. Use as :code:`@coroutine(batch=True)`.
     :return: Function that generates magic coroutines.
     """
+    if function is None:
+        return functools.partial(coroutine, batch=batch)
     self: Generator
 
     @primed_coroutine
@@ -162,6 +336,9 @@ def coroutine(function: Callable) -> Callable:
 
         # Create wrapped coroutine
         wrapped = function(*args, **kwargs)
+        profiler = profiling.active()
+        if profiler is not None:
+            wrapped = _profile(profiler, profiler.stage(function.__name__), wrapped)
 
         # Broadcast the creation of a new source to the targets
         for target in targets:
@@ -187,7 +364,15 @@ def coroutine(function: Callable) -> Callable:
                     if not active:
                         next(wrapped)
                         active = True
-                    wrapped.send(item)
+                    if batch:
+                        if not isinstance(item, Batch):
+                            item = Batch([item])
+                        wrapped.send(item)
+                    elif isinstance(item, Batch):
+                        for item_ in item:
+                            wrapped.send(item_)
+                    else:
+                        wrapped.send(item)
         # Raised when a anything above parent has been killed
         except RuntimeError:
             pass
@@ -206,12 +391,12 @@ def coroutine(function: Callable) -> Callable:
             except RuntimeError:
                 pass
 
-            # Decrement target coroutine's source counters
+            # Decrement target coroutine's source counters, each target
+            # only counted this coroutine as a single source.
             if targets and not generator_iteration_flag:
                 for target in targets:
                     try:
-                        for _ in range(sources):
-                            target.send(EXIT)
+                        target.send(EXIT)
                     except StopIteration:
                         pass
 
@@ -224,14 +409,15 @@ def coroutine(function: Callable) -> Callable:
     def inner(*args: Any, **kwargs: Any) -> Generator:
         nonlocal self
         self = magic(*args, **kwargs)
+        self.__name__ = function.__name__
         return self
 
     return inner
 
 
-@coroutine
+@coroutine(batch=True)
 def broadcast(*targets: Generator) -> Generator:
-    """Broadcast items to targets."""
+    """Broadcast items, in batches, to targets."""
     while True:
         item = yield
         for target in targets:
@@ -244,3 +430,68 @@ def file_sink(*args: Any, **kwargs: Any) -> Generator:
     with open(*args, **kwargs) as file_obj:
         while True:
             file_obj.write((yield))
+
+
+def _format_rows(
+    rows: List[Tuple[Any, ...]], delimiter: str, templates: Dict[int, str],
+) -> str:
+    """
+    Format rows as delimiter separated lines.
+
+    Printf-style formatting a whole row at a time is much faster than
+    joining the values, so a template is built for each row width.
+
+    :param templates: Cache of the template for each row width.
+    """
+    lines = []
+    for row in rows:
+        template = templates.get(len(row))
+        if template is None:
+            template = templates[len(row)] = (
+                delimiter.replace("%", "%%").join(["%s"] * len(row)) + "\n"
+            )
+        lines.append(template % row)
+    return "".join(lines)
+
+
+@coroutine(batch=True)
+def csv_sink(
+    path: str,
+    header: Optional[Sequence[str]] = None,
+    delimiter: str = ";",
+    compression: Optional[str] = None,
+    batch_size: int = CSV_BATCH_SIZE,
+) -> Generator:
+    """
+    Send rows to a delimiter separated file.
+
+    Rows are buffered and formatted in batches, so the file is written
+    to in large chunks rather than a line at a time. Values are
+    formatted with :func:`str` and aren't quoted, each row must be a
+    tuple.
+
+    :param path: Location of the file, the compression's suffix is
+                 appended to it.
+    :param header: Column names to write before the first row.
+    :param delimiter: String to separate the values of a row with.
+    :param compression: Name of a compression in :data:`COMPRESSIONS`.
+    :param batch_size: Amount of rows to buffer before writing them.
+    """
+    if compression is None:
+        file_obj = open(path, "w", buffering=CSV_BUFFER_SIZE)
+    else:
+        opener, suffix = COMPRESSIONS[compression]
+        file_obj = opener(path + suffix, "wt")
+    templates: Dict[int, str] = {}
+    with file_obj:
+        if header is not None:
+            file_obj.write(_format_rows([tuple(header)], delimiter, templates))
+        rows: List[Tuple[Any, ...]] = []
+        try:
+            while True:
+                rows.extend((yield))
+                if len(rows) >= batch_size:
+                    file_obj.write(_format_rows(rows, delimiter, templates))
+                    rows = []
+        finally:
+            file_obj.write(_format_rows(rows, delimiter, templates))
@@ -1,38 +1,368 @@
-"""Copy URL."""
+"""
+Copy URL.
 
-import os
+Large files are downloaded in segments using HTTP range requests, when
+the server supports them. The segments are downloaded over multiple
+connections at the same time, and are written straight into a partial
+file next to the target. How far each segment has got is saved beside
+the partial file, so an interrupted download resumes where it left off
+rather than starting again.
+
+The partial file is only renamed to the target once it's complete, so
+an incomplete download is never seen as cached.
+"""
+
+import concurrent.futures
+import contextlib
+import json
 import pathlib
-from typing import Any
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional
 
 # nosa(1): pylint
 import requests
 
-from . import progress
+from . import files, progress, si
+
+__all__ = [
+    "CHUNK_SIZE",
+    "CONNECTIONS",
+    "READ_SIZE",
+    "Download",
+    "start",
+    "curl",
+]
+
+#: Size of the ranges each request downloads.
+CHUNK_SIZE = 32 * 1024 * 1024
+#: Amount of ranges downloaded at the same time.
+CONNECTIONS = 4
+#: Amount of bytes read from a response at a time.
+READ_SIZE = 64 * 1024
+#: Minimum amount of seconds between saving the download's state.
+SAVE_INTERVAL = 1.0
+
+
+def _part_path(path: pathlib.Path) -> pathlib.Path:
+    """Location the file is downloaded to, until it's complete."""
+    return path.with_name(path.name + ".part")
+
+
+def _state_path(path: pathlib.Path) -> pathlib.Path:
+    """Location of the state of a partial download."""
+    return path.with_name(path.name + ".part.json")
 
 
-def curl(path: pathlib.Path, *args: Any, **kwargs: Any,) -> None:
+def _validator(response: requests.Response) -> Optional[str]:
+    """Get a value that changes when the file on the server changes."""
+    return response.headers.get("etag") or response.headers.get("last-modified")
+
+
+def _load_segments(
+    path: pathlib.Path, size: int, validator: Optional[str], chunk_size: int,
+) -> List[List[int]]:
     """
-    Download file to system.
+    Get the segments to download a file in.
 
-    Provides a progress bar of the file being downloaded and some
-    statistics around the file and download.
+    Segments are saved as :code:`[start, position, end]`, where position
+    is how far the segment has been downloaded. The saved segments are
+    only used if the file on the server hasn't changed, which can't be
+    known if the server doesn't send an ETag or Last-Modified.
 
-    :param path: Local path to save the file to.
-    :param args&kwargs: Passed to :code:`request.get`.
+    :return: The saved segments, or new ones if they can't be used.
     """
-    response = requests.get(*args, stream=True, **kwargs)
-    response.raise_for_status()
-    length_ = response.headers.get("content-length")
-    length = int(length_) if length_ else None
-    path.parent.mkdir(parents=True, exist_ok=True)
+    part = _part_path(path)
+    try:
+        with _state_path(path).open() as file_obj:
+            state = json.load(file_obj)
+    except (OSError, ValueError):
+        state = None
+    if (
+        state is not None
+        and validator is not None
+        and part.exists()
+        and state["size"] == size
+        and state["validator"] == validator
+    ):
+        return state["segments"]
+
+    with part.open("wb") as file_obj:
+        file_obj.truncate(size)
+    return [
+        [start, start, min(start + chunk_size, size)]
+        for start in range(0, size, chunk_size)
+    ]
+
+
+def _save_segments(
+    path: pathlib.Path, size: int, validator: Optional[str], segments: List[List[int]],
+) -> None:
+    """Save how far each segment has been downloaded."""
+    with files.atomic_open(_state_path(path), "w") as file_obj:
+        json.dump(
+            {"size": size, "validator": validator, "segments": segments}, file_obj,
+        )
+
+
+def _fetch(
+    session: requests.Session,
+    url: str,
+    part: pathlib.Path,
+    segment: List[int],
+    stop: threading.Event,
+    hasher: files.BlockHasher,
+    kwargs: Dict[str, Any],
+) -> None:
+    """
+    Download the rest of a segment into the partial file.
+
+    The segment's position is updated after each write, so it never
+    includes data that isn't in the file.
+    """
+    _, position, end = segment
+    if position >= end or stop.is_set():
+        return
+    headers = dict(kwargs.pop("headers", None) or {})
+    headers["Range"] = f"bytes={position}-{end - 1}"
+    with session.get(url, headers=headers, stream=True, **kwargs) as response:
+        response.raise_for_status()
+        if response.status_code != requests.codes.partial_content:
+            raise requests.HTTPError(
+                f"Range request ignored by {url}", response=response,
+            )
+        with part.open("r+b", buffering=0) as output:
+            output.seek(position)
+            writer = hasher.writer(position)
+            for data in response.iter_content(READ_SIZE):
+                if stop.is_set():
+                    return
+                data = data[: end - segment[1]]
+                output.write(data)
+                writer.update(data)
+                segment[1] += len(data)
+                if segment[1] >= end:
+                    return
+    if segment[1] < end:
+        raise requests.exceptions.ChunkedEncodingError(
+            f"Connection closed {end - segment[1]} bytes before the end of a range.",
+        )
+
+
+def _wait(
+    futures: List[concurrent.futures.Future],
+    segments: List[List[int]],
+    save: Any,
+) -> Iterator[int]:
+    """
+    Wait for the segments to download, raising any errors.
+
+    :param save: Called regularly to save the download's state.
+    :return: Amount of bytes downloaded since last checked, regularly
+             whilst waiting.
+    """
+    pending = set(futures)
+    total = sum(position - start for start, position, _ in segments)
+    saved = time.perf_counter()
+    while pending:
+        done, pending = concurrent.futures.wait(
+            pending,
+            timeout=progress.BaseProgressStream.refresh,
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+        for future in done:
+            future.result()
+        if time.perf_counter() - saved >= SAVE_INTERVAL:
+            save()
+            saved = time.perf_counter()
+        current = sum(position - start for start, position, _ in segments)
+        yield current - total
+        total = current
+
+
+# nosa(1): pylint[:Too many arguments]
+def _iter_ranges(
+    session: requests.Session,
+    path: pathlib.Path,
+    url: str,
+    size: int,
+    validator: Optional[str],
+    segments: List[List[int]],
+    connections: int,
+    hasher: files.BlockHasher,
+    kwargs: Dict[str, Any],
+) -> Iterator[int]:
+    """Download a file in segments, resuming a previous download."""
+    part = _part_path(path)
+    stop = threading.Event()
+
+    def save() -> None:
+        _save_segments(path, size, validator, segments)
 
-    print(f"Downloading: {response.url}")
     try:
-        with path.open("wb") as output:
-            for chunk in progress.DataProgressStream(
-                response.iter_content(chunk_size=512), length, prefix="  ",
-            ):
-                output.write(chunk)
+        with concurrent.futures.ThreadPoolExecutor(connections) as executor:
+            futures = [
+                executor.submit(
+                    _fetch, session, url, part, segment, stop, hasher, dict(kwargs),
+                )
+                for segment in segments
+            ]
+            try:
+                yield from _wait(futures, segments, save)
+            finally:
+                stop.set()
+                for future in futures:
+                    future.cancel()
     except BaseException:
-        os.remove(path)
+        save()
         raise
+    part.replace(path)
+    with contextlib.suppress(FileNotFoundError):
+        _state_path(path).unlink()
+
+
+def _iter_stream(
+    session: requests.Session,
+    path: pathlib.Path,
+    url: str,
+    hasher: files.BlockHasher,
+    kwargs: Dict[str, Any],
+) -> Iterator[int]:
+    """Download a file over a single connection."""
+    with session.get(url, stream=True, **kwargs) as response:
+        response.raise_for_status()
+        with files.atomic_open(path) as output:
+            writer = hasher.writer()
+            for chunk in response.iter_content(chunk_size=READ_SIZE):
+                output.write(chunk)
+                writer.update(chunk)
+                yield len(chunk)
+
+
+class Download(NamedTuple):
+    """
+    A download that has been started.
+
+    Nothing is downloaded until :attr:`progress` is iterated, and the
+    file is only in place once it has been exhausted.
+    """
+
+    #: URL of the file, after any redirects.
+    url: str
+    #: Size of the file, if known.
+    size: Optional[int]
+    #: Amount of bytes downloaded by a previous, interrupted, download.
+    done: int
+    #: Amount of bytes downloaded since the last item.
+    progress: Iterator[int]
+    #: Headers the server sent about the file.
+    headers: Mapping[str, str]
+    #: Hashes the file as it's downloaded, get the digest once done.
+    hasher: files.BlockHasher
+
+
+def start(
+    path: pathlib.Path,
+    url: str,
+    session: requests.Session,
+    chunk_size: int = CHUNK_SIZE,
+    connections: int = CONNECTIONS,
+    **kwargs: Any,
+) -> Download:
+    """
+    Start downloading a file.
+
+    If the server advertises :code:`Accept-Ranges: bytes` the file is
+    downloaded in ranges of chunk_size, over multiple connections. A
+    download that was interrupted is resumed, unless the file on the
+    server has changed since. Otherwise the file is downloaded in one
+    request.
+
+    :param path: Local path to save the file to.
+    :param url: URL of the file to download.
+    :param session: Session to make the requests with, this must be
+                    kept open until the download is complete.
+    :param chunk_size: Size of the ranges to download.
+    :param connections: Amount of ranges to download at the same time.
+    :param kwargs: Passed to :code:`requests.Session.get`.
+    :return: The download, which is ran by iterating its progress.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    head = session.head(url, allow_redirects=True, **kwargs)
+    length = head.headers.get("content-length")
+    size = int(length) if head.ok and length else None
+    headers = head.headers if head.ok else {}
+    hasher = files.BlockHasher(size)
+    if not size or headers.get("accept-ranges") != "bytes":
+        url = head.url if head.ok else url
+        return Download(
+            url,
+            size,
+            0,
+            _iter_stream(session, path, url, hasher, kwargs),
+            headers,
+            hasher,
+        )
+
+    validator = _validator(head)
+    segments = _load_segments(path, size, validator, chunk_size)
+    return Download(
+        head.url,
+        size,
+        sum(position - start for start, position, _ in segments),
+        _iter_ranges(
+            session,
+            path,
+            head.url,
+            size,
+            validator,
+            segments,
+            connections,
+            hasher,
+            kwargs,
+        ),
+        headers,
+        hasher,
+    )
+
+
+def curl(
+    path: pathlib.Path,
+    url: str,
+    chunk_size: int = CHUNK_SIZE,
+    connections: int = CONNECTIONS,
+    session: Optional[requests.Session] = None,
+    **kwargs: Any,
+) -> Download:
+    """
+    Download file to system.
+
+    Provides a progress bar of the file being downloaded and some
+    statistics around the file and download. See :func:`start` for how
+    the file is downloaded.
+
+    :param path: Local path to save the file to.
+    :param url: URL of the file to download.
+    :param chunk_size: Size of the ranges to download.
+    :param connections: Amount of ranges to download at the same time.
+    :param session: Session to make the requests with, a new one if None.
+    :param kwargs: Passed to :code:`requests.Session.get`.
+    :return: The finished download.
+    """
+    with contextlib.ExitStack() as stack:
+        if session is None:
+            session = stack.enter_context(requests.Session())
+        download = start(path, url, session, chunk_size, connections, **kwargs)
+        print(f"Downloading: {download.url}")
+        if download.done:
+            print(f"  Resuming from {si.display(si.Magnitude.ibyte(download.done))}")
+        for _ in progress.BaseProgressStream(
+            download.progress,
+            download.size,
+            si.Magnitude.ibyte,
+            int,
+            prefix="  ",
+            start=download.done,
+        ):
+            pass
+    return download
@@ -0,0 +1,161 @@
+"""
+File system helpers.
+
+Files in the cache are treated as valid if they exist. So files are
+written to a temporary file next to the target, which is only renamed
+to the target once it has been fully written. This means an interrupted
+download or extraction can't leave a truncated file in the cache.
+
+Files can also be hashed whilst they're written, so checking them later
+doesn't need to read them again.
+"""
+
+import contextlib
+import hashlib
+import os
+import pathlib
+import secrets
+from typing import IO, Any, Dict, Iterator, Optional
+
+__all__ = [
+    "BLOCK_SIZE",
+    "atomic_open",
+    "BlockHasher",
+    "hash_file",
+]
+
+#: Size of the blocks files are hashed in.
+BLOCK_SIZE = 1024 * 1024
+
+
+@contextlib.contextmanager
+def atomic_open(path: pathlib.Path, mode: str = "wb", **kwargs: Any) -> Iterator[IO]:
+    """
+    Open a file to atomically write to.
+
+    The file is written to a temporary file in the same directory, so
+    it's on the same file system, and replaces the target if the block
+    exits without an error. Otherwise the temporary file is removed and
+    the target is left untouched.
+
+    :param path: Location of the file to write.
+    :param mode: Mode to open the file in, must be a write mode.
+    :param kwargs: Passed to :func:`open`.
+    :return: The temporary file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unlike tempfile.mkstemp, which makes the file only readable by its
+    # owner, the file's permissions follow the umask as with open.
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        temp_path = path.with_name(f".{path.name}.{secrets.token_hex(4)}.part")
+        try:
+            descriptor = os.open(temp_path, flags, 0o666)
+        except FileExistsError:
+            continue
+        break
+    try:
+        with open(descriptor, mode, **kwargs) as file_obj:
+            yield file_obj
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class _BlockWriter:
+    """Hash the blocks written by one sequential writer."""
+
+    def __init__(self, hasher: "BlockHasher", position: int) -> None:
+        """Initialize _BlockWriter."""
+        self._hasher = hasher
+        self._position = position
+        self._block = position // BLOCK_SIZE
+        # Blocks that aren't written from their start are read back later.
+        self._hash = hashlib.sha256() if position % BLOCK_SIZE == 0 else None
+
+    def update(self, data: bytes) -> None:
+        """Hash data written at the writer's position."""
+        size = self._hasher.size
+        if size is None:
+            return
+        if self._position + len(data) > size:
+            # The file is longer than its declared size, so it's read back.
+            self._hasher.size = None
+            return
+        view = memoryview(data)
+        while view:
+            end = min((self._block + 1) * BLOCK_SIZE, size)
+            part, view = view[: end - self._position], view[end - self._position :]
+            if self._hash is not None:
+                self._hash.update(part)
+            self._position += len(part)
+            if self._position == end:
+                if self._hash is not None:
+                    self._hasher.digests[self._block] = self._hash.digest()
+                self._block += 1
+                self._hash = hashlib.sha256()
+
+
+class BlockHasher:
+    """
+    Hash a file whilst it's being written, in any order.
+
+    The file's digest is the SHA-256 of the SHA-256 of each
+    :data:`BLOCK_SIZE` block. As the blocks are hashed independently,
+    segments of a file written at the same time can each hash the
+    blocks they write. Blocks that weren't written whole, such as the
+    blocks either side of where a download resumed, are read back from
+    the file when getting the digest.
+    """
+
+    digests: Dict[int, bytes]
+
+    def __init__(self, size: Optional[int]) -> None:
+        """
+        Initialize BlockHasher.
+
+        :param size: Size of the file. If it's not known, or more is
+                     written than it, nothing is hashed whilst writing,
+                     and the whole file is read when getting the digest.
+        """
+        self.size = size
+        self.digests = {}
+
+    def writer(self, position: int = 0) -> _BlockWriter:
+        """
+        Hash data written sequentially from a position.
+
+        :param position: Position in the file the writes start from.
+        :return: Object to pass the written data to :code:`update`.
+        """
+        return _BlockWriter(self, position)
+
+    def hexdigest(self, path: pathlib.Path) -> str:
+        """
+        Get the digest of the written file.
+
+        :param path: Location of the file, to read missing blocks from.
+        :return: The file's digest as a hex string.
+        """
+        size = path.stat().st_size
+        blocks = -(-size // BLOCK_SIZE)
+        digest = hashlib.sha256()
+        with path.open("rb") as file_obj:
+            for block in range(blocks):
+                block_digest = self.digests.get(block) if self.size == size else None
+                if block_digest is None:
+                    file_obj.seek(block * BLOCK_SIZE)
+                    block_digest = hashlib.sha256(file_obj.read(BLOCK_SIZE)).digest()
+                digest.update(block_digest)
+        return digest.hexdigest()
+
+
+def hash_file(path: pathlib.Path) -> str:
+    """
+    Get the digest of a file, as made by :class:`BlockHasher`.
+
+    :param path: Location of the file.
+    :return: The file's digest as a hex string.
+    """
+    return BlockHasher(None).hexdigest(path)
@@ -0,0 +1,240 @@
+"""
+Record of the files in a cache.
+
+The manifest is a SQLite database in the cache directory, holding the
+size and digest of each file when it was written to the cache. The
+digests are made by :class:`stack_exchange_graph_data.helpers.files.BlockHasher`
+whilst the files are downloaded and extracted, so recording a file
+doesn't need to read it again.
+
+Files can be checked two ways:
+
+- Fast, the file's size is compared to the recorded size. This catches
+  truncated files without reading them.
+- Full, the file is hashed again and compared to the recorded digest.
+  This reads the entire file, and so is meant for audits.
+
+The manifest also tracks when each file was last used, and whether it
+was made from another file in the cache, such as a file extracted from
+an archive. This lets a cache evict its least recently used files, and
+files it can remake before files it'd have to download again, from the
+manifest alone.
+
+SQLite is used so threads, and processes, using the same cache can
+update the manifest without rewriting it.
+"""
+
+import contextlib
+import pathlib
+import sqlite3
+import time
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from . import files
+
+__all__ = [
+    "Entry",
+    "Manifest",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    source TEXT,
+    recorded REAL NOT NULL,
+    used REAL NOT NULL,
+    derived INTEGER NOT NULL
+)
+"""
+
+
+class Entry(NamedTuple):
+    """A file recorded in the manifest."""
+
+    #: Location of the file, relative to the manifest's directory.
+    path: str
+    #: Size of the file when it was recorded.
+    size: int
+    #: Digest of the file when it was recorded.
+    digest: str
+    #: Where the file came from, such as a URL or an archive.
+    source: Optional[str]
+    #: When the file was recorded, as a Unix timestamp.
+    recorded: float
+    #: When the file was last used, as a Unix timestamp.
+    used: float
+    #: Whether the file was made from another file in the cache.
+    derived: bool
+
+
+def _entry(row: Tuple[Any, ...]) -> Entry:
+    """Make an entry from a row of the files table."""
+    *values, derived = row
+    return Entry(*values, bool(derived))
+
+
+class Manifest:
+    """Record of the files in a cache directory."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """
+        Initialize Manifest.
+
+        :param path: Location of the database, files are recorded
+                     relative to its directory.
+        """
+        self.path = path
+        self.root = path.parent
+        self._created = False
+
+    def _create(self) -> None:
+        """Make the database and its table, if they don't exist."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with contextlib.closing(sqlite3.connect(str(self.path), timeout=60)) as conn:
+            with conn:
+                conn.execute(_SCHEMA)
+        self._created = True
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Connect to the database, committing any changes on exit.
+
+        A new connection is made each time, as connections can't be
+        shared between threads. The table is only made on the first.
+        """
+        if not self._created:
+            self._create()
+        with contextlib.closing(sqlite3.connect(str(self.path), timeout=60)) as conn:
+            with conn:
+                yield conn
+
+    def _key(self, path: pathlib.Path) -> str:
+        """Get the key of a file in the manifest."""
+        return path.absolute().relative_to(self.root.absolute()).as_posix()
+
+    def record(
+        self,
+        path: pathlib.Path,
+        digest: str,
+        source: Union[str, pathlib.Path, None] = None,
+    ) -> None:
+        """
+        Record a file that has just been written.
+
+        :param path: Location of the file.
+        :param digest: Digest of the file, from :class:`files.BlockHasher`.
+        :param source: Where the file came from, a URL or another file in
+                       the manifest, such as the archive it's extracted from.
+        """
+        derived = isinstance(source, pathlib.Path)
+        if isinstance(source, pathlib.Path):
+            source = self._key(source)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self._key(path),
+                    path.stat().st_size,
+                    digest,
+                    source,
+                    now,
+                    now,
+                    derived,
+                ),
+            )
+
+    def touch(self, path: pathlib.Path) -> None:
+        """
+        Mark a recorded file as just used.
+
+        :param path: Location of the file.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE files SET used = ? WHERE path = ?",
+                (time.time(), self._key(path)),
+            )
+
+    def get(self, path: pathlib.Path) -> Optional[Entry]:
+        """
+        Get the record of a file.
+
+        :param path: Location of the file.
+        :return: The file's entry, or None if it's not recorded.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM files WHERE path = ?", (self._key(path),),
+            ).fetchone()
+        return None if row is None else _entry(row)
+
+    def remove(self, path: pathlib.Path) -> None:
+        """
+        Remove the record of a file.
+
+        :param path: Location of the file.
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files WHERE path = ?", (self._key(path),))
+
+    def entries(self) -> List[Entry]:
+        """Get the entries of all the recorded files."""
+        with self._connect() as conn:
+            return [_entry(row) for row in conn.execute("SELECT * FROM files")]
+
+    def size(self) -> int:
+        """Get the total size of the recorded files."""
+        with self._connect() as conn:
+            (size,) = conn.execute("SELECT TOTAL(size) FROM files").fetchone()
+        return int(size)
+
+    def least_recently_used(self, derived_first: bool = False) -> List[Entry]:
+        """
+        Get the entries of the recorded files, least recently used first.
+
+        :param derived_first: Put the files made from other files first,
+                              as they're the cheapest to make again.
+        :return: The entries in the order to evict them.
+        """
+        order = "derived DESC, used" if derived_first else "used"
+        with self._connect() as conn:
+            return [
+                _entry(row)
+                for row in conn.execute(f"SELECT * FROM files ORDER BY {order}")
+            ]
+
+    def check(self, path: pathlib.Path, full: bool = False) -> Optional[bool]:
+        """
+        Check a file is the same as when it was recorded.
+
+        :param path: Location of the file.
+        :param full: Hash the file, rather than only checking its size.
+        :return: Whether the file matches its record, or None if the file
+                 isn't recorded.
+        """
+        entry = self.get(path)
+        if entry is None:
+            return None
+        try:
+            if path.stat().st_size != entry.size:
+                return False
+        except FileNotFoundError:
+            return False
+        return not full or files.hash_file(path) == entry.digest
+
+    def verify(self, full: bool = False) -> List[Entry]:
+        """
+        Check all the recorded files.
+
+        :param full: Hash each file, rather than only checking its size.
+        :return: Entries of the files that are missing or don't match.
+        """
+        return [
+            entry
+            for entry in self.entries()
+            if not self.check(self.root / entry.path, full)
+        ]
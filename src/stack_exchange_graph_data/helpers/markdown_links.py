@@ -0,0 +1,155 @@
+"""
+Find the links in short Markdown texts.
+
+Rendering Markdown to HTML just to find the anchors is expensive. This
+module scans the Markdown for the constructs that produce links and
+returns the links that would be rendered by
+:func:`stack_exchange_graph_data.helpers.xref.custom_parser`:
+
+- Inline links - :code:`[text](url "title")`.
+- Autolinks - :code:`<https://example.com>` and :code:`<me@example.com>`.
+- Raw HTML anchors - :code:`<a href="url">`.
+- Optionally bare URLs - :code:`https://example.com`.
+
+Relative links are expanded in the same way as
+:code:`custom_parser.PendingXRefTransform`. Links in code spans,
+escaped brackets and images are ignored.
+"""
+
+import html
+import os.path
+import re
+import urllib.parse
+from typing import List, Match, Optional
+
+__all__ = [
+    "find_links",
+]
+
+_TEXT = r"(?:[^\[\]\\`]|\\.|`[^`]*`|\[(?:[^\[\]\\]|\\.)*\])*"
+_DESTINATION = (
+    r"<(?:[^<>\n\\]|\\.)*>"
+    r"|(?:[^\s()\\]|\\.|\((?:[^\s()\\]|\\.)*\))*"
+)
+_TITLE = r"\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'|\((?:[^()\\]|\\.)*\)"
+_TOKENS = re.compile(
+    r"(?P<escape>\\[!-/:-@\[-`{-~])"
+    r"|(?P<code>(?P<ticks>`+)(?!`).+?(?<!`)(?P=ticks)(?!`))"
+    r"|(?P<unclosed>`+)"
+    r"|<(?P<autolink>[A-Za-z][A-Za-z0-9.+\-]{1,31}:[^<>\x00-\x20]*)>"
+    r"|<(?P<email>[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~\-]+@[a-zA-Z0-9]"
+    r"(?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?"
+    r"(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*)>"
+    r"|<[aA]\s[^<>]*?\bhref\s*=\s*"
+    r"(?:\"(?P<href_dq>[^\"]*)\"|'(?P<href_sq>[^']*)'|(?P<href>[^\s\"'=<>`]+))"
+    r"[^<>]*>"
+    rf"|(?P<image>!?)\[(?P<text>{_TEXT})\]"
+    rf"\([ \t]*\n?[ \t]*(?P<destination>{_DESTINATION})"
+    rf"(?:[ \t]*\n?[ \t]*(?:{_TITLE}))?[ \t]*\n?[ \t]*\)",
+    re.DOTALL,
+)
+_BARE_URL = re.compile(r"\b(?:https?|ftp)://[^\s<>\[\]()\"'`]+")
+_ESCAPED = re.compile(r"\\([!-/:-@\[-`{-~])")
+_SUPPORTED_EXTENSIONS = {"md", "markdown"}
+
+
+def _normalize_uri(uri: str) -> str:
+    """Percent encode the URI in the same way CommonMark does."""
+    return urllib.parse.quote(uri.encode("utf-8"), safe=";/@:+?=&()%#*,")
+
+
+def _expand(destination: str, prefix: str) -> Optional[str]:
+    """
+    Convert a link destination into the rendered link.
+
+    Links without a scheme are cross references, which are only kept
+    if they're relative to the site's root.
+
+    :param destination: Unescaped link destination.
+    :param prefix: Http base to prepend to partial hyperlinks.
+    :return: The rendered link, or None if the link is rendered as text.
+    """
+    destination = _normalize_uri(destination)
+    url = urllib.parse.urlparse(destination)
+    if url.scheme:
+        return destination
+    _, ext = os.path.splitext(destination)
+    if ext.replace(".", "") in _SUPPORTED_EXTENSIONS:
+        destination = destination.replace(ext, "")
+    if url.fragment:
+        return destination
+    reference = urllib.parse.unquote(destination)
+    if reference.startswith("/"):
+        return prefix + reference
+    return None
+
+
+def _unescape(value: str) -> str:
+    """Replace entities and backslash escapes with literal characters."""
+    return html.unescape(_ESCAPED.sub(r"\1", value))
+
+
+def _find_links(text: str, prefix: str, links: List[str]) -> bool:
+    """
+    Add the links in text to links.
+
+    :return: Whether any links were found.
+    """
+    found = False
+    for match in _TOKENS.finditer(text):
+        link = _match_link(match, prefix, links)
+        if link is None:
+            continue
+        found = True
+        if link:
+            links.append(link)
+    return found
+
+
+def _match_link(match: Match, prefix: str, links: List[str]) -> Optional[str]:
+    """
+    Get the link a token renders to.
+
+    Links can't contain other links, and so if the text of a link
+    contains a link only the inner link is rendered.
+
+    :return: None if the token isn't a link, an empty string if the
+             token is a link that doesn't render a new link.
+    """
+    group = match.lastgroup
+    if group == "autolink":
+        return _normalize_uri(match.group("autolink"))
+    if group == "email":
+        return "mailto:" + _normalize_uri(match.group("email"))
+    if group in {"href_dq", "href_sq", "href"}:
+        return html.unescape(match.group(group))
+    if group != "destination":
+        return None
+    if match.group("image"):
+        return None
+    if _find_links(match.group("text"), prefix, links):
+        return ""
+    destination = match.group("destination")
+    if destination.startswith("<"):
+        destination = destination[1:-1]
+    return _expand(_unescape(destination), prefix) or ""
+
+
+def find_links(text: str, prefix: str, bare_urls: bool = False) -> List[str]:
+    """
+    Find all links in a Markdown text.
+
+    :param text: Markdown to scan.
+    :param prefix: Http base to prepend to partial hyperlinks.
+    :param bare_urls: Also include URLs that aren't marked up as links.
+                      These aren't rendered as links by CommonMark.
+    :return: Links in the order they occur in the text.
+    """
+    links: List[str] = []
+    _find_links(text, prefix, links)
+    if bare_urls:
+        remainder = _TOKENS.sub(" ", text)
+        links.extend(
+            match.group().rstrip(".,;:!?") for match in _BARE_URL.finditer(remainder)
+        )
+    return links
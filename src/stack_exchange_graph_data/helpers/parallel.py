@@ -0,0 +1,78 @@
+"""
+Run work over multiple processes.
+
+Parsing and link extraction are CPU bound and so are limited by the GIL
+when ran in threads. These helpers spread the work over a process pool,
+whilst keeping the order of the output the same as the input. This
+allows the output to be fed straight back into the coroutine control
+flow, without changing the output of the program.
+"""
+
+import collections
+import concurrent.futures
+import itertools
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, TypeVar
+
+__all__ = [
+    "chunked",
+    "imap",
+]
+
+# nosa(1): pylint[:Class name "T" doesn't conform to PascalCase naming style]
+T = TypeVar("T")
+# nosa(1): pylint[:Class name "U" doesn't conform to PascalCase naming style]
+U = TypeVar("U")
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Lazily split an iterable into lists of a set size.
+
+    Sending items to worker processes in chunks amortises the cost of
+    pickling and scheduling each item.
+
+    :param iterable: Items to split.
+    :param size: Maximum amount of items in each chunk.
+    :return: Chunks of items, only the last can be smaller than size.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap(
+    function: Callable[[T], U],
+    iterable: Iterable[T],
+    jobs: int,
+    buffer: Optional[int] = None,
+) -> Iterator[U]:
+    """
+    Lazily map a function over an iterable in worker processes.
+
+    Results are yielded in the same order as the input. Only a bounded
+    amount of items are in flight at any one time, so a slow consumer
+    doesn't cause the results to pile up in memory.
+
+    :param function: Picklable function to run in the workers.
+    :param iterable: Input to the function, only consumed as needed.
+    :param jobs: Amount of worker processes.
+    :param buffer: Maximum amount of submitted but unconsumed items.
+                   Defaults to twice the amount of workers.
+    :return: The function's output for each item.
+    """
+    buffer = max(buffer or 2 * jobs, 1)
+    pending: Deque[concurrent.futures.Future] = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        try:
+            for item in iterable:
+                pending.append(executor.submit(function, item))
+                if len(pending) >= buffer:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
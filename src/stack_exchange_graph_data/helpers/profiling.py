@@ -0,0 +1,180 @@
+"""
+Profile coroutine pipelines.
+
+A pipeline is a single call stack, where each stage sends items to the
+next stage from within its own body. Because of this profilers such as
+:mod:`cProfile` attribute nearly all the time to the entry coroutine,
+and can't say which stage is the bottleneck. Instead the stages record
+when they're entered and left here, so the time spent in each stage can
+be split from the time spent in the stages it sends to.
+
+Profiling is off by default. It has to be enabled with :func:`enable`
+before the coroutines are created, as the coroutines check if profiling
+is enabled once when they're created.
+"""
+
+import dataclasses
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+__all__ = [
+    "StageStats",
+    "Profiler",
+    "enable",
+    "disable",
+    "active",
+]
+
+
+@dataclasses.dataclass
+class StageStats:
+    """Statistics of a single pipeline stage."""
+
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    batches: int = 0
+    peak_batch: int = 0
+    self_time: float = 0.0
+    total_time: float = 0.0
+
+
+class Profiler:
+    """
+    Record the statistics of pipeline stages.
+
+    Stages call :meth:`enter` when they receive items and :meth:`exit`
+    when they're done with them. The time between the two is the
+    stage's total time, and the total time less the total time of any
+    stages entered in between is the stage's self time.
+
+    Each thread has its own stack of entered stages, so pipelines with
+    sources ran in threads are timed per thread.
+    """
+
+    stages: List[StageStats]
+    _names: Dict[str, int]
+
+    def __init__(self) -> None:
+        """Initialize Profiler."""
+        self.stages = []
+        self._names = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> List[List[Any]]:
+        """Stages entered by the current thread."""
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def stage(self, name: str) -> StageStats:
+        """
+        Add a stage.
+
+        Stages with the same name are numbered, so each is reported
+        separately.
+
+        :param name: Name of the stage.
+        :return: Statistics the stage should be entered with.
+        """
+        with self._lock:
+            count = self._names[name] = self._names.get(name, 0) + 1
+            if count > 1:
+                name = f"{name} #{count}"
+            stats = StageStats(name)
+            self.stages.append(stats)
+        return stats
+
+    def enter(self, stats: StageStats, size: int) -> None:
+        """
+        Start timing a stage.
+
+        The items are counted as output of the stage that was entered
+        last, as it's the stage sending them.
+
+        :param stats: Statistics of the stage being entered.
+        :param size: Amount of items received, 0 if the stage is being
+                     started or closed.
+        """
+        stack = self._stack
+        if size:
+            if stack:
+                stack[-1][0].items_out += size
+            stats.items_in += size
+            stats.batches += 1
+            stats.peak_batch = max(stats.peak_batch, size)
+        stack.append([stats, time.perf_counter(), 0.0])
+
+    def exit(self) -> None:
+        """Stop timing the stage that was entered last."""
+        stack = self._stack
+        stats, start, children = stack.pop()
+        elapsed = time.perf_counter() - start
+        stats.total_time += elapsed
+        stats.self_time += elapsed - children
+        if stack:
+            stack[-1][2] += elapsed
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        """Get the statistics of each stage as JSON serializable data."""
+        return [dataclasses.asdict(stats) for stats in self.stages]
+
+    def dump(self, path: str) -> None:
+        """Write the statistics of each stage to a JSON file."""
+        with open(path, "w") as file_obj:
+            json.dump(self.to_json(), file_obj, indent=2)
+
+    def report(self) -> str:
+        """Format the statistics of each stage as a table."""
+        header = ("Stage", "In", "Out", "Batches", "Peak", "Self s", "Total s")
+        rows = [
+            (
+                stats.name,
+                str(stats.items_in),
+                str(stats.items_out),
+                str(stats.batches),
+                str(stats.peak_batch),
+                f"{stats.self_time:.3f}",
+                f"{stats.total_time:.3f}",
+            )
+            for stats in self.stages
+        ]
+        widths = [max(len(row[i]) for row in [header] + rows) for i in range(7)]
+        return "\n".join(
+            "  ".join(
+                [row[0].ljust(widths[0])]
+                + [value.rjust(width) for value, width in zip(row[1:], widths[1:])]
+            )
+            for row in [header] + rows
+        )
+
+
+_PROFILER: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    """
+    Profile coroutines created from now on.
+
+    :return: The profiler the coroutines record to.
+    """
+    global _PROFILER
+    _PROFILER = Profiler()
+    return _PROFILER
+
+
+def disable() -> None:
+    """Stop profiling coroutines created from now on."""
+    global _PROFILER
+    _PROFILER = None
+
+
+def active() -> Optional[Profiler]:
+    """Get the profiler, if profiling is enabled."""
+    return _PROFILER
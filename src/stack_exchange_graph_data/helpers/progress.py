@@ -14,6 +14,9 @@ T = TypeVar("T")
 class BaseProgressStream(Generic[T]):
     """Display the progress of a stream."""
 
+    #: Minimum amount of seconds between redrawing the progress bar.
+    refresh = 0.1
+
     # nosa(1): pylint[:Too many arguments]
     def __init__(
         self,
@@ -51,6 +54,25 @@ class BaseProgressStream(Generic[T]):
         disp_size = display(self.to_readable(self.size))
         return f"[{progress:<{self.width}}] {disp_size} "
 
+    def _get_status(self, current: int, elapsed: float) -> str:
+        """
+        Get the status line of the stream.
+
+        :param current: Current progress - not in percentage.
+        :param elapsed: Seconds since the stream started.
+        :return: Progress bar, file size and rate.
+        """
+        progress = self._get_progress(current)
+        rate = current // max(int(elapsed), 1)
+        disp_rate = display(self.to_readable(rate))
+        return f"{progress}{disp_rate}/s"
+
+    def _print_status(self, current: int, elapsed: float) -> None:
+        """Overwrite the current line with the stream's status."""
+        print(
+            f"\r{self.prefix}{self._get_status(current, elapsed)}", end="", flush=True,
+        )
+
     def __iter__(self) -> Iterator[T]:
         """
         Echo the stream, and update progress.
@@ -65,16 +87,15 @@ class BaseProgressStream(Generic[T]):
             current = self._start
             if self.message:
                 print(self.message)
-            start = time.clock()
+            start = last = time.perf_counter()
             for chunk in self.stream:
                 current += self.progress_fn(chunk)
-                progress = self._get_progress(current)
-                rate = current // max(int(time.clock() - start), 1)
-                disp_rate = display(self.to_readable(rate))
-                print(
-                    f"\r{self.prefix}{progress}{disp_rate}/s", end="", flush=True,
-                )
+                now = time.perf_counter()
+                if now - last >= self.refresh:
+                    last = now
+                    self._print_status(current, now - start)
                 yield chunk
+            self._print_status(current, time.perf_counter() - start)
             print()
         for warning in warnings_:
             warnings.showwarning(
@@ -114,3 +135,59 @@ class ItemProgressStream(BaseProgressStream[T]):
         super().__init__(
             stream, size, Magnitude.number, lambda _: 1, width, prefix, 1, message,
         )
+
+
+class ByteProgressStream(BaseProgressStream[T]):
+    """
+    Display progress of an item stream by the bytes consumed.
+
+    This allows showing an accurate progress bar for streams where the
+    amount of items isn't known upfront, such as rows being parsed
+    incrementally from a file. Rather than counting the items the
+    position in the underlying file is used, which is cheap to get.
+    """
+
+    # nosa(1): pylint[:Too many arguments]
+    def __init__(
+        self,
+        stream: Iterator[T],
+        position: Callable[[], int],
+        size: Optional[int],
+        width: int = 20,
+        prefix: str = "",
+        message: Optional[str] = None,
+    ):
+        """
+        Initialize ByteProgressStream.
+
+        :param stream: Stream of items to echo.
+        :param position: Get the amount of bytes consumed, such as
+                         :code:`file.tell`.
+        :param size: Total amount of bytes in the underlying file.
+        """
+        super().__init__(
+            stream, size, Magnitude.ibyte, lambda _: 1, width, prefix, 0, message,
+        )
+        self.position = position
+
+    def _get_status(self, current: int, elapsed: float) -> str:
+        """
+        Get the status line of the stream.
+
+        :param current: Amount of items consumed.
+        :param elapsed: Seconds since the stream started.
+        :return: Progress bar, file size, item rate, data rate and ETA.
+        """
+        position = self.position()
+        progress = self._get_progress(position)
+        elapsed = max(elapsed, 1e-9)
+        item_rate = display(Magnitude.number(int(current / elapsed)))
+        byte_rate = int(position / elapsed)
+        eta = ""
+        if self.size and byte_rate:
+            remaining = max(self.size - position, 0) // byte_rate
+            eta = " ETA {:d}:{:02d}:{:02d}".format(
+                remaining // 3600, remaining // 60 % 60, remaining % 60,
+            )
+        disp_rate = display(self.to_readable(byte_rate))
+        return f"{progress}{item_rate}rows/s {disp_rate}/s{eta}"
@@ -0,0 +1,458 @@
+"""
+Stream files out of 7z archives.
+
+:meth:`py7zlib.ArchiveFile.read` decompresses the entire file into
+memory, which for the larger data dumps is tens of gigabytes. Here the
+file is instead decompressed a block at a time, so it can be written to
+disk or parsed as it's decompressed.
+
+:func:`extract` extracts only the files asked for, writing each through
+a temporary file so an interrupted extraction doesn't leave a truncated
+file behind. Files in separate blocks can be extracted in parallel.
+
+Files compressed with a single LZMA, LZMA2 or copy coder, which covers
+the Stack Exchange data dumps, are streamed. Any other file falls back
+to :meth:`py7zlib.ArchiveFile.read`.
+"""
+
+import concurrent.futures
+import io
+import itertools
+import multiprocessing
+import pathlib
+import time
+import zlib
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# nosa(1): pylint,mypy
+import py7zlib
+
+# nosa(1): pylint,mypy
+import pylzma
+
+from . import files, progress, si
+
+__all__ = [
+    "CHUNK_SIZE",
+    "iter_members",
+    "iter_member",
+    "MemberReader",
+    "open_member",
+    "extract",
+]
+
+#: Amount of compressed bytes read from the archive at a time.
+CHUNK_SIZE = 64 * 1024
+
+
+def _decompressor(member: Any) -> Optional[Any]:
+    """
+    Make a decompressor for an archive member's data.
+
+    :return: A decompressor with the coder's properties already fed in.
+             :code:`False` if the data isn't compressed, and None if
+             streaming the member isn't supported.
+    """
+    folder = member._folder
+    if len(folder.coders) != 1 or folder.isEncrypted():
+        return None
+    coder = folder.coders[0]
+    method = coder["method"]
+    if method == py7zlib.COMPRESSION_METHOD_COPY:
+        return False
+    if method == py7zlib.COMPRESSION_METHOD_LZMA:
+        decompressor = pylzma.decompressobj()
+    elif method == py7zlib.COMPRESSION_METHOD_LZMA2:
+        decompressor = pylzma.decompressobj(lzma2=True)
+    else:
+        return None
+    properties = coder.get("properties")
+    if properties:
+        decompressor.decompress(properties)
+    return decompressor
+
+
+def _iter_block(
+    file_obj: IO[bytes],
+    position: int,
+    packed_size: int,
+    decompressor: Any,
+    length: int,
+    chunk_size: int,
+) -> Iterator[bytes]:
+    """
+    Lazily decompress the start of a block of data.
+
+    Only the block's compressed data is read, so a truncated or corrupt
+    block raises an error rather than decompressing the data after it.
+
+    :param file_obj: The archive file, opened in binary mode.
+    :param position: Location of the block's compressed data in the file.
+    :param packed_size: Size of the block's compressed data.
+    :param decompressor: Decompressor of the block, False if it's stored.
+    :param length: Amount of decompressed bytes wanted.
+    :param chunk_size: Amount of compressed bytes to read at a time.
+    :return: Chunks of the decompressed data.
+    """
+    end = position + packed_size
+    remaining = length
+    while remaining > 0:
+        data = b""
+        if position < end:
+            # Seek each read, rather than relying on the file's position,
+            # so multiple members can be read at the same time.
+            file_obj.seek(position)
+            data = file_obj.read(min(chunk_size, end - position))
+            if not data:
+                raise py7zlib.DecompressionError("end of file while decompressing")
+            position += len(data)
+        if decompressor is False:
+            chunk = data
+        elif data:
+            chunk = decompressor.decompress(data)
+        else:
+            # Get any data held back waiting for more input.
+            chunk = decompressor.decompress(b"", remaining)
+        if not chunk and not data:
+            raise py7zlib.DecompressionError("end of block while decompressing")
+        chunk = chunk[:remaining]
+        remaining -= len(chunk)
+        if chunk:
+            yield chunk
+
+
+def _check_crc(member: Any, crc: int) -> None:
+    """Raise an error if the data decompressed for a member is corrupt."""
+    if member.digest is not None and crc != member.digest:
+        raise py7zlib.DecompressionError(f"CRC mismatch in {member.filename}")
+
+
+def iter_members(
+    file_obj: IO[bytes], members: Iterable[Any], chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Tuple[Any, bytes]]:
+    """
+    Lazily decompress files in the same block of an archive.
+
+    In solid archives multiple files are compressed as one block, and a
+    file's data can start part way through the decompressed block. The
+    block is decompressed once, up to the end of the last file wanted,
+    and the data in between the files is thrown away. The CRC of each
+    file is checked once all its data has been yielded.
+
+    :param file_obj: The archive file, opened in binary mode.
+    :param members: Files in the archive, from
+                    :meth:`py7zlib.Archive7z.getmember`. These must all
+                    be in the same block.
+    :param chunk_size: Amount of compressed bytes to read at a time.
+    :return: The file and a chunk of its data, in the order the files
+             are in the block. Empty files aren't yielded.
+    """
+    # py7zlib reads empty files as an empty str.
+    members = sorted(
+        (member for member in members if member.size), key=lambda m: m._start,
+    )
+    if not members:
+        return
+    decompressor = _decompressor(members[0])
+    if decompressor is None:
+        for member in members:
+            yield member, member.read()
+        return
+
+    last = members[-1]
+    chunks = _iter_block(
+        file_obj,
+        last._src_start,
+        last.compressed,
+        decompressor,
+        last._start + last.size,
+        chunk_size,
+    )
+    offset = 0
+    index = 0
+    crc = 0
+    for chunk in chunks:
+        end = offset + len(chunk)
+        while index < len(members):
+            member = members[index]
+            stop = member._start + member.size
+            if member._start >= end:
+                break
+            data = chunk[max(member._start - offset, 0) : stop - offset]
+            crc = zlib.crc32(data, crc)
+            yield member, data
+            if stop > end:
+                break
+            _check_crc(member, crc)
+            index += 1
+            crc = 0
+        offset = end
+
+
+def iter_member(
+    file_obj: IO[bytes], member: Any, chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Lazily decompress a file in an archive.
+
+    :param file_obj: The archive file, opened in binary mode.
+    :param member: The file in the archive,
+                   from :meth:`py7zlib.Archive7z.getmember`.
+    :param chunk_size: Amount of compressed bytes to read at a time.
+    :return: Chunks of the file's data.
+    """
+    for _, chunk in iter_members(file_obj, [member], chunk_size):
+        yield chunk
+
+
+class MemberReader(io.RawIOBase):
+    """
+    Read only binary file of a file in an archive.
+
+    Allows a file in an archive to be passed to anything that reads
+    files, such as an XML parser, without extracting it first.
+    """
+
+    def __init__(
+        self, file_obj: IO[bytes], member: Any, chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        """
+        Initialize MemberReader.
+
+        :param file_obj: The archive file, opened in binary mode.
+        :param member: The file in the archive.
+        :param chunk_size: Amount of compressed bytes to read at a time.
+        """
+        super().__init__()
+        self.name = member.filename
+        #: Uncompressed size of the file.
+        self.size = member.size
+        self._chunks = iter_member(file_obj, member, chunk_size)
+        self._buffer = b""
+        self._offset = 0
+        self._position = 0
+
+    def readable(self) -> bool:
+        """Members can be read from."""
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        """Read decompressed data into a buffer."""
+        while self._offset == len(self._buffer):
+            self._buffer = next(self._chunks, b"")
+            self._offset = 0
+            if not self._buffer:
+                return 0
+        size = min(len(buffer), len(self._buffer) - self._offset)
+        buffer[:size] = self._buffer[self._offset : self._offset + size]
+        self._offset += size
+        self._position += size
+        return size
+
+    def tell(self) -> int:
+        """Amount of decompressed bytes read."""
+        return self._position
+
+
+def open_member(
+    file_obj: IO[bytes], name: str, chunk_size: int = CHUNK_SIZE,
+) -> MemberReader:
+    """
+    Open a file in an archive for reading.
+
+    :param file_obj: The archive file, opened in binary mode. This must
+                     be kept open whilst the member is being read.
+    :param name: Name of the file in the archive.
+    :param chunk_size: Amount of compressed bytes to read at a time.
+    :return: The file, decompressed as it's read.
+    """
+    member = py7zlib.Archive7z(file_obj).getmember(name)
+    if member is None:
+        raise KeyError(f"No file named {name} in the archive.")
+    return MemberReader(file_obj, member, chunk_size)
+
+
+def _write_members(
+    file_obj: IO[bytes],
+    members: Sequence[Any],
+    directory: pathlib.Path,
+    chunk_size: int,
+    digests: Dict[pathlib.Path, str],
+) -> Iterator[bytes]:
+    """
+    Extract files in the same block of an archive.
+
+    :param digests: Digest of each extracted file, added to as the
+                    files are extracted.
+    :return: The chunks of data written, to track progress with.
+    """
+    chunks = iter_members(file_obj, members, chunk_size)
+    for member, group in itertools.groupby(chunks, key=lambda pair: pair[0]):
+        path = directory / member.filename
+        hasher = files.BlockHasher(member.size)
+        writer = hasher.writer()
+        # Corrupt data is raised when the group is exhausted, so the
+        # partial file is discarded.
+        with files.atomic_open(path) as output:
+            for _, chunk in group:
+                output.write(chunk)
+                writer.update(chunk)
+                yield chunk
+        digests[path] = hasher.hexdigest(path)
+    for member in members:
+        path = directory / member.filename
+        if path not in digests:
+            with files.atomic_open(path):
+                pass
+            digests[path] = files.hash_file(path)
+
+
+def _extract_block(
+    archive_path: pathlib.Path,
+    names: Sequence[str],
+    directory: pathlib.Path,
+    chunk_size: int,
+    written: Any,
+    index: int,
+) -> Dict[pathlib.Path, str]:
+    """
+    Extract files in the same block of an archive in a worker process.
+
+    :param written: Shared list to record the bytes written to, at index.
+    :return: Digest of each extracted file.
+    """
+    last = time.perf_counter()
+    digests: Dict[pathlib.Path, str] = {}
+    with archive_path.open("rb") as file_obj:
+        archive = py7zlib.Archive7z(file_obj)
+        members = [archive.getmember(name) for name in names]
+        total = 0
+        for chunk in _write_members(file_obj, members, directory, chunk_size, digests):
+            total += len(chunk)
+            now = time.perf_counter()
+            if now - last >= progress.BaseProgressStream.refresh:
+                last = now
+                written[index] = total
+        written[index] = total
+    return digests
+
+
+def _wait(futures: List[concurrent.futures.Future], written: Any) -> Iterator[int]:
+    """
+    Wait for the workers to finish, raising any errors.
+
+    :param written: Shared list of the bytes each worker has written.
+    :return: Amount of bytes written since last checked, regularly
+             whilst waiting.
+    """
+    pending = set(futures)
+    total = 0
+    while pending:
+        done, pending = concurrent.futures.wait(
+            pending,
+            timeout=progress.BaseProgressStream.refresh,
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+        for future in done:
+            future.result()
+        current = sum(written[:])
+        yield current - total
+        total = current
+
+
+def _extract_parallel(
+    archive_path: pathlib.Path,
+    blocks: List[List[Any]],
+    directory: pathlib.Path,
+    jobs: int,
+    chunk_size: int,
+) -> Dict[pathlib.Path, str]:
+    """Extract blocks of files in worker processes."""
+    size = sum(member.size for members in blocks for member in members)
+    with multiprocessing.Manager() as manager:
+        written = manager.list([0] * len(blocks))
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            futures = [
+                executor.submit(
+                    _extract_block,
+                    archive_path,
+                    [member.filename for member in members],
+                    directory,
+                    chunk_size,
+                    written,
+                    index,
+                )
+                for index, members in enumerate(blocks)
+            ]
+            try:
+                for _ in progress.BaseProgressStream(
+                    _wait(futures, written), size, si.Magnitude.ibyte, int, prefix="  ",
+                ):
+                    pass
+            finally:
+                for future in futures:
+                    future.cancel()
+    return {
+        path: digest
+        for future in futures
+        for path, digest in future.result().items()
+    }
+
+
+def extract(
+    archive_path: pathlib.Path,
+    directory: pathlib.Path,
+    names: Optional[Iterable[str]] = None,
+    jobs: int = 1,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[pathlib.Path, str]:
+    """
+    Extract files from an archive, showing the progress.
+
+    Each file is written to a temporary file, which replaces the target
+    once the file has been fully written and its CRC checked. Files are
+    hashed with :class:`files.BlockHasher` as they're written.
+
+    Files in different blocks are independent, so when jobs is more
+    than one each block is extracted in its own worker process. A solid
+    archive is normally a single block, and so can't be extracted in
+    parallel.
+
+    :param archive_path: Location of the 7z archive.
+    :param directory: Directory to extract the files to.
+    :param names: Names of the files to extract, all files if None.
+    :param jobs: Amount of worker processes to extract with.
+    :param chunk_size: Amount of compressed bytes to read at a time.
+    :return: Location and digest of each extracted file.
+    """
+    print(f"Unziping: {archive_path}")
+    with archive_path.open("rb") as file_obj:
+        archive = py7zlib.Archive7z(file_obj)
+        names = archive.getnames() if names is None else list(names)
+        blocks: Dict[int, List[Any]] = {}
+        for name in names:
+            member = archive.getmember(name)
+            if member is None:
+                raise KeyError(f"No file named {name} in the archive.")
+            blocks.setdefault(id(member._folder), []).append(member)
+            size = si.display(si.Magnitude.ibyte(member.size))
+            print(f"  Unpacking[{size}] {name}")
+
+        digests: Dict[pathlib.Path, str] = {}
+        if jobs > 1 and len(blocks) > 1:
+            digests = _extract_parallel(
+                archive_path,
+                list(blocks.values()),
+                directory,
+                min(jobs, len(blocks)),
+                chunk_size,
+            )
+        else:
+            for members in blocks.values():
+                for _ in progress.DataProgressStream(
+                    _write_members(file_obj, members, directory, chunk_size, digests),
+                    sum(member.size for member in members),
+                    prefix="  ",
+                ):
+                    pass
+    return {directory / name: digests[directory / name] for name in names}
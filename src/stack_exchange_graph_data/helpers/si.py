@@ -25,6 +25,8 @@ def si_magnitude(
         :param value: Value to adjust.
         :return: Truncated value and unit.
         """
+        if not value:
+            return 0, prefixes_[0] + suffix
         logged = math.log(value, base)
         if -1 < value < 1:
             logged -= 1
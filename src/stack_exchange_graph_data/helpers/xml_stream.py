@@ -0,0 +1,138 @@
+"""
+Stream rows from large XML files.
+
+:func:`xml.etree.ElementTree.parse` builds the entire tree before
+returning. Which for the larger data dumps, that are tens of gigabytes
+in size, means we run out of memory before any data has been
+processed. Instead the functions here parse the file incrementally and
+detach each row from the tree once it has been consumed. This keeps
+the memory usage flat no matter the size of the file.
+
+All parsing goes through :mod:`defusedxml` so the same protection
+against malicious XML that :func:`defusedxml.ElementTree.parse`
+provides is kept.
+
+Files can also be split into byte ranges that only contain whole rows.
+This allows multiple processes to parse different parts of the same
+file at the same time.
+"""
+
+import io
+import pathlib
+from typing import IO, Iterator, List, Tuple, Union
+from xml.etree.ElementTree import Element
+
+from defusedxml import ElementTree
+
+__all__ = [
+    "iter_rows",
+    "split_rows",
+    "iter_range_rows",
+]
+
+_BLOCK_SIZE = 64 * 1024
+
+Source = Union[pathlib.Path, str, IO[bytes]]
+
+
+def iter_rows(source: Source, tag: str = "row") -> Iterator[Element]:
+    """
+    Incrementally yield the children of the root element.
+
+    Each element is removed from the tree once the consumer asks for
+    the next one. Consumers can keep a reference to an element after
+    this, but no references are held here so it's freed as soon as the
+    consumer is done with it.
+
+    :param source: Path or binary file object of the XML file.
+    :param tag: Tag of the elements to yield, other elements are skipped.
+    :return: The root's children as they're parsed.
+    """
+    root = None
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        if root is None:
+            root = element
+            continue
+        if event != "end" or element.tag != tag:
+            continue
+        yield element
+        # Drop the parsed rows from the tree, otherwise the tree grows
+        # to the same size as when using `ElementTree.parse`.
+        root.clear()
+
+
+def _find(file_obj: IO[bytes], needle: bytes, start: int, end: int) -> int:
+    """
+    Find the first location of needle in the file after start.
+
+    :return: The location of the needle or end if it's not found.
+    """
+    file_obj.seek(start)
+    position = start
+    overlap = b""
+    while position < end:
+        block = overlap + file_obj.read(min(_BLOCK_SIZE, end - position))
+        if len(block) == len(overlap):
+            break
+        index = block.find(needle)
+        if index != -1:
+            return position - len(overlap) + index
+        position += len(block) - len(overlap)
+        overlap = block[-len(needle) + 1 :]
+    return end
+
+
+def split_rows(
+    path: pathlib.Path, count: int, tag: str = "row",
+) -> List[Tuple[int, int]]:
+    """
+    Split a file into byte ranges that only contain whole rows.
+
+    The ranges cover every row, in order, and exclude the XML
+    declaration and the root element's tags. This relies on the rows
+    never containing a raw ``<row`` that isn't the start of a row, which
+    is the case for files where the rows don't contain CDATA or
+    comments - such as the Stack Exchange data dumps.
+
+    :param path: Location of the XML file.
+    :param count: Wanted amount of ranges, fewer are returned if the
+                  file doesn't contain enough rows.
+    :param tag: Tag of the root's children.
+    :return: Start and end offsets of each range.
+    """
+    needle = f"<{tag}".encode("utf-8")
+    size = path.stat().st_size
+    with path.open("rb") as file_obj:
+        file_obj.seek(max(size - _BLOCK_SIZE, 0))
+        tail = file_obj.read()
+        end = size - len(tail) + max(tail.rfind(b"</"), 0)
+        first = _find(file_obj, needle, 0, end)
+        bounds = [first]
+        for i in range(1, count):
+            nominal = first + (end - first) * i // count
+            bound = _find(file_obj, needle, max(nominal, bounds[-1] + 1), end)
+            if bound >= end:
+                break
+            bounds.append(bound)
+    bounds.append(end)
+    return [
+        (start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop
+    ]
+
+
+def iter_range_rows(
+    path: pathlib.Path, start: int, end: int, tag: str = "row",
+) -> Iterator[Element]:
+    """
+    Incrementally yield the rows in a range from :func:`split_rows`.
+
+    :param path: Location of the XML file.
+    :param start: Offset of the first row in the range.
+    :param end: Offset after the last row in the range.
+    :param tag: Tag of the rows.
+    :return: The rows in the range as they're parsed.
+    """
+    with path.open("rb") as file_obj:
+        file_obj.seek(start)
+        data = file_obj.read(end - start)
+    yield from iter_rows(io.BytesIO(b"<rows>" + data + b"</rows>"), tag)
@@ -1,18 +1,46 @@
 """SEGD cache endpoints."""
 
 import pathlib
+from typing import Collection, Iterable, Optional
 
 from ..helpers import cache
-from . import site_info
+from . import site_index, site_info
 
 
 class Cache:
     """SEGD Cache object."""
 
-    def __init__(self, cache_dir: pathlib.Path, archive: str) -> None:
-        """Initialize Cache."""
+    def __init__(
+        self,
+        cache_dir: pathlib.Path,
+        archive: str,
+        site_files: Optional[Collection[str]] = None,
+        jobs: int = 1,
+        revalidate: bool = False,
+        verify: str = "fast",
+        budget: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize Cache.
+
+        :param cache_dir: Directory to store the cache in.
+        :param archive: URL of the directory of data dumps.
+        :param site_files: Files needed from the sites' data dumps, only
+                           these are extracted. All files if None.
+        :param jobs: Amount of processes to extract the data dumps with.
+        :param revalidate: Download and extract the files again if they've
+                           changed on the archive.
+        :param verify: How to check cached files against the manifest,
+                       "fast" checks their size and "full" hashes them.
+        :param budget: Amount of bytes to keep the cache within, once the
+                       cache is evicted. Unlimited if None.
+        """
         self.archive = archive
-        self.cache = cache.Cache(cache_dir)
+        self.cache = cache.Cache(
+            cache_dir, revalidate=revalidate, verify=verify, budget=budget,
+        )
+        self.site_files = site_files
+        self.jobs = jobs
 
     @property
     def sites(self) -> cache.FileCache:
@@ -25,6 +53,16 @@ class Cache:
         """
         return self.cache.file("Sites.xml", self.archive + "Sites.xml")
 
+    @property
+    def sites_index(self) -> site_index.SiteIndex:
+        """
+        Index of the sites in the :code:`Sites.xml` file.
+
+        This is saved in the cache, so finding sites doesn't need
+        :code:`Sites.xml` to be parsed each run.
+        """
+        return site_index.SiteIndex(self.cache.cache_dir / "Sites.index.json")
+
     def site_archive(self, site: site_info.SiteInfo) -> cache.FileCache:
         """
         Endpoint for the site's 7z archive.
@@ -33,6 +71,39 @@ class Cache:
         """
         return self.cache.file(f"{site.domain}.7z", self.archive + f"{site.domain}.7z",)
 
+    def prefetch_archives(
+        self, sites: Iterable[site_info.SiteInfo], use_cache: bool = True,
+    ) -> None:
+        """
+        Download multiple sites' 7z archives at once.
+
+        :param sites: The site info objects of the wanted archives.
+        :param use_cache: Set to false to force redownload of data.
+        """
+        self.cache.prefetch((self.site_archive(site) for site in sites), use_cache)
+
+    def close(self) -> None:
+        """Close the connections used to download the data."""
+        self.cache.close()
+
+    def evict(self, sites: Iterable[site_info.SiteInfo] = ()) -> None:
+        """
+        Remove the least recently used data, until it fits the budget.
+
+        :param sites: The site info objects of the sites being used, their
+                      archives and extracted files aren't removed.
+        """
+        self.cache.evict(
+            [
+                path
+                for site in sites
+                for path in (
+                    self.site_archive(site).cache_path,
+                    self.cache.cache_dir / site.name,
+                )
+            ]
+        )
+
     def site_file(
         self, site: site_info.SiteInfo, file_path: str,
     ) -> cache.Archive7zCache:
@@ -46,5 +117,8 @@ class Cache:
         :param file_path: The unarchived file wanted - :code:`Comments.xml`.
         """
         return self.cache.archive_7z(
-            pathlib.Path(site.name, file_path), self.site_archive(site),
+            pathlib.Path(site.name, file_path),
+            self.site_archive(site),
+            self.site_files,
+            self.jobs,
         )
@@ -1,9 +1,7 @@
 """Holds the driving segments of the program."""
 
 import pathlib
-from typing import IO, Any
-
-from defusedxml import ElementTree
+from typing import IO, ContextManager, Iterable, List
 
 from . import cache, site_info
 
@@ -36,6 +34,17 @@ class FileSystem:
         """
         return self.cache.site_archive(site).ensure(use_cache)
 
+    def prefetch_site_archives(
+        self, sites: Iterable[site_info.SiteInfo], use_cache: bool = True,
+    ) -> None:
+        """
+        Download multiple sites' 7z archives at once.
+
+        :param sites: The site info objects of the wanted archives.
+        :param use_cache: Set to false to force redownload of data.
+        """
+        self.cache.prefetch_archives(sites, use_cache)
+
     def get_site_file(
         self, site: site_info.SiteInfo, file_path: str, use_cache: bool = True,
     ) -> pathlib.Path:
@@ -48,22 +57,17 @@ class FileSystem:
         """
         return self.cache.site_file(site, file_path).ensure(use_cache)
 
-    def _get_site_info(self, site_name: str, use_cache: bool) -> Any:
+    def open_site_file(
+        self, site: site_info.SiteInfo, file_path: str, use_cache: bool = True,
+    ) -> ContextManager[IO[bytes]]:
         """
-        Filter sites to just the wanted site.
+        Open a data file from the site's data dump, without extracting it.
 
-        :param site_name: Name of site to get data for.
+        :param site: The site info object of the wanted data dump.
         :param use_cache: Set to false to force redownload of data.
-        :return: Raw site data.
+        :return: The data dump file in binary read mode.
         """
-        with self.get_sites(use_cache) as sites_path:
-            for site in ElementTree.parse(sites_path).getroot():
-                if any(
-                    site_name == site.attrib[attr].lower()
-                    for attr in ["TinyName", "Name", "LongName"]
-                ):
-                    return site
-        raise ValueError(f"No site named {site_name}.")
+        return self.cache.site_file(site, file_path).open(use_cache)
 
     def get_site_info(
         self, site_name: str, use_cache: bool = True,
@@ -75,5 +79,23 @@ class FileSystem:
         :param use_cache: Set to false to force redownload of data.
         :return: Object containing site information.
         """
-        _site_info = self._get_site_info(site_name, use_cache)
-        return site_info.SiteInfo(_site_info.attrib["Url"])
+        (_site_info,) = self.get_sites_info([site_name], use_cache)
+        return _site_info
+
+    def get_sites_info(
+        self, site_names: Iterable[str], use_cache: bool = True,
+    ) -> List[site_info.SiteInfo]:
+        """
+        Get site information for multiple sites.
+
+        Sites are found in the persisted index of :code:`Sites.xml`,
+        which is only rebuilt when :code:`Sites.xml` changes.
+
+        :param site_names: TinyNames, Names, LongNames or domains of the
+                           sites to get data for.
+        :param use_cache: Set to false to force redownload of data.
+        :return: Objects containing each site's information.
+        """
+        return self.cache.sites_index.lookup(
+            self.cache.sites.ensure(use_cache), site_names,
+        )
@@ -1,14 +1,27 @@
 """Graph mutations."""
 
+import bisect
 import collections
 import dataclasses
 import enum
-from typing import Dict, List, Set
+import heapq
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
 
 __all__ = [
     "LinkType",
     "Node",
     "find_graph_nodes",
+    "CSRGraph",
+    "DisjointSet",
+    "NetworkIndex",
+    "PackedEdges",
+    "counting_sort",
 ]
 
 LinkValue = collections.namedtuple("LinkValue", "name weight type")
@@ -18,7 +31,9 @@ class LinkType(enum.Enum):
     """Graph link types."""
 
     QAA = LinkValue("Question & Answer", 3, "Directed")
+    DUPLICATE = LinkValue("Duplicate", 3, "Directed")
     PL = LinkValue("Post Link", 2, "Directed")
+    LINKED = LinkValue("Linked Post", 2, "Directed")
     CL = LinkValue("Comment Link", 1, "Directed")
 
 
@@ -80,3 +95,451 @@ class Graph:
             networks.append(network)
 
         return [[self._nodes[g] for g in network] for network in networks]
+
+
+def _counting_sort(
+    keys: Iterable[int], count: int,
+) -> "Tuple[array[int], array[int]]":
+    """
+    Get the order that stably sorts small integer keys, and its offsets.
+
+    :param keys: Keys in the range :code:`0 <= key < count`.
+    :param count: Amount of distinct keys.
+    :return: Indexes of the keys in sorted order, and where each key's
+             indexes start in the order, followed by the amount of keys.
+    """
+    keys = array("q", keys)
+    offsets = array("q", [0]) * (count + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for key in range(count):
+        offsets[key + 1] += offsets[key]
+    starts = array("q", offsets)
+    order = array("q", [0]) * len(keys)
+    for index, key in enumerate(keys):
+        order[starts[key]] = index
+        starts[key] += 1
+    return order, offsets
+
+
+def counting_sort(keys: Iterable[int], count: int) -> "array[int]":
+    """
+    Get the order that stably sorts small integer keys.
+
+    :param keys: Keys in the range :code:`0 <= key < count`.
+    :param count: Amount of distinct keys.
+    :return: Indexes of the keys, in sorted order.
+    """
+    order, _ = _counting_sort(keys, count)
+    return order
+
+
+class DisjointSet:
+    """
+    Disjoint-set forest of integer node ids.
+
+    Nodes are given dense indexes in the order they're first added, and
+    all data is stored in typed arrays indexed by these. Finding a
+    node's network uses path compression, and networks are unioned by
+    size.
+    """
+
+    _indexes: Dict[int, int]
+
+    def __init__(self) -> None:
+        """Initialize DisjointSet."""
+        self._indexes = {}
+        self.values = array("q")
+        self._parents = array("q")
+        self._sizes = array("q")
+
+    def __len__(self) -> int:
+        """Amount of nodes in the set."""
+        return len(self.values)
+
+    def add(self, value: int) -> int:
+        """
+        Add a node, if it's not already in the set.
+
+        :param value: Id of the node.
+        :return: Index of the node.
+        """
+        index = self._indexes.get(value)
+        if index is None:
+            index = self._indexes[value] = len(self.values)
+            self.values.append(value)
+            self._parents.append(index)
+            self._sizes.append(1)
+        return index
+
+    def find(self, index: int) -> int:
+        """
+        Find the index of the root of a node's network.
+
+        :param index: Index of the node.
+        :return: Index of the network's root node.
+        """
+        parents = self._parents
+        root = index
+        while parents[root] != root:
+            root = parents[root]
+        while parents[index] != root:
+            parents[index], index = root, parents[index]
+        return root
+
+    def union(self, first: int, second: int) -> None:
+        """Merge the networks of two nodes."""
+        first = self.find(first)
+        second = self.find(second)
+        if first == second:
+            return
+        if self._sizes[first] < self._sizes[second]:
+            first, second = second, first
+        self._parents[second] = first
+        self._sizes[first] += self._sizes[second]
+
+    def networks(self) -> "Tuple[array[int], array[int]]":
+        """
+        Number each network.
+
+        Networks are numbered in the order their first node was added.
+
+        :return: The network of each node index, and the size of each
+                 network.
+        """
+        networks = array("q", [-1]) * len(self.values)
+        roots = array("q", [-1]) * len(self.values)
+        sizes = array("q")
+        for index in range(len(self.values)):
+            root = self.find(index)
+            if roots[root] == -1:
+                roots[root] = len(sizes)
+                sizes.append(self._sizes[root])
+            networks[index] = roots[root]
+        return networks, sizes
+
+
+class NetworkIndex:
+    """
+    Compact index of the network each node is in.
+
+    Node ids are stored sorted in a typed array, next to the id of the
+    node's network. The size of each network is stored once.
+    """
+
+    def __init__(
+        self, members: "array[int]", networks: "array[int]", sizes: "array[int]",
+    ) -> None:
+        """
+        Initialize NetworkIndex.
+
+        :param members: Sorted node ids.
+        :param networks: Network id of each member.
+        :param sizes: Size of each network.
+        """
+        self.members = members
+        self.networks = networks
+        self.sizes = sizes
+
+    @classmethod
+    def from_networks(
+        cls,
+        values: "array[int]",
+        networks: "array[int]",
+        keep: "array[int]",
+        sizes: "array[int]",
+    ) -> "NetworkIndex":
+        """
+        Build an index from the output of :meth:`DisjointSet.networks`.
+
+        :param values: Node id of each node index.
+        :param networks: Network of each node index.
+        :param keep: New id of each network, or -1 to exclude it.
+        :param sizes: Size of each new network id.
+        """
+        order = sorted(
+            (index for index in range(len(values)) if keep[networks[index]] != -1),
+            key=values.__getitem__,
+        )
+        return cls(
+            array("q", (values[index] for index in order)),
+            array("q", (keep[networks[index]] for index in order)),
+            sizes,
+        )
+
+    def __len__(self) -> int:
+        """Amount of nodes in the index."""
+        return len(self.members)
+
+    def get(self, value: int) -> Optional[Tuple[int, int]]:
+        """
+        Get the network a node is in.
+
+        :param value: Id of the node.
+        :return: Network id and size, or None if the node isn't indexed.
+        """
+        index = bisect.bisect_left(self.members, value)
+        if index == len(self.members) or self.members[index] != value:
+            return None
+        network = self.networks[index]
+        return network, self.sizes[network]
+
+    def join(self, values: Iterable[int]) -> Iterator[Optional[Tuple[int, int]]]:
+        """
+        Get the networks of many nodes.
+
+        Ascending runs of ids are merged against the index in a single
+        pass, only falling back to a binary search when the ids go
+        backwards.
+
+        :param values: Ids of the nodes.
+        :return: The output of :meth:`get` for each node.
+        """
+        members = self.members
+        length = len(members)
+        index = 0
+        previous = None
+        for value in values:
+            if previous is not None and value < previous:
+                index = bisect.bisect_left(members, value)
+            previous = value
+            while index < length and members[index] < value:
+                index += 1
+            if index < length and members[index] == value:
+                network = self.networks[index]
+                yield network, self.sizes[network]
+            else:
+                yield None
+
+
+class CSRGraph:
+    """
+    Array backed graph.
+
+    Exposes the same interface as :class:`Graph`, but rather than a
+    :class:`Node` per node and an :class:`Edge` per edge, nodes are
+    stored as dense indexes and edges in typed arrays. When the networks
+    are requested the edges are sorted into compressed sparse row form
+    so the neighbours of each node are a contiguous slice of an array.
+
+    :class:`Node` and :class:`Edge` objects are only built for one
+    network at a time, as they're yielded from :meth:`get_networks`.
+    Unlike :meth:`Graph.get_networks` this is an iterator rather than a
+    list, wrap it in :func:`list` where a list is needed.
+    """
+
+    _indexes: Dict[int, int]
+
+    def __init__(self) -> None:
+        """Initialize CSRGraph."""
+        self._indexes = {}
+        self._values = array("q")
+        self._sources = array("q")
+        self._targets = array("q")
+        self._types = array("B")
+        self._link_types = list(LinkType)
+        self._type_indexes = {
+            link_type: i for i, link_type in enumerate(self._link_types)
+        }
+
+    def _add_node(self, value: int) -> int:
+        """Get the index of a node, adding it if needed."""
+        index = self._indexes.get(value)
+        if index is None:
+            index = self._indexes[value] = len(self._values)
+            self._values.append(value)
+        return index
+
+    def add(self, source: int, destination: int, link_type: LinkType) -> None:
+        """Add an edge to the graph."""
+        self._sources.append(self._add_node(source))
+        self._targets.append(self._add_node(destination))
+        self._types.append(self._type_indexes[link_type])
+
+    def _adjacency(
+        self, keys: "array[int]",
+    ) -> "Tuple[array[int], array[int]]":
+        """
+        Build compressed sparse rows of the edges, keyed by node index.
+
+        :param keys: The node index of each edge to group by.
+        :return: Offsets into the edges for each node, and the edge
+                 indexes grouped by node.
+        """
+        order, offsets = _counting_sort(keys, len(self._values))
+        return offsets, order
+
+    def get_networks(self) -> Iterator[List[Node]]:
+        """
+        Get all the networks in the graph.
+
+        Networks are yielded in the order their first node was added,
+        the same order as :meth:`Graph.get_networks`. Each network is
+        only built once it's asked for, and so the result is an iterator.
+
+        :return: The nodes in each network.
+        """
+        forward, forward_edges = self._adjacency(self._sources)
+        inverse, inverse_edges = self._adjacency(self._targets)
+        visited = bytearray(len(self._values))
+        for start in range(len(self._values)):
+            if visited[start]:
+                continue
+            visited[start] = True
+            network = []
+            stack = [start]
+            while stack:
+                index = stack.pop()
+                network.append(index)
+                for edge in forward_edges[forward[index] : forward[index + 1]]:
+                    target = self._targets[edge]
+                    if not visited[target]:
+                        visited[target] = True
+                        stack.append(target)
+                for edge in inverse_edges[inverse[index] : inverse[index + 1]]:
+                    source = self._sources[edge]
+                    if not visited[source]:
+                        visited[source] = True
+                        stack.append(source)
+            yield self._build_network(network, forward, forward_edges)
+
+    def _build_network(
+        self,
+        network: List[int],
+        forward: "array[int]",
+        forward_edges: "array[int]",
+    ) -> List[Node]:
+        """Build the :class:`Node` objects of a network."""
+        nodes = {index: Node(self._values[index], [], []) for index in network}
+        for index, node in nodes.items():
+            for edge in forward_edges[forward[index] : forward[index + 1]]:
+                target = nodes[self._targets[edge]]
+                node.links.append(
+                    Edge(target, self._link_types[self._types[edge]]),
+                )
+                target.inv_links.append(node)
+        return list(nodes.values())
+
+
+class PackedEdges:
+    """
+    Deduplicated edges, keeping the link type with the highest weight.
+
+    Each edge is packed into a single 64 bit key, :code:`source << 32 |
+    target`, mapped to the rank of its heaviest link type. This costs a
+    dict entry and one int per unique edge, rather than nested dicts and
+    a set of link types.
+
+    If NumPy is available edges are instead appended to typed arrays
+    and periodically sorted and deduplicated in batches, costing 9 bytes
+    per edge.
+
+    Either way edges are iterated sorted by source and then target, so
+    the output is deterministic.
+    """
+
+    #: Ids must be below this to be packed, others are stored unpacked.
+    ID_LIMIT = 1 << 32
+    #: Amount of edges to buffer before deduplicating them.
+    BATCH_SIZE = 1 << 22
+
+    # Ties are won by the link type declared first.
+    _RANKED = sorted(reversed(LinkType), key=lambda t: t.value.weight)
+    _RANKS = {link_type: rank for rank, link_type in enumerate(_RANKED)}
+
+    _edges: Dict[int, int]
+    _overflow: Dict[Tuple[int, int], int]
+
+    def __init__(self, batch: Optional[bool] = None) -> None:
+        """
+        Initialize PackedEdges.
+
+        :param batch: Use the NumPy sort and unique path, defaults to if
+                      NumPy is installed.
+        """
+        if batch is None:
+            batch = numpy is not None
+        elif batch and numpy is None:
+            raise ValueError("The batch path requires NumPy to be installed.")
+        self.batch = batch
+        self._edges = {}
+        self._overflow = {}
+        self._keys = array("Q")
+        self._ranks = array("B")
+        self._unique_keys = None
+        self._unique_ranks = None
+
+    def add(self, source: int, target: int, link_type: LinkType) -> None:
+        """Add an edge, keeping the heaviest link type for duplicates."""
+        rank = self._RANKS[link_type]
+        if not (0 <= source < self.ID_LIMIT and 0 <= target < self.ID_LIMIT):
+            key = (source, target)
+            if rank > self._overflow.get(key, -1):
+                self._overflow[key] = rank
+            return
+        packed = source << 32 | target
+        if self.batch:
+            self._keys.append(packed)
+            self._ranks.append(rank)
+            if len(self._keys) >= self.BATCH_SIZE:
+                self._compact()
+        elif rank > self._edges.get(packed, -1):
+            self._edges[packed] = rank
+
+    def _compact(self) -> None:
+        """Merge the buffered edges into the sorted unique edges."""
+        keys = numpy.frombuffer(self._keys, dtype=numpy.uint64)
+        ranks = numpy.frombuffer(self._ranks, dtype=numpy.uint8)
+        if self._unique_keys is not None:
+            keys = numpy.concatenate([self._unique_keys, keys])
+            ranks = numpy.concatenate([self._unique_ranks, ranks])
+        # Sort by key, and then by descending rank so the first of each
+        # key is the heaviest.
+        order = numpy.lexsort((numpy.uint8(255) - ranks, keys))
+        keys = keys[order]
+        ranks = ranks[order]
+        first = numpy.empty(len(keys), dtype=bool)
+        first[:1] = True
+        numpy.not_equal(keys[1:], keys[:-1], out=first[1:])
+        self._unique_keys = keys[first]
+        self._unique_ranks = ranks[first]
+        self._keys = array("Q")
+        self._ranks = array("B")
+
+    def _iter_packed(self) -> Iterator[Tuple[int, int]]:
+        """Iterate through the packed keys and ranks in key order."""
+        if not self.batch:
+            for key in sorted(self._edges):
+                yield key, self._edges[key]
+            return
+        if self._keys or self._unique_keys is None:
+            self._compact()
+        for start in range(0, len(self._unique_keys), 1 << 16):
+            stop = start + (1 << 16)
+            yield from zip(
+                self._unique_keys[start:stop].tolist(),
+                self._unique_ranks[start:stop].tolist(),
+            )
+
+    def __iter__(self) -> Iterator[Tuple[int, int, LinkType]]:
+        """
+        Iterate through the unique edges.
+
+        Edges that couldn't be packed are merged in, so they're in order
+        with the packed edges.
+
+        :return: Source, target and heaviest link type of each edge.
+        """
+        ranked = self._RANKED
+        packed = (
+            (key >> 32, key & 0xFFFFFFFF, ranked[rank])
+            for key, rank in self._iter_packed()
+        )
+        if not self._overflow:
+            yield from packed
+            return
+        overflow = (
+            (source, target, ranked[rank])
+            for (source, target), rank in sorted(self._overflow.items())
+        )
+        yield from heapq.merge(packed, overflow, key=lambda edge: edge[:2])
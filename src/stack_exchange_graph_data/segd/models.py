@@ -2,14 +2,11 @@
 
 from typing import List, NamedTuple, Optional
 
-from bs4 import BeautifulSoup
-
 
 class Comment(NamedTuple):
     """Comment data."""
 
     id: int
-    body: str
     links: List[str]
 
 
@@ -17,7 +14,6 @@ class Post(NamedTuple):
     """Post data."""
 
     id: int
-    body: BeautifulSoup
     links: List[str]
-    tags: List[str]
+    tags: Optional[List[str]]
     parent_id: Optional[int]
@@ -0,0 +1,113 @@
+"""
+Index of the sites in :code:`Sites.xml`.
+
+Finding a site by parsing :code:`Sites.xml` reads every site, so the
+index maps each site's TinyName, Name, LongName and domains to its URL.
+The index is saved next to :code:`Sites.xml`, with the size and
+modification time of the :code:`Sites.xml` it was built from. It's only
+built again when :code:`Sites.xml` changes, so finding sites afterwards
+only needs the saved index to be loaded.
+"""
+
+import json
+import pathlib
+from typing import Dict, Iterable, List
+
+from defusedxml import ElementTree
+
+from ..helpers import files
+from . import site_info
+
+__all__ = [
+    "SiteIndex",
+]
+
+#: Changed whenever the saved index changes form, so old ones are rebuilt.
+_VERSION = 1
+
+
+def _source(sites_path: pathlib.Path) -> Dict[str, int]:
+    """Get what identifies the :code:`Sites.xml` an index is built from."""
+    stat = sites_path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _build(sites_path: pathlib.Path) -> Dict[str, str]:
+    """
+    Build the index from :code:`Sites.xml`.
+
+    Names are matched before domains. If more than one site has a name
+    the first site in :code:`Sites.xml` is used, as when searching it.
+
+    :param sites_path: Location of :code:`Sites.xml`.
+    :return: Map of lower case names and domains to the sites' URLs.
+    """
+    urls = [
+        (site.attrib, site.attrib["Url"])
+        for site in ElementTree.parse(str(sites_path)).getroot()
+    ]
+    index: Dict[str, str] = {}
+    for attrib, url in urls:
+        for attr in ["TinyName", "Name", "LongName"]:
+            index.setdefault(attrib[attr].lower(), url)
+    for _, url in urls:
+        info = site_info.SiteInfo(url)
+        for domain in sorted({info.domain} | info.domains):
+            index.setdefault(domain.lower(), url)
+    return index
+
+
+class SiteIndex:
+    """Persistent index of the sites in :code:`Sites.xml`."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """
+        Initialize SiteIndex.
+
+        :param path: Location to save the index to.
+        """
+        self.path = path
+
+    def load(self, sites_path: pathlib.Path) -> Dict[str, str]:
+        """
+        Load the index, building it if :code:`Sites.xml` has changed.
+
+        :param sites_path: Location of :code:`Sites.xml`.
+        :return: Map of lower case names and domains to the sites' URLs.
+        """
+        source = _source(sites_path)
+        try:
+            with self.path.open() as file_obj:
+                saved = json.load(file_obj)
+        except (OSError, ValueError):
+            saved = {}
+        if saved.get("version") == _VERSION and saved.get("source") == source:
+            return saved["sites"]
+
+        index = _build(sites_path)
+        with files.atomic_open(self.path, "w") as file_obj:
+            json.dump(
+                {"version": _VERSION, "source": source, "sites": index}, file_obj,
+            )
+        return index
+
+    def lookup(
+        self, sites_path: pathlib.Path, site_names: Iterable[str],
+    ) -> List[site_info.SiteInfo]:
+        """
+        Get the information of multiple sites.
+
+        :param sites_path: Location of :code:`Sites.xml`.
+        :param site_names: TinyNames, Names, LongNames or domains of the
+                           sites, in any case.
+        :return: Object containing each site's information.
+        """
+        index = self.load(sites_path)
+        infos = []
+        for site_name in site_names:
+            try:
+                url = index[site_name.lower()]
+            except KeyError:
+                raise ValueError(f"No site named {site_name}.") from None
+            infos.append(site_info.SiteInfo(url))
+        return infos
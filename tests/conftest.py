@@ -0,0 +1,222 @@
+import http.server
+import itertools
+import os
+import pathlib
+import random
+import re
+import socketserver
+import threading
+from xml.sax.saxutils import quoteattr
+
+import pytest
+from stack_exchange_graph_data import cli, driver
+from stack_exchange_graph_data.segd import site_info
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Serve the server's data at any path, like archive.org would."""
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self, status, length, content_range=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        if self.server.etag is not None:
+            self.send_header("ETag", self.server.etag)
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def _not_modified(self):
+        etag = self.server.etag
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return True
+        return False
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", None))
+        if not self._not_modified():
+            self._headers(200, len(self.server.data))
+
+    def do_GET(self):
+        data = self.server.data
+        header = self.headers.get("Range")
+        self.server.requests.append(("GET", header))
+        if self._not_modified():
+            return
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", header or "")
+        if self.server.ranges and match:
+            start, end = int(match[1]), int(match[2]) + 1
+            self._headers(206, end - start, f"bytes {start}-{end - 1}/{len(data)}")
+        else:
+            start, end = 0, len(data)
+            self._headers(200, len(data))
+        body = data[start:end]
+        if self.server.fail_after is not None:
+            if self.server.fail_after < len(body):
+                self.wfile.write(body[: self.server.fail_after])
+                self.server.fail_after = None
+                self.close_connection = True
+                return
+            self.server.fail_after -= len(body)
+        self.wfile.write(body)
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+    def url(self, path="file.7z"):
+        return f"http://127.0.0.1:{self.server_address[1]}/{path}"
+
+
+@pytest.fixture
+def server():
+    """Local stand-in for archive.org."""
+    httpd = Server(("127.0.0.1", 0), Handler)
+    httpd.data = os.urandom(100000)
+    httpd.etag = '"v1"'
+    httpd.ranges = True
+    #: Amount of bytes to send before dropping the connection.
+    httpd.fail_after = None
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+SITE = "https://codereview.meta.stackexchange.com"
+
+
+def _write_rows(path, root, rows):
+    with path.open("w", encoding="utf-8") as file_obj:
+        file_obj.write(f'<?xml version="1.0" encoding="utf-8"?>\n<{root}>\n')
+        for row in rows:
+            attrs = " ".join(
+                f"{key}={quoteattr(str(value))}" for key, value in row.items()
+            )
+            file_obj.write(f"  <row {attrs} />\n")
+        file_obj.write(f"</{root}>\n")
+
+
+@pytest.fixture
+def dump(tmp_path):
+    """
+    A small, deterministic, data dump for a meta site.
+
+    Posts only link to posts in the same block of 25, so there are
+    networks of many sizes rather than one that spans the site.
+    """
+    random_ = random.Random(1)
+    directory = tmp_path / "dump"
+    directory.mkdir()
+    hosts = [SITE, "https://meta.codereview.stackexchange.com", "https://example.com"]
+
+    def near(id_):
+        block = (id_ - 1) // 25 * 25
+        return random_.randint(block + 1, block + 25)
+
+    posts = []
+    questions = []
+    for id_ in range(1, 201):
+        links = " ".join(
+            f'<a href="{random_.choice(hosts)}/q/{near(id_)}">l</a>'
+            for _ in range(random_.choice([0, 0, 0, 0, 1, 2]))
+        )
+        row = {"Id": id_, "Body": f"<p>post {id_} {links} &amp; more</p>"}
+        block = [q for q in questions if (q - 1) // 25 == (id_ - 1) // 25]
+        if block and random_.random() < 0.5:
+            row["PostTypeId"] = 2
+            row["ParentId"] = random_.choice(block)
+        else:
+            row["PostTypeId"] = 1
+            questions.append(id_)
+            tags = random_.sample(range(20), random_.randint(0, 3))
+            row["Tags"] = "".join(f"<tag{tag}>" for tag in tags)
+        posts.append(row)
+    _write_rows(directory / "Posts.xml", "posts", posts)
+    comment_posts = [random_.randint(1, 200) for _ in range(40)]
+    _write_rows(
+        directory / "Comments.xml",
+        "comments",
+        [
+            {
+                "Id": id_,
+                "PostId": post_id,
+                "Text": random_.choice(
+                    [
+                        f"see [this](/q/{near(post_id)})",
+                        f"<{SITE}/questions/{near(post_id)}/x>",
+                        "nice one",
+                    ]
+                ),
+            }
+            for id_, post_id in enumerate(comment_posts, 1)
+        ],
+    )
+    link_posts = [random_.randint(1, 200) for _ in range(40)]
+    _write_rows(
+        directory / "PostLinks.xml",
+        "postlinks",
+        [
+            {
+                "Id": id_,
+                "PostId": post_id,
+                "RelatedPostId": near(post_id),
+                "LinkTypeId": random_.choice([1, 3, 99]),
+            }
+            for id_, post_id in enumerate(link_posts, 1)
+        ],
+    )
+    return directory
+
+
+class DumpFileSystem:
+    """Stand-in for segd's FileSystem, serving an already extracted dump."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        #: Files asked for by location, which would be extracted.
+        self.extracted = []
+
+    def get_site_info(self, site_name, use_cache=True):
+        return site_info.SiteInfo(SITE)
+
+    def get_site_file(self, site, file_path, use_cache=True):
+        self.extracted.append(file_path)
+        return self.directory / file_path
+
+    def open_site_file(self, site, file_path, use_cache=True):
+        return (self.directory / file_path).open("rb")
+
+
+@pytest.fixture
+def run_driver(dump, tmp_path):
+    """Run the driver over the dump, returning the edges and nodes CSV."""
+
+    runs = itertools.count()
+
+    def run(*args):
+        output = tmp_path / f"output{next(runs)}"
+        arguments = cli.make_parser().parse_args(
+            ["codereview.meta", "-o", str(output), *args],
+        )
+        file_system = DumpFileSystem(dump)
+        run.file_systems.append(file_system)
+        driver.navigate(file_system, arguments)
+        return (
+            pathlib.Path(f"{output}.edges.csv").read_text(),
+            pathlib.Path(f"{output}.nodes.csv").read_text(),
+        )
+
+    run.file_systems = []
+    return run
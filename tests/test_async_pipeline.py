@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from stack_exchange_graph_data.helpers import async_pipeline, coroutines
+
+
+@coroutines.coroutine(batch=True)
+def collect(output):
+    try:
+        while True:
+            output.extend((yield))
+    finally:
+        output.append("exit")
+
+
+@coroutines.coroutine
+def double(target):
+    while True:
+        target.send(2 * (yield))
+
+
+def test_shared_stage():
+    output = []
+    target = collect(output)
+    delegator = async_pipeline.Delegator(batch_size=3)
+    delegator.send_to(range(10), double(target))
+    delegator.send_to(range(10, 20), double(target))
+    delegator.run()
+    assert output[-1] == "exit"
+    assert sorted(output[:-1]) == list(range(0, 40, 2))
+
+
+def test_backpressure():
+    produced = []
+
+    def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    async def slow_consumer(queue):
+        consumed = 0
+        while True:
+            batch = await queue.get()
+            if batch is async_pipeline.END:
+                return
+            consumed += len(batch)
+            # The queue, a batch waiting to be put and one being made.
+            assert len(produced) - consumed <= 10 * (2 + 2)
+            await asyncio.sleep(0.001)
+
+    delegator = async_pipeline.Delegator(batch_size=10, queue_size=2)
+    delegator.send_to(source(), slow_consumer)
+    delegator.run()
+    assert len(produced) == 100
+
+
+def test_broadcast_file_sink(tmp_path):
+    paths = [tmp_path / "a.txt", tmp_path / "b.txt"]
+
+    async def run():
+        queues = [asyncio.Queue(2) for _ in paths]
+        delegator = async_pipeline.Delegator(batch_size=4)
+        delegator.send_to(
+            (f"{i}\n" for i in range(10)),
+            lambda queue: async_pipeline.broadcast(queue, *queues),
+        )
+        await asyncio.gather(
+            delegator.run_async(),
+            *(
+                async_pipeline.file_sink(queue, path, "w")
+                for queue, path in zip(queues, paths)
+            ),
+        )
+
+    asyncio.run(run())
+    expected = "".join(f"{i}\n" for i in range(10))
+    assert [path.read_text() for path in paths] == [expected, expected]
+
+
+def test_source_error():
+    def source():
+        yield 1
+        raise ValueError("bad source")
+
+    output = []
+    delegator = async_pipeline.Delegator(batch_size=1)
+    delegator.send_to(source(), collect(output))
+    with pytest.raises(ValueError):
+        delegator.run()
@@ -0,0 +1,181 @@
+import os
+
+import pytest
+
+from stack_exchange_graph_data.helpers import cache
+from stack_exchange_graph_data.segd import cache as segd_cache
+from stack_exchange_graph_data.segd import site_info
+
+
+def test_prefetch(server, tmp_path):
+    files = cache.Cache(tmp_path, jobs=2)
+    endpoints = [files.file(f"{name}.7z", server.url(f"{name}.7z")) for name in "abc"]
+    endpoints[2].cache_path.write_bytes(b"cached")
+    try:
+        files.prefetch(
+            [endpoints[0], files.archive_7z("b/Posts.xml", endpoints[1]), endpoints[2]],
+        )
+    finally:
+        files.close()
+    assert endpoints[0].cache_path.read_bytes() == server.data
+    assert endpoints[1].cache_path.read_bytes() == server.data
+    assert endpoints[2].cache_path.read_bytes() == b"cached"
+    assert not (tmp_path / "b").exists()
+
+
+def test_metadata(server, tmp_path):
+    endpoint = cache.Cache(tmp_path).file("file.7z", server.url())
+    endpoint.ensure()
+    assert endpoint.metadata() == {
+        "etag": '"v1"',
+        "last_modified": None,
+        "size": len(server.data),
+    }
+
+
+def test_revalidate(server, tmp_path):
+    endpoint = cache.Cache(tmp_path, revalidate=True).file("file.7z", server.url())
+    endpoint.ensure()
+    server.requests = []
+    endpoint.ensure()
+    assert server.requests == [("HEAD", None)]
+    assert not endpoint.is_stale()
+
+    old = server.data
+    server.data = os.urandom(len(old))
+    server.etag = '"v2"'
+    assert endpoint.is_stale()
+    endpoint.ensure()
+    assert endpoint.cache_path.read_bytes() == server.data
+    assert endpoint.metadata()["etag"] == '"v2"'
+
+
+def test_revalidate_without_metadata(server, tmp_path):
+    endpoint = cache.Cache(tmp_path, revalidate=True).file("file.7z", server.url())
+    endpoint.cache_path.write_bytes(server.data)
+    assert not endpoint.is_stale()
+    assert endpoint.metadata()["etag"] == '"v1"'
+    endpoint.cache_path.write_bytes(b"truncated")
+    assert endpoint.is_stale()
+
+
+def test_no_revalidate(server, tmp_path):
+    endpoint = cache.Cache(tmp_path).file("file.7z", server.url())
+    endpoint.cache_path.write_bytes(b"cached")
+    endpoint.ensure()
+    assert server.requests == []
+    assert endpoint.cache_path.read_bytes() == b"cached"
+
+
+def test_revalidate_archive(server, tmp_path):
+    py7zr = pytest.importorskip("py7zr")
+
+    def archive(data):
+        path = tmp_path / "build.7z"
+        with py7zr.SevenZipFile(path, "w") as archive_file:
+            archive_file.writestr(data, "Posts.xml")
+        return path.read_bytes()
+
+    server.data = archive(b"<posts>v1</posts>")
+    files = cache.Cache(tmp_path / "cache", revalidate=True)
+    posts = files.archive_7z("site/Posts.xml", files.file("site.7z", server.url()))
+    assert posts.ensure().read_bytes() == b"<posts>v1</posts>"
+    server.requests = []
+    assert posts.ensure().read_bytes() == b"<posts>v1</posts>"
+    with posts.open() as file_obj:
+        assert file_obj.read() == b"<posts>v1</posts>"
+    assert server.requests == [("HEAD", None), ("HEAD", None)]
+
+    server.data = archive(b"<posts>v2</posts>")
+    server.etag = '"v2"'
+    server.requests = []
+    assert posts.ensure().read_bytes() == b"<posts>v2</posts>"
+    # Revalidating and downloading the archive, without revalidating it again.
+    assert [method for method, _ in server.requests] == ["HEAD", "HEAD", "GET"]
+
+
+def test_manifest(server, tmp_path):
+    files = cache.Cache(tmp_path)
+    endpoint = files.file("file.7z", server.url())
+    endpoint.ensure()
+    entry = files.manifest.get(endpoint.cache_path)
+    assert entry.size == len(server.data)
+    assert entry.source == server.url()
+    assert files.audit(full=True) == []
+
+    # A truncated file is downloaded again.
+    endpoint.cache_path.write_bytes(server.data[:100])
+    assert files.audit() == [entry]
+    server.requests = []
+    endpoint.ensure()
+    assert server.requests
+    assert endpoint.cache_path.read_bytes() == server.data
+
+
+def test_manifest_rehash(server, tmp_path):
+    cache.Cache(tmp_path).file("file.7z", server.url()).ensure()
+    path = tmp_path / "file.7z"
+    path.write_bytes(bytes(len(server.data)))
+
+    server.requests = []
+    cache.Cache(tmp_path).file("file.7z", server.url()).ensure()
+    assert server.requests == []
+    cache.Cache(tmp_path, verify="full").file("file.7z", server.url()).ensure()
+    assert path.read_bytes() == server.data
+
+
+def test_evict(server, tmp_path):
+    py7zr = pytest.importorskip("py7zr")
+    with py7zr.SevenZipFile(tmp_path / "build.7z", "w") as archive_file:
+        archive_file.writestr(b"<posts />" * 1000, "Posts.xml")
+    server.data = (tmp_path / "build.7z").read_bytes()
+
+    files = cache.Cache(tmp_path / "cache", revalidate=True)
+    sites = {
+        name: files.archive_7z(
+            f"{name}/Posts.xml", files.file(f"{name}.7z", server.url())
+        )
+        for name in "abc"
+    }
+    for posts in sites.values():
+        posts.ensure()
+    sites["a"].ensure()
+    assert files.evict() == []
+
+    # Extracted files go first, least recently used first.
+    archive_size = len(server.data)
+    files.budget = files.manifest.size() - 1
+    assert [entry.path for entry in files.evict()] == ["b/Posts.xml"]
+    assert not (tmp_path / "cache" / "b").exists()
+    files.budget = 3 * archive_size + 9000
+    evicted = files.evict(keep=[tmp_path / "cache" / "a"])
+    assert [entry.path for entry in evicted] == ["c/Posts.xml"]
+    assert (tmp_path / "cache" / "a" / "Posts.xml").exists()
+
+    files.budget = archive_size
+    assert [entry.path for entry in files.evict()] == ["a/Posts.xml", "b.7z", "c.7z"]
+    assert not (tmp_path / "cache" / "b.7z").exists()
+    assert not (tmp_path / "cache" / "b.7z.meta.json").exists()
+    assert sorted(entry.path for entry in files.manifest.entries()) == ["a.7z"]
+    assert sites["b"].ensure().read_bytes() == b"<posts />" * 1000
+
+
+def test_evict_site(server, tmp_path):
+    py7zr = pytest.importorskip("py7zr")
+    with py7zr.SevenZipFile(tmp_path / "build.7z", "w") as archive_file:
+        archive_file.writestr(b"<posts />" * 1000, "Posts.xml")
+    server.data = (tmp_path / "build.7z").read_bytes()
+
+    files = segd_cache.Cache(tmp_path / "cache", server.url(""), ["Posts.xml"])
+    other = site_info.SiteInfo("https://math.stackexchange.com")
+    current = site_info.SiteInfo("https://codereview.stackexchange.com")
+    for site in (other, current):
+        files.site_file(site, "Posts.xml").ensure()
+
+    # The current site's files are kept, even though extracted files go first.
+    files.cache.budget = files.cache.manifest.size() // 2
+    files.evict([current])
+    assert sorted(entry.path for entry in files.cache.manifest.entries()) == [
+        "codereview.stackexchange.com.7z",
+        "codereview/Posts.xml",
+    ]
@@ -0,0 +1,56 @@
+import pytest
+from stack_exchange_graph_data.coroutines import data_sources
+
+SITE = "https://codereview.meta.stackexchange.com"
+
+CORPUS = [
+    "nice one",
+    "see [this](/q/12) and [x](https://a.b/questions/3/foo)",
+    (
+        "Possible duplicate of [How do I foo?]"
+        "(https://codereview.stackexchange.com/questions/1234/how-do-i-foo)"
+    ),
+    (
+        "@user see [meta](https://codereview.meta.stackexchange.com/a/99/12345)"
+        " and [chat](//chat.stackexchange.com/rooms/8595)"
+    ),
+    "<http://auto.com/a/5> also [](/a/7)",
+    "hi [text](other)",
+    "a *b* [c **d**](/q/1)",
+    "**[a](/q/1)** _[b](/q/2)_ [c](/q/3)(x)",
+    'x <a href="http://a.com/q/1?x=1&amp;y">b</a>',
+    "[a](/q/1.md) [b](/q/2#c3) [c](<http://x.com/a b>) [d](http://x.com/é?q=a b)",
+    "\\[a](/q/1) [b\\]](/q/2) `[c](/q/3)` ![i](/q/4) [[e](/q/5)](/q/6)",
+    "``[a](/q/1)`` `` ` `` [b](/q/2) ``unclosed [c](/q/3)",
+    '[a](http://x.com/q/1 "title") [b]( /q/2 ) [c](/q/%41) [d](/q/a%20b)',
+    "<foo@bar.com> <https://x.com/a/1> <not a link> < https://x.com>",
+    "http://bare.com www.x.com [a](www.y.com)",
+    "[a]\n(/q/1) [b](/q/1\n) [c] (/q/2)",
+    "[x](HTTPS://a.com) [y](ftp://a) [z](javascript:alert(1))",
+    (
+        "[a (b) c](https://en.wikipedia.org/wiki/Foo_(bar))"
+        " [d](/q/1 'single') [e](/q/2 (paren))"
+    ),
+    "[a](/q/1?x=1&amp;y=2) [b](https://x.com/a\\_b) [c](<https://x.com/(>)",
+    "[tag:python] [meta-tag:discussion] [help] [edit]",
+    '[a](/q/1 "t"x) [b](/q/2 "unterminated)',
+    "[a] [b][c] [d][] [e](/users/1/foo)",
+    "[a `]` b](/q/8) [c](/q/9)",
+    '[ünï](https://x.com/ünï) [q](https://x.com/q?a="b")',
+    "[a](/q/2) <https://x.com/a/1> [b](/q/1) [c](/q/2) <https://x.com/a/1>",
+]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_comment_engines_agree(text):
+    fast = data_sources.comment_links(SITE, text, "fast")
+    docutils = data_sources.comment_links(SITE, text, "docutils")
+    # Duplicate links are duplicate edges, so the order and amount matter.
+    assert fast == docutils
+
+
+def test_bare_urls():
+    links = data_sources.comment_links(
+        SITE, "see http://a.com/q/1. and `http://b.com` [c](/q/2)", bare_urls=True,
+    )
+    assert links == [SITE + "/q/2", "http://a.com/q/1"]
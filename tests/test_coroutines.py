@@ -0,0 +1,176 @@
+import pytest
+from stack_exchange_graph_data.helpers import coroutines, profiling
+
+
+@coroutines.coroutine
+def collect(output):
+    try:
+        while True:
+            output.append((yield))
+    finally:
+        output.append("exit")
+
+
+@coroutines.coroutine(batch=True)
+def collect_batches(output):
+    try:
+        while True:
+            output.append((yield))
+    finally:
+        output.append("exit")
+
+
+@coroutines.coroutine
+def double(target):
+    while True:
+        target.send(2 * (yield))
+
+
+@coroutines.coroutine(batch=True)
+def double_batch(target):
+    while True:
+        target.send(coroutines.Batch(2 * item for item in (yield)))
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 1024])
+@pytest.mark.parametrize("stage", [double, double_batch])
+def test_single_sink(batch_size, stage):
+    output = []
+    delegator = coroutines.CoroutineDelegator(batch_size)
+    delegator.send_to(range(5), stage(collect(output)))
+    assert delegator.run() == []
+    assert output == [0, 2, 4, 6, 8, "exit"]
+
+
+@pytest.mark.parametrize("stage", [double, double_batch])
+def test_batch_sink(stage):
+    output = []
+    delegator = coroutines.CoroutineDelegator(2)
+    delegator.send_to(range(5), stage(collect_batches(output)))
+    assert delegator.run() == []
+    assert all(isinstance(batch, coroutines.Batch) for batch in output[:-1])
+    assert [item for batch in output[:-1] for item in batch] == [0, 2, 4, 6, 8]
+    assert output[-1] == "exit"
+
+
+def test_multiple_sources():
+    output = []
+    target = collect(output)
+    delegator = coroutines.CoroutineDelegator(2)
+    delegator.send_to(range(3), double(target))
+    delegator.send_to(range(3, 5), double_batch(target))
+    delegator.run()
+    assert output == [0, 2, 4, 6, 8, "exit"]
+
+
+def test_batched():
+    batches = list(coroutines.batched(range(5), 2))
+    assert batches == [[0, 1], [2, 3], [4]]
+    assert all(isinstance(batch, coroutines.Batch) for batch in batches)
+
+
+def test_profiling():
+    output = []
+    profiler = profiling.enable()
+    try:
+        delegator = coroutines.CoroutineDelegator(2)
+        delegator.send_to(range(5), double_batch(double(collect(output))))
+        delegator.run()
+    finally:
+        profiling.disable()
+    assert output == [0, 4, 8, 12, 16, "exit"]
+    stats = {stats.name: stats for stats in profiler.stages}
+    assert set(stats) == {"collect", "double", "double_batch", "double_batch source"}
+    assert stats["double_batch source"].items_out == 5
+    assert stats["double_batch"].items_in == 5
+    assert stats["double_batch"].batches == 3
+    assert stats["double_batch"].peak_batch == 2
+    assert stats["double"].batches == 5
+    assert stats["collect"].items_in == 5
+    assert stats["collect"].items_out == 0
+    for stage in profiler.stages:
+        assert 0 <= stage.self_time <= stage.total_time
+
+
+@pytest.mark.parametrize("batch_size", [1, 16])
+def test_concurrent_merge(batch_size):
+    output = []
+    target = coroutines.Merge(collect(output))
+    delegator = coroutines.CoroutineDelegator(batch_size, concurrent=True)
+    for start in range(0, 4000, 1000):
+        delegator.send_to(range(start, start + 1000), double(target))
+    assert delegator.run() == []
+    assert output[-1] == "exit"
+    assert sorted(output[:-1]) == list(range(0, 8000, 2))
+
+
+def test_exit_closes_targets():
+    # Each stage only sends a single EXIT to its targets, so the sink
+    # closes as soon as its last source exits rather than when it's
+    # garbage collected.
+    output = []
+    sink = collect(output)
+    middle = double(sink)
+    delegator = coroutines.CoroutineDelegator(1)
+    delegator.send_to(range(3), double(middle))
+    delegator.send_to(range(3, 4), middle)
+    assert delegator.run() == []
+    assert output == [0, 4, 8, 6, "exit"]
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2", "lzma"])
+def test_csv_sink(tmp_path, compression):
+    path = str(tmp_path / "output.csv")
+    rows = [(i, f"name{i}", i % 3 == 0) for i in range(10)] + [(1, 2)]
+    delegator = coroutines.CoroutineDelegator(4)
+    delegator.send_to(
+        rows,
+        coroutines.csv_sink(
+            path, ("Id", "Name", "Flag"), compression=compression, batch_size=3,
+        ),
+    )
+    assert delegator.run() == []
+    if compression is None:
+        text = (tmp_path / "output.csv").read_text()
+    else:
+        opener, suffix = coroutines.COMPRESSIONS[compression]
+        assert not (tmp_path / "output.csv").exists()
+        with opener(path + suffix, "rt") as file_obj:
+            text = file_obj.read()
+    assert text == "Id;Name;Flag\n" + "".join(
+        ";".join(map(str, row)) + "\n" for row in rows
+    )
+
+
+def test_csv_sink_delimiter(tmp_path):
+    path = str(tmp_path / "output.csv")
+    delegator = coroutines.CoroutineDelegator()
+    delegator.send_to(
+        [("a", "100%"), ("b", 1)], coroutines.csv_sink(path, delimiter="%,"),
+    )
+    delegator.run()
+    assert (tmp_path / "output.csv").read_text() == "a%,100%\nb%,1\n"
+
+
+@coroutines.coroutine(batch=True)
+def take_batch(output):
+    output.extend((yield))
+
+
+def test_closed_early_lazy():
+    pulled = []
+
+    def source():
+        for item in range(100):
+            pulled.append(item)
+            yield item
+
+    output = []
+    delegator = coroutines.CoroutineDelegator(2)
+    delegator.send_to(source(), take_batch(output))
+    (rest,) = delegator.run()
+    assert output == [0, 1]
+    # Only the batch that was being sent has been read from the source.
+    assert pulled == [0, 1, 2, 3]
+    assert list(rest) == list(range(2, 100))
+    assert len(pulled) == 100
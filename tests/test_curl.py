@@ -0,0 +1,58 @@
+import os
+
+import pytest
+import requests
+from stack_exchange_graph_data.helpers import curl
+
+
+@pytest.mark.parametrize("connections", [1, 4])
+def test_ranges(server, tmp_path, connections):
+    path = tmp_path / "file.7z"
+    curl.curl(path, server.url(), chunk_size=7000, connections=connections)
+    assert path.read_bytes() == server.data
+    gets = [header for method, header in server.requests if method == "GET"]
+    assert len(gets) == 15
+    assert all(header.startswith("bytes=") for header in gets)
+    assert sorted(os.listdir(tmp_path)) == ["file.7z"]
+
+
+def test_no_ranges(server, tmp_path):
+    server.ranges = False
+    path = tmp_path / "file.7z"
+    curl.curl(path, server.url(), chunk_size=7000)
+    assert path.read_bytes() == server.data
+    assert server.requests == [("HEAD", None), ("GET", None)]
+
+
+def test_resume(server, tmp_path):
+    path = tmp_path / "file.7z"
+    server.fail_after = 30000
+    with pytest.raises(requests.RequestException):
+        curl.curl(path, server.url(), chunk_size=20000, connections=1)
+    assert not path.exists()
+    assert (tmp_path / "file.7z.part.json").exists()
+
+    server.requests = []
+    curl.curl(path, server.url(), chunk_size=20000, connections=1)
+    assert path.read_bytes() == server.data
+    gets = [header for method, header in server.requests if method == "GET"]
+    # Data read before the connection dropped may be lost, but the
+    # completed range isn't downloaded again.
+    assert gets[0] in ("bytes=20000-39999", "bytes=30000-39999")
+    assert gets[1:] == ["bytes=40000-59999", "bytes=60000-79999", "bytes=80000-99999"]
+    assert sorted(os.listdir(tmp_path)) == ["file.7z"]
+
+
+@pytest.mark.parametrize("etag", ['"v2"', None])
+def test_resume_changed(server, tmp_path, etag):
+    path = tmp_path / "file.7z"
+    # Without an ETag the changed file can't be told apart by its size.
+    server.etag = None if etag is None else '"v1"'
+    server.fail_after = 30000
+    with pytest.raises(requests.RequestException):
+        curl.curl(path, server.url(), chunk_size=20000, connections=1)
+
+    server.data = os.urandom(100000)
+    server.etag = etag
+    curl.curl(path, server.url(), chunk_size=20000, connections=1)
+    assert path.read_bytes() == server.data
@@ -0,0 +1,72 @@
+from xml.etree import ElementTree
+
+from stack_exchange_graph_data import driver
+from stack_exchange_graph_data.coroutines import data_sources as ds
+from stack_exchange_graph_data.helpers import coroutines
+from stack_exchange_graph_data.segd import graph, models
+
+
+@coroutines.coroutine(batch=True)
+def collect(output):
+    while True:
+        output.extend((yield))
+
+
+def post(id_, tags=None, parent_id=None):
+    return models.Post(id=id_, links=[], tags=tags, parent_id=parent_id)
+
+
+def test_resolve_tags():
+    posts = coroutines.Batch(
+        [post(1, ["a", "b"]), post(2, parent_id=1), post(3, parent_id=9), post(4)],
+    )
+    original = list(posts)
+    output = []
+    ds.resolve_tags(collect(output)).send(posts)
+    assert [p.tags for p in output] == [["a", "b"], ["a", "b"], None, None]
+    assert list(posts) == original
+
+
+SITE = "https://codereview.meta.stackexchange.com"
+COMMENTS = [
+    ("1", "see [this](/q/5)"),
+    ("2", "nice one"),
+    ("3", f"<{SITE}/a/7> and [x]({SITE}/questions/8/y)"),
+]
+
+
+def test_parse_comments():
+    comments = ds.parse_comments(SITE, COMMENTS)
+    assert [comment.id for comment in comments] == [1, 2, 3]
+    assert comments[0].links == [f"{SITE}/q/5"]
+    assert comments[1].links == []
+    assert comments[2].links == [f"{SITE}/a/7", f"{SITE}/questions/8/y"]
+
+
+def test_load_comments_parallel(monkeypatch):
+    monkeypatch.setattr(driver, "COMMENT_CHUNK_SIZE", 2)
+    rows = [
+        ElementTree.Element("row", PostId=post_id, Text=text)
+        for post_id, text in COMMENTS * 3
+    ]
+    assert list(driver.load_comments_parallel(rows, SITE, 2)) == ds.parse_comments(
+        SITE, COMMENTS * 3,
+    )
+
+
+def test_load_post_links():
+    rows = [
+        ElementTree.Element("row", PostId="1", RelatedPostId="2", LinkTypeId="1"),
+        ElementTree.Element("row", PostId="3", RelatedPostId="4", LinkTypeId="3"),
+        ElementTree.Element("row", PostId="5", RelatedPostId="6", LinkTypeId="99"),
+    ]
+    output = []
+    ds.load_post_links(collect(output)).send(coroutines.Batch(rows))
+    assert output == [
+        (1, 2, graph.LinkType.LINKED),
+        (3, 4, graph.LinkType.DUPLICATE),
+    ]
+    assert ds.POST_LINK_TYPES == {
+        "1": graph.LinkType.LINKED,
+        "3": graph.LinkType.DUPLICATE,
+    }
@@ -0,0 +1,122 @@
+from xml.etree import ElementTree
+
+import pytest
+from stack_exchange_graph_data import cli, driver
+from stack_exchange_graph_data.segd import graph, site_info
+
+
+def test_output(run_driver):
+    edges, nodes = run_driver()
+    assert edges.startswith("Source;Target;Weight;Type\n")
+    assert len(edges.splitlines()) > 1
+    assert len(nodes.splitlines()) > 1
+
+
+@pytest.mark.parametrize("jobs", ["2", "3"])
+def test_parallel_posts(run_driver, monkeypatch, jobs):
+    serial = run_driver("--link-source", "scrape")
+    # Small shards so range boundaries fall inside rows.
+    monkeypatch.setattr(driver, "SHARD_SIZE", 1000)
+    assert run_driver("--link-source", "scrape", "--jobs", jobs) == serial
+
+
+def edge_set(edges):
+    return {tuple(line.split(";")[:2]) for line in edges.splitlines()[1:]}
+
+
+def test_link_source(run_driver, dump):
+    scrape, _ = run_driver("--link-source", "scrape")
+    postlinks, _ = run_driver("--link-source", "postlinks")
+    all_, _ = run_driver("--link-source", "all")
+    assert edge_set(all_) == edge_set(scrape) | edge_set(postlinks)
+    assert edge_set(postlinks) < edge_set(all_)
+    # Comment links are only scraped.
+    assert {line.split(";")[2] for line in postlinks.splitlines()[1:]} <= {"2", "3"}
+
+    post_links = ElementTree.parse(str(dump / "PostLinks.xml")).getroot()
+    linked = {
+        (row.attrib["PostId"], row.attrib["RelatedPostId"])
+        for row in post_links
+        if row.attrib["LinkTypeId"] in ("1", "3")
+        and row.attrib["PostId"] != row.attrib["RelatedPostId"]
+    }
+    assert linked <= edge_set(postlinks)
+
+
+def read_csv(text):
+    header, *rows = [line.split(";") for line in text.splitlines()]
+    return header, rows
+
+
+@pytest.mark.parametrize(
+    "min_, max_",
+    [("0", "100000"), ("1", "100"), ("2", "100000"), ("2", "5"), ("6", "100")],
+)
+def test_nodes_joined(run_driver, min_, max_):
+    edges, nodes = run_driver("--min", min_, "--max", max_)
+    all_edges, _ = run_driver()
+    _, edge_rows = read_csv(all_edges)
+    header, node_rows = read_csv(nodes)
+    assert header[:3] == ["Id", "Network", "Network Size"]
+
+    graph_ = graph.Graph()
+    for source, target, *_ in edge_rows:
+        graph_.add(int(source), int(target), graph.LinkType.PL)
+    networks = {
+        node: network
+        for network in map(frozenset, reference_networks(graph_))
+        for node in network
+    }
+    output = {int(row[0]): (int(row[1]), int(row[2])) for row in node_rows}
+    output_edges = {int(node) for row in read_csv(edges)[1] for node in row[:2]}
+    assert output
+    assert all(int(min_) <= size <= int(max_) for _, size in output.values())
+
+    by_network = {}
+    for post_id, (network, size) in output.items():
+        assert post_id in output_edges or size == 1
+        if post_id in networks:
+            members = networks[post_id]
+            assert size == len(members)
+        else:
+            # Posts without links are their own network.
+            assert size == 1
+            members = frozenset([post_id])
+        assert by_network.setdefault(network, members) == members
+
+    isolated = [post_id for post_id in output if post_id not in networks]
+    assert bool(isolated) == (min_ in ("0", "1"))
+
+
+def reference_networks(graph_):
+    return [{node.value for node in network} for network in graph_.get_networks()]
+
+
+def test_no_extract_jobs(run_driver):
+    expected = run_driver()
+    assert run_driver("--no-extract", "--jobs", "2") == expected
+    assert run_driver.file_systems[-1].extracted == []
+    run_driver("--jobs", "2")
+    assert run_driver.file_systems[-1].extracted == ["Posts.xml", "Comments.xml"]
+
+
+def test_main_evicts_site(monkeypatch, tmp_path):
+    site = site_info.SiteInfo("https://codereview.meta.stackexchange.com")
+    evicted = []
+
+    class FileSystem:
+        def __init__(self, cache):
+            self.cache = cache
+
+        def get_site_info(self, site_name, use_cache=True):
+            raise AssertionError("The site is only looked up by navigate.")
+
+    monkeypatch.setattr(driver.file_system, "FileSystem", FileSystem)
+    monkeypatch.setattr(driver, "navigate", lambda file_system, arguments: site)
+    monkeypatch.setattr(
+        driver.cache.Cache, "evict", lambda self, sites: evicted.extend(sites),
+    )
+    driver.main(
+        cli.make_parser().parse_args(["codereview.meta", "--cache-dir", str(tmp_path)]),
+    )
+    assert evicted == [site]
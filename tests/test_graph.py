@@ -0,0 +1,217 @@
+import argparse
+import random
+from array import array
+
+import pytest
+from stack_exchange_graph_data.coroutines import links
+from stack_exchange_graph_data.helpers import coroutines
+from stack_exchange_graph_data.segd import graph
+
+SITE = "codereview.meta.stackexchange.com"
+
+
+def make_edges(seed=1, amount=120, nodes=80):
+    random_ = random.Random(seed)
+    edges = [
+        (
+            random_.randint(1, nodes),
+            random_.randint(1, nodes),
+            random_.choice(list(graph.LinkType)),
+        )
+        for _ in range(amount)
+    ]
+    # Small networks of a known size.
+    edges += [(1000, 1001, graph.LinkType.PL), (1001, 1000, graph.LinkType.CL)]
+    edges += [(2000, 2001, graph.LinkType.QAA), (2001, 2002, graph.LinkType.LINKED)]
+    edges += [(3000, 3000, graph.LinkType.PL)]
+    return edges
+
+
+@coroutines.coroutine(batch=True)
+def collect(output):
+    while True:
+        output.extend((yield))
+
+
+def run_filter(edges, min_=0, max_=float("inf")):
+    output = []
+    indexes = []
+    arguments = argparse.Namespace(min=min_, max=max_)
+    delegator = coroutines.CoroutineDelegator(7)
+    delegator.send_to(
+        edges, links.filter_network_size(arguments, collect(output), collect(indexes)),
+    )
+    delegator.run()
+    (index,) = indexes
+    return output, index
+
+
+def reference_networks(edges):
+    """Networks found by the original Graph implementation."""
+    graph_ = graph.Graph()
+    for edge in edges:
+        graph_.add(*edge)
+    return [{node.value for node in network} for network in graph_.get_networks()]
+
+
+def test_disjoint_set():
+    components = graph.DisjointSet()
+    indexes = [components.add(value) for value in [10, 20, 30, 40, 50]]
+    assert indexes == [0, 1, 2, 3, 4]
+    assert components.add(30) == 2
+    assert len(components) == 5
+    components.union(0, 1)
+    components.union(3, 4)
+    components.union(4, 1)
+    components.union(1, 0)
+    assert components.find(0) == components.find(4)
+    assert components.find(2) == 2
+    assert components.find(2) != components.find(0)
+    networks, sizes = components.networks()
+    # Numbered in the order their first node was added.
+    assert list(networks) == [0, 0, 1, 0, 0]
+    assert list(sizes) == [4, 1]
+
+
+def test_counting_sort():
+    keys = [2, 0, 1, 0, 2, 1]
+    assert list(graph.counting_sort(keys, 3)) == [1, 3, 2, 5, 0, 4]
+    _, offsets = graph._counting_sort(keys + [0], 4)
+    assert list(offsets) == [0, 3, 5, 7, 7]
+
+
+@pytest.mark.parametrize("min_, max_", [(0, float("inf")), (2, 2), (3, 40), (50, 1000)])
+def test_filter_network_size(min_, max_):
+    edges = make_edges()
+    output, index = run_filter(edges, min_, max_)
+    networks = reference_networks(edges)
+    kept = [network for network in networks if min_ <= len(network) <= max_]
+    kept_nodes = set().union(*kept)
+    expected = [
+        (source, target, type_.value.weight, type_.value.type)
+        for source, target, type_ in edges
+        if source in kept_nodes
+    ]
+    assert sorted(output) == sorted(expected)
+
+    # Edges are grouped by network, in the order the network's first
+    # node was seen, and are otherwise in the order they were received.
+    network_of = {node: i for i, network in enumerate(kept) for node in network}
+    first_seen = {}
+    for source, target, _ in edges:
+        for node in (source, target):
+            if node in network_of:
+                first_seen.setdefault(network_of[node], len(first_seen))
+    expected.sort(key=lambda edge: first_seen[network_of[edge[0]]])
+    assert output == expected
+
+    assert len(index) == len(kept_nodes)
+    assert sorted(index.sizes) == sorted(len(network) for network in kept)
+    for network in kept:
+        (found,) = {index.get(node) for node in network}
+        assert found[1] == len(network)
+
+
+def test_filter_links_int_ids():
+    # Scraped links used to keep the target id as a string, so a post
+    # reached by a link and by a Q&A link was two nodes.
+    output = []
+    delegator = coroutines.CoroutineDelegator()
+    delegator.send_to(
+        [
+            (1, f"https://{SITE}/q/2", graph.LinkType.PL),
+            (3, f"https://{SITE}/questions/4/title", graph.LinkType.PL),
+            (5, "https://example.com/q/6", graph.LinkType.PL),
+        ],
+        links.filter_links({SITE}, collect(output)),
+    )
+    delegator.run()
+    assert output == [(1, 2, graph.LinkType.PL), (3, 4, graph.LinkType.PL)]
+
+    edges = output + [(2, 3, graph.LinkType.QAA)]
+    _, index = run_filter(edges)
+    assert {index.get(node) for node in [1, 2, 3, 4]} == {(0, 4)}
+
+
+def network_summary(networks):
+    return [
+        {
+            node.value: (
+                sorted((edge.target.value, edge.type.name) for edge in node.links),
+                sorted(source.value for source in node.inv_links),
+            )
+            for node in network
+        }
+        for network in networks
+    ]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_csr_graph(seed):
+    edges = make_edges(seed)
+    graph_ = graph.Graph()
+    csr = graph.CSRGraph()
+    for edge in edges:
+        graph_.add(*edge)
+        csr.add(*edge)
+    networks = csr.get_networks()
+    assert not isinstance(networks, list)
+    assert network_summary(networks) == network_summary(graph_.get_networks())
+
+
+def reference_edges(edges):
+    """Heaviest link type of each edge, ties going to the first declared."""
+    order = list(graph.LinkType)
+    best = {}
+    for source, target, link_type in edges:
+        current = best.get((source, target))
+        if current is None or (link_type.value.weight, -order.index(link_type)) > (
+            current.value.weight,
+            -order.index(current),
+        ):
+            best[source, target] = link_type
+    return [(source, target, best[source, target]) for source, target in sorted(best)]
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_packed_edges(batch):
+    if batch:
+        pytest.importorskip("numpy")
+    edges = make_edges(amount=400, nodes=20)
+    big = 2 ** 32
+    edges += [
+        (big, 1, graph.LinkType.CL),
+        (big, 1, graph.LinkType.PL),
+        (1, big + 5, graph.LinkType.QAA),
+        (-1, 2, graph.LinkType.PL),
+        (2, 3, graph.LinkType.CL),
+        (2, 3, graph.LinkType.DUPLICATE),
+        (2, 3, graph.LinkType.QAA),
+        (4, 5, graph.LinkType.LINKED),
+        (4, 5, graph.LinkType.PL),
+    ]
+    packed = graph.PackedEdges(batch)
+    # Compact the buffered edges several times when batching.
+    packed.BATCH_SIZE = 64
+    for edge in edges:
+        packed.add(*edge)
+    output = list(packed)
+    expected = reference_edges(edges)
+    # Edges with ids that can't be packed are merged in order.
+    assert output == sorted(expected, key=lambda edge: edge[:2])
+    assert output[0][:2] == (-1, 2)
+    output = {edge[:2]: edge[2] for edge in output}
+    assert output[big, 1] is graph.LinkType.PL
+    assert output[1, big + 5] is graph.LinkType.QAA
+    assert output[2, 3] is graph.LinkType.QAA
+    assert output[4, 5] is graph.LinkType.PL
+
+
+def test_network_index_join():
+    index = graph.NetworkIndex(
+        array("q", [2, 5, 9, 12]), array("q", [0, 1, 0, 1]), array("q", [2, 2]),
+    )
+    values = [1, 2, 5, 6, 12, 13, 5, 9, 2, 100]
+    assert list(index.join(values)) == [index.get(value) for value in values]
+    assert index.get(9) == (0, 2)
+    assert index.get(6) is None
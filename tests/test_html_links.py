@@ -0,0 +1,28 @@
+import pytest
+from bs4 import BeautifulSoup
+from stack_exchange_graph_data.helpers import html_links
+
+CORPUS = [
+    "<p>no links</p>",
+    '<p><a href="https://a.com/q/1">a</a> and <A HREF="/q/2">b</A></p>',
+    '<a href="/q/1" href="/q/2">repeated</a>',
+    '<a href="http://a.com/q/1?x=1&amp;y=2">entities</a>',
+    "<a name=\"anchor\">no href</a> <a href='/q/3'>single quotes</a>",
+    '<a href>empty</a> <a href="">empty</a>',
+    '<pre><code>&lt;a href="/q/4"&gt;escaped&lt;/a&gt;</code></pre>',
+    '<a href="/q/5"><img src="x.png"></a> <a\nhref="/q/6">newline</a>',
+    '<a href="/q/7">unclosed <a href="/q/8">nested',
+]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_matches_beautifulsoup(text):
+    anchors = BeautifulSoup(text, features="html.parser").find_all("a")
+    expected = [a.get("href") for a in anchors if a.get("href") is not None]
+    assert html_links.find_links(text) == expected
+
+
+def test_skips_anchors_without_href():
+    assert html_links.find_links('<a name="x">a</a><a id="y" href="/q/1">b</a>') == [
+        "/q/1"
+    ]
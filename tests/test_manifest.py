@@ -0,0 +1,119 @@
+import os
+import sqlite3
+
+import pytest
+from stack_exchange_graph_data.helpers import files, manifest
+
+
+def test_block_hasher(tmp_path):
+    path = tmp_path / "file"
+    data = os.urandom(3 * files.BLOCK_SIZE + 100)
+    path.write_bytes(data)
+    hasher = files.BlockHasher(len(data))
+    # Segments that don't line up with the blocks, written out of order.
+    for start, end in [(files.BLOCK_SIZE + 7, len(data)), (0, files.BLOCK_SIZE + 7)]:
+        writer = hasher.writer(start)
+        for position in range(start, end, 100000):
+            writer.update(data[position : min(position + 100000, end)])
+    assert sorted(hasher.digests) == [0, 2, 3]
+    assert hasher.hexdigest(path) == files.hash_file(path)
+
+
+def test_block_hasher_longer(tmp_path):
+    path = tmp_path / "file"
+    data = os.urandom(2 * files.BLOCK_SIZE + 10)
+    path.write_bytes(data)
+    # The body is longer than the declared length.
+    hasher = files.BlockHasher(files.BLOCK_SIZE + 5)
+    writer = hasher.writer()
+    for position in range(0, len(data), 100000):
+        writer.update(data[position : position + 100000])
+    assert hasher.hexdigest(path) == files.hash_file(path)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permissions")
+def test_atomic_open_umask(tmp_path):
+    umask = os.umask(0o027)
+    try:
+        with files.atomic_open(tmp_path / "file") as file_obj:
+            file_obj.write(b"data")
+    finally:
+        os.umask(umask)
+    assert (tmp_path / "file").stat().st_mode & 0o777 == 0o640
+    assert [path.name for path in tmp_path.iterdir()] == ["file"]
+
+
+def test_check(tmp_path):
+    records = manifest.Manifest(tmp_path / "manifest.sqlite3")
+    path = tmp_path / "site" / "Posts.xml"
+    path.parent.mkdir()
+    path.write_bytes(b"<posts />")
+    assert records.check(path) is None
+
+    records.record(path, files.hash_file(path), tmp_path / "site.7z")
+    entry = records.get(path)
+    assert (entry.path, entry.size, entry.source) == ("site/Posts.xml", 9, "site.7z")
+    assert records.check(path)
+    assert records.check(path, full=True)
+
+    path.write_bytes(b"<posts/> ")
+    assert records.check(path)
+    assert not records.check(path, full=True)
+    assert records.verify() == []
+    assert records.verify(full=True) == [records.get(path)]
+
+    path.write_bytes(b"<po")
+    assert not records.check(path)
+    path.unlink()
+    assert not records.check(path)
+
+    records.remove(path)
+    assert records.entries() == []
+
+
+def test_least_recently_used(tmp_path, monkeypatch):
+    records = manifest.Manifest(tmp_path / "manifest.sqlite3")
+    now = [0.0]
+    monkeypatch.setattr(manifest.time, "time", lambda: now[0])
+    for name, source in [
+        ("a.7z", "http://a/"),
+        ("a/Posts.xml", tmp_path / "a.7z"),
+        ("b.7z", "http://b/"),
+    ]:
+        now[0] += 1
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_bytes(b"data")
+        records.record(tmp_path / name, "digest", source)
+    now[0] += 1
+    records.touch(tmp_path / "a.7z")
+
+    def order(derived_first):
+        return [e.path for e in records.least_recently_used(derived_first)]
+
+    assert order(False) == ["a/Posts.xml", "b.7z", "a.7z"]
+    assert order(True) == ["a/Posts.xml", "b.7z", "a.7z"]
+    now[0] += 1
+    records.touch(tmp_path / "a" / "Posts.xml")
+    assert order(False) == ["b.7z", "a.7z", "a/Posts.xml"]
+    assert order(True) == ["a/Posts.xml", "b.7z", "a.7z"]
+    assert records.size() == 12
+
+
+def test_schema_once(tmp_path, monkeypatch):
+    records = manifest.Manifest(tmp_path / "manifest.sqlite3")
+    path = tmp_path / "file"
+    path.write_bytes(b"data")
+    records.record(path, "digest")
+    statements = []
+    connect = sqlite3.connect
+
+    def traced(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(manifest.sqlite3, "connect", traced)
+    records.touch(path)
+    assert records.check(path)
+    assert statements
+    assert not any("CREATE" in statement for statement in statements)
@@ -0,0 +1,35 @@
+import collections
+import random
+
+import pytest
+from stack_exchange_graph_data.coroutines import nodes
+
+
+def make_posts(seed):
+    random_ = random.Random(seed)
+    names = [f"tag{i}" for i in range(50)]
+    return [
+        (post_id, random_.sample(names, random_.randint(0, 5)))
+        for post_id in range(1, 300)
+    ]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+@pytest.mark.parametrize("amount", [1, 5, nodes.TOP_TAGS, 100])
+def test_tag_store(seed, amount):
+    posts = make_posts(seed)
+    store = nodes._TagStore()
+    counter = collections.Counter()
+    for post_id, tags in posts:
+        store.add(post_id, tags)
+        counter.update(tags)
+
+    top = store.most_common(amount)
+    assert [store.names[tag] for tag in top] == [
+        name for name, _ in counter.most_common(amount)
+    ]
+    assert list(store.posts) == [post_id for post_id, _ in posts]
+    for (_, tags), mask in zip(posts, store.masks(top)):
+        assert [store.names[tag] in tags for tag in top] == [
+            bool(mask >> i & 1) for i in range(len(top))
+        ]
@@ -0,0 +1,33 @@
+import io
+
+from stack_exchange_graph_data.helpers import progress, si
+
+
+def test_si_zero():
+    assert si.Magnitude.ibyte(0) == (0, "B")
+    assert si.Magnitude.number(0) == (0, "")
+    assert si.display(si.Magnitude.ibyte(0)) == "  0.00B"
+    assert si.Magnitude.ibyte(2048) == (2, "KiB")
+
+
+def test_byte_progress_stream(capsys):
+    file_obj = io.BytesIO(b"x" * 4096)
+    rows = [file_obj.read(1024) for _ in range(4)]
+    stream = progress.ByteProgressStream(
+        iter(rows), file_obj.tell, 4096, message="Reading",
+    )
+    assert list(stream) == rows
+    lines = capsys.readouterr().out.split("\r")
+    assert lines[0] == "Reading\n"
+    status = lines[-1]
+    assert status.startswith("[" + "=" * 19 + ">]   4.00KiB ")
+    assert "rows/s" in status
+    assert status.endswith(" ETA 0:00:00\n")
+
+
+def test_byte_progress_stream_unknown_size(capsys):
+    stream = progress.ByteProgressStream(iter([b""]), lambda: 0, None)
+    assert list(stream) == [b""]
+    status = capsys.readouterr().out.split("\r")[-1]
+    assert not status.startswith("[")
+    assert "ETA" not in status
@@ -0,0 +1,137 @@
+import os
+
+import py7zlib
+import pytest
+from stack_exchange_graph_data.helpers import cache, files, sevenzip
+
+py7zr = pytest.importorskip("py7zr")
+
+FILES = {
+    "a.xml": b"<rows>\n" + b'  <row Id="1" />\n' * 5000 + b"</rows>\n",
+    "b.xml": os.urandom(50000),
+    "c.xml": b"",
+}
+FILTERS = {
+    "lzma": [{"id": py7zr.FILTER_LZMA}],
+    "lzma2": [{"id": py7zr.FILTER_LZMA2}],
+    "copy": [{"id": py7zr.FILTER_COPY}],
+    "bcj": [{"id": py7zr.FILTER_X86}, {"id": py7zr.FILTER_LZMA2}],
+}
+
+
+def make_archive(path, filters):
+    with py7zr.SevenZipFile(path, "w", filters=filters) as archive:
+        for name, data in FILES.items():
+            archive.writestr(data, name)
+    return path
+
+
+@pytest.fixture(params=sorted(FILTERS))
+def archive(request, tmp_path):
+    return make_archive(tmp_path / "archive.7z", FILTERS[request.param])
+
+
+@pytest.mark.parametrize("chunk_size", [100, sevenzip.CHUNK_SIZE])
+def test_iter_member(archive, chunk_size):
+    with archive.open("rb") as file_obj:
+        members = py7zlib.Archive7z(file_obj)
+        for name, data in FILES.items():
+            member = members.getmember(name)
+            assert b"".join(sevenzip.iter_member(file_obj, member, chunk_size)) == data
+
+
+def test_open_member(archive):
+    with archive.open("rb") as file_obj:
+        with sevenzip.open_member(file_obj, "a.xml") as member:
+            assert member.size == len(FILES["a.xml"])
+            assert member.read(7) == b"<rows>\n"
+            assert member.tell() == 7
+            assert member.read() == FILES["a.xml"][7:]
+            assert member.tell() == member.size
+
+
+@pytest.mark.parametrize("filters", ["lzma", "copy"])
+def test_truncated_block(tmp_path, filters):
+    archive = make_archive(tmp_path / "archive.7z", FILTERS[filters])
+    with archive.open("rb") as file_obj:
+        member = py7zlib.Archive7z(file_obj).getmember("b.xml")
+        # The data after the block isn't read in place of the missing data.
+        member.compressed //= 2
+        with pytest.raises(py7zlib.DecompressionError):
+            b"".join(sevenzip.iter_member(file_obj, member))
+
+
+def test_crc_mismatch(tmp_path):
+    archive = make_archive(tmp_path / "archive.7z", FILTERS["lzma2"])
+    with archive.open("rb") as file_obj:
+        member = py7zlib.Archive7z(file_obj).getmember("a.xml")
+        member.digest ^= 1
+        with pytest.raises(py7zlib.DecompressionError):
+            b"".join(sevenzip.iter_member(file_obj, member))
+
+
+def test_archive_cache(tmp_path):
+    archive = make_archive(tmp_path / "archive.7z", FILTERS["lzma2"])
+    files = cache.Cache(tmp_path)
+    archive_cache = files.file("archive.7z", "http://invalid/")
+    a_cache = files.archive_7z("site/a.xml", archive_cache, ["b.xml"])
+
+    with a_cache.open() as file_obj:
+        assert file_obj.read() == FILES["a.xml"]
+    assert not (tmp_path / "site").exists()
+
+    assert a_cache.ensure().read_bytes() == FILES["a.xml"]
+    assert (tmp_path / "site" / "b.xml").read_bytes() == FILES["b.xml"]
+    assert not (tmp_path / "site" / "c.xml").exists()
+    with a_cache.open() as file_obj:
+        assert file_obj.name == str(tmp_path / "site" / "a.xml")
+
+
+def make_blocks(path):
+    make_archive(path, FILTERS["lzma2"])
+    with py7zr.SevenZipFile(path, "a", filters=FILTERS["lzma"]) as archive:
+        archive.writestr(FILES["a.xml"][::-1], "d.xml")
+    return path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_extract(tmp_path, jobs):
+    archive = make_blocks(tmp_path / "archive.7z")
+    output = tmp_path / "output"
+    digests = sevenzip.extract(archive, output, ["b.xml", "c.xml", "d.xml"], jobs)
+    assert list(digests) == [output / "b.xml", output / "c.xml", output / "d.xml"]
+    assert all(files.hash_file(path) == digests[path] for path in digests)
+    assert sorted(path.name for path in output.iterdir()) == ["b.xml", "c.xml", "d.xml"]
+    assert (output / "b.xml").read_bytes() == FILES["b.xml"]
+    assert (output / "c.xml").read_bytes() == b""
+    assert (output / "d.xml").read_bytes() == FILES["a.xml"][::-1]
+
+
+def test_extract_corrupt(tmp_path):
+    archive = make_archive(tmp_path / "archive.7z", FILTERS["copy"])
+    with archive.open("r+b") as file_obj:
+        member = py7zlib.Archive7z(file_obj).getmember("b.xml")
+        file_obj.seek(member._src_start + member._start + 100)
+        byte = file_obj.read(1)
+        file_obj.seek(-1, os.SEEK_CUR)
+        file_obj.write(bytes([byte[0] ^ 1]))
+    output = tmp_path / "output"
+    output.mkdir()
+    (output / "b.xml").write_bytes(b"old")
+    with pytest.raises(py7zlib.DecompressionError):
+        sevenzip.extract(archive, output)
+    assert (output / "a.xml").read_bytes() == FILES["a.xml"]
+    assert (output / "b.xml").read_bytes() == b"old"
+    assert sorted(path.name for path in output.iterdir()) == ["a.xml", "b.xml"]
+
+
+def test_archive_cache_manifest(tmp_path):
+    make_archive(tmp_path / "archive.7z", FILTERS["lzma2"])
+    files_ = cache.Cache(tmp_path)
+    archive_cache = files_.file("archive.7z", "http://invalid/")
+    a_cache = files_.archive_7z("site/a.xml", archive_cache)
+    a_cache.ensure()
+    entries = {entry.path: entry for entry in files_.manifest.entries()}
+    assert sorted(entries) == ["site/a.xml", "site/b.xml", "site/c.xml"]
+    assert all(entry.source == "archive.7z" for entry in entries.values())
+    assert files_.audit(full=True) == []
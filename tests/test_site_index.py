@@ -0,0 +1,54 @@
+import os
+
+import pytest
+from stack_exchange_graph_data.segd import cache, file_system, site_index
+
+SITES = b"""<?xml version="1.0" encoding="utf-8"?>
+<sites>
+  <row Id="1" TinyName="so" Name="Stack Overflow" LongName="Stack Overflow"
+       Url="https://stackoverflow.com" />
+  <row Id="2" TinyName="meta.so" Name="Meta Stack Overflow"
+       LongName="Meta Stack Overflow" Url="https://meta.stackoverflow.com" />
+  <row Id="3" TinyName="codereview" Name="Code Review"
+       LongName="Code Review Stack Exchange"
+       Url="https://codereview.stackexchange.com" />
+</sites>
+"""
+
+
+@pytest.fixture
+def file_system_(tmp_path):
+    (tmp_path / "Sites.xml").write_bytes(SITES)
+    return file_system.FileSystem(cache.Cache(tmp_path, "http://invalid/"))
+
+
+def test_lookup(file_system_):
+    names = ["so", "meta stack overflow", "Code Review", "codereview.stackexchange.com"]
+    assert [site.domain for site in file_system_.get_sites_info(names)] == [
+        "stackoverflow.com",
+        "meta.stackoverflow.com",
+        "codereview.stackexchange.com",
+        "codereview.stackexchange.com",
+    ]
+    assert file_system_.get_site_info("meta.so").name == "meta.stackoverflow"
+    with pytest.raises(ValueError):
+        file_system_.get_site_info("serverfault")
+
+
+def test_rebuild(file_system_, tmp_path, monkeypatch):
+    built = []
+    build = site_index._build
+    monkeypatch.setattr(
+        site_index, "_build", lambda path: built.append(path) or build(path)
+    )
+    file_system_.get_site_info("so")
+    file_system_.get_site_info("codereview")
+    assert len(built) == 1
+    assert (tmp_path / "Sites.index.json").exists()
+
+    sites = tmp_path / "Sites.xml"
+    sites.write_bytes(SITES.replace(b'"so"', b'"stackoverflow"'))
+    stat = sites.stat()
+    os.utime(sites, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert file_system_.get_site_info("stackoverflow").domain == "stackoverflow.com"
+    assert len(built) == 2
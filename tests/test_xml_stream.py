@@ -0,0 +1,86 @@
+import io
+
+import pytest
+from defusedxml import ElementTree
+from stack_exchange_graph_data.helpers import xml_stream
+
+XML = b"""<?xml version="1.0" encoding="utf-8"?>
+<posts>
+  <row Id="1" Body="&lt;p&gt;a&lt;/p&gt;" />
+  <other Id="2" />
+  <row Id="3" Title="caf\xc3\xa9" />
+</posts>
+"""
+
+
+@pytest.mark.parametrize("as_path", [False, True])
+def test_iter_rows(tmp_path, as_path):
+    path = tmp_path / "Posts.xml"
+    path.write_bytes(XML)
+    source = path if as_path else io.BytesIO(XML)
+    rows = [dict(row.attrib) for row in xml_stream.iter_rows(source)]
+    expected = [
+        dict(row.attrib) for row in ElementTree.fromstring(XML) if row.tag == "row"
+    ]
+    assert rows == expected
+    assert rows[0]["Body"] == "<p>a</p>"
+    assert rows[1]["Title"] == "café"
+
+
+def test_iter_rows_detaches(monkeypatch):
+    roots = []
+    iterparse = xml_stream.ElementTree.iterparse
+
+    def hook(*args, **kwargs):
+        for event, element in iterparse(*args, **kwargs):
+            if not roots:
+                roots.append(element)
+            yield event, element
+
+    monkeypatch.setattr(xml_stream.ElementTree, "iterparse", hook)
+    rows = xml_stream.iter_rows(io.BytesIO(XML))
+    first = next(rows)
+    (root,) = roots
+    assert first in list(root)
+    second = next(rows)
+    # The first row is cleared from the root once the second is asked
+    # for, but the consumer's reference to it is still usable.
+    assert first not in list(root)
+    assert first.attrib["Id"] == "1"
+    assert second.attrib["Id"] == "3"
+    assert list(rows) == []
+    assert len(root) == 0
+
+
+def test_iter_rows_tag():
+    rows = xml_stream.iter_rows(io.BytesIO(XML), "other")
+    assert [row.attrib["Id"] for row in rows] == ["2"]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 50])
+def test_split_rows(dump, count):
+    path = dump / "Posts.xml"
+    data = path.read_bytes()
+    ranges = xml_stream.split_rows(path, count)
+    assert 1 <= len(ranges) <= count
+    assert all(data[start : start + 4] == b"<row" for start, _ in ranges)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    rows = [
+        row.attrib
+        for start, end in ranges
+        for row in xml_stream.iter_range_rows(path, start, end)
+    ]
+    assert rows == [row.attrib for row in xml_stream.iter_rows(path)]
+
+
+def test_split_rows_inside_row(dump):
+    path = dump / "Posts.xml"
+    data = path.read_bytes()
+    first = data.index(b"<row")
+    end = data.rindex(b"</")
+    # The nominal boundary lands in the middle of a row, and is moved to
+    # the start of the next row.
+    nominal = first + (end - first) // 2
+    assert data[nominal : nominal + 4] != b"<row"
+    (_, middle), _ = xml_stream.split_rows(path, 2)
+    assert middle == data.index(b"<row", nominal)